@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+핸드오버 상태 기계
+    IDLE → ROAMING → ASSOCIATED → ADDRESSED → ROUTED → STREAMING
+                  ↘ FAILED (단계별 타임아웃 / 오류)
+- 호출 측이 단계 목록 Step(phase, fn, timeout_s, enter) 를 넘김: fn(ctx, timeout_s) 가 True 면 enter 상태로 전이
+- 대기 단계(fn)는 고정 sleep 대신 이벤트(wpa_supplicant / rtnetlink 주소 알림)로 깨어남
+- 단계 소요 시간은 HandoverTimer.phase(), 상태 전이 시각은 HandoverTimer.mark() 로 기록
+- ctx["cancel"](Event) 가 설정되면 ROUTED 이전 단계에서 중단 ("aborted").
+  라우트를 바꾼 뒤에는 경로가 반쯤 바뀐 상태를 남기지 않도록 끝까지 진행
+"""
+
+import collections
+import threading
+
+IDLE = "IDLE"
+ROAMING = "ROAMING"
+ASSOCIATED = "ASSOCIATED"
+ADDRESSED = "ADDRESSED"
+ROUTED = "ROUTED"
+STREAMING = "STREAMING"
+FAILED = "FAILED"
+
+ABORTABLE = (ROAMING, ASSOCIATED, ADDRESSED)
+
+# phase: 타임라인 단계 이름, fn(ctx, timeout_s) → bool, enter: 성공 시 전이할 상태 (None 이면 유지)
+Step = collections.namedtuple("Step", "phase fn timeout_s enter")
+
+
+class HandoverStateMachine:
+    def __init__(self):
+        self.state = IDLE
+        self.lock = threading.Lock()
+
+    def _enter(self, state, timer):
+        self.state = state
+        timer.mark(state)
+
+    def _abort(self, timer, step):
+        print(f"[HO-FSM] {self.state}: aborted before/during {step.phase}")
+        timer.fail("aborted")
+        self._enter(FAILED, timer)
+        return FAILED, "aborted"
+
+    def run(self, timer, steps, ctx=None):
+        """
+        단계를 순서대로 실행 (fn 이 None 인 단계는 건너뜀). 반환: (최종 상태, outcome)
+        outcome: "ok" | "aborted" | "<state>-timeout" (예: "roaming-timeout"). 예외는 FAILED 전이 후 전파
+        """
+        ctx = {} if ctx is None else ctx
+        cancel = ctx.get("cancel")
+        with self.lock:
+            self._enter(ROAMING, timer)
+            for step in steps:
+                if step.fn is None:
+                    continue
+                if cancel is not None and cancel.is_set() and self.state in ABORTABLE:
+                    return self._abort(timer, step)
+                try:
+                    with timer.phase(step.phase):
+                        ok = step.fn(ctx, step.timeout_s)
+                except Exception:
+                    self._enter(FAILED, timer)
+                    raise
+                if not ok and cancel is not None and cancel.is_set() and self.state in ABORTABLE:
+                    return self._abort(timer, step)
+                if not ok:
+                    outcome = f"{self.state.lower()}-timeout"
+                    timer.fail(outcome)
+                    print(f"[HO-FSM] {self.state}: {step.phase} timed out ({step.timeout_s}s)")
+                    self._enter(FAILED, timer)
+                    return FAILED, outcome
+                if step.enter:
+                    self._enter(step.enter, timer)
+            return self.state, "ok"
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로봇 자체 핸드오버 정책 엔진 (서버 command 없이도 AP 전환)
+- HandoverPolicy: best-RSSI + 히스테리시스 마진 + time-to-trigger + 최소 체류 시간
+- HandoverPolicyEngine: 링크 상태 변화/주기마다 평가 → handover_fn 호출 → report_fn 으로 보고
+  서버 command 는 override(): hold_s 동안 자체 결정 중지
+"""
+
+import threading
+import time
+
+
+class HandoverPolicy:
+    """
+    margin_db : 후보 RSSI 가 현재 AP 보다 이만큼 이상 좋아야 함
+    ttt_s     : 위 조건이 연속으로 유지되어야 하는 시간 (time-to-trigger)
+    min_dwell_s: 직전 핸드오버 후 최소 체류 시간
+    trigger_dbm: 지정 시 현재 AP RSSI 가 이보다 나쁠 때만 전환 고려 (None 이면 항상)
+    max_age_s : 이보다 오래된 RSSI 는 무시
+    """
+
+    def __init__(self, margin_db=6.0, ttt_s=2.0, min_dwell_s=10.0, trigger_dbm=None, max_age_s=30.0):
+        self.margin_db = margin_db
+        self.ttt_s = ttt_s
+        self.min_dwell_s = min_dwell_s
+        self.trigger_dbm = trigger_dbm
+        self.max_age_s = max_age_s
+        self._cand = None
+        self._cand_since = None
+
+    def reset(self):
+        self._cand = None
+        self._cand_since = None
+
+    def evaluate(self, now, current, rssi, since_handover_s, ages=None):
+        """
+        current: 현재 BSSID, rssi: {bssid: 필터 RSSI}, ages: {bssid: 경과 초}
+        반환: 전환 결정 dict 또는 None
+        """
+        ages = ages or {}
+        fresh = {b: v for b, v in rssi.items()
+                 if v is not None and ages.get(b, 0.0) <= self.max_age_s}
+        if not fresh:
+            self.reset()
+            return None
+        best = max(fresh, key=fresh.get)
+        cur_rssi = fresh.get(current) if current else None
+
+        cond = best != current and (
+            cur_rssi is None or fresh[best] >= cur_rssi + self.margin_db)
+        if cond and self.trigger_dbm is not None and cur_rssi is not None:
+            cond = cur_rssi < self.trigger_dbm
+        if not cond:
+            self.reset()
+            return None
+
+        if best != self._cand:
+            self._cand = best
+            self._cand_since = now
+        held = now - self._cand_since
+        if held < self.ttt_s:
+            return None
+        if since_handover_s < self.min_dwell_s:
+            return None
+
+        self.reset()
+        return {
+            "from": current,
+            "to": best,
+            "from_rssi": cur_rssi,
+            "to_rssi": fresh[best],
+            "margin_db": None if cur_rssi is None else round(fresh[best] - cur_rssi, 1),
+            "held_s": round(held, 2),
+            "reason": "current-unseen" if cur_rssi is None else "best-rssi-hysteresis",
+        }
+
+
+class HandoverPolicyEngine(threading.Thread):
+    """
+    state(LinkState) 변화 또는 period_s 마다 정책 평가.
+    rssi_fn() → ({bssid: rssi}, {bssid: age_s}), since_handover_fn() → 직전 핸드오버 후 경과 초
+    active_fn() 이 False 면 평가 안 함 (예: 유선 경로 사용 중)
+    결정 시 report_fn(decision) 보고 후 handover_fn(bssid, decision) 실행
+    """
+
+    def __init__(self, policy, state, rssi_fn, since_handover_fn, handover_fn, report_fn,
+                 active_fn=lambda: True, period_s=0.5):
+        super().__init__(daemon=True)
+        self.policy = policy
+        self.state = state
+        self.rssi_fn = rssi_fn
+        self.since_handover_fn = since_handover_fn
+        self.handover_fn = handover_fn
+        self.report_fn = report_fn
+        self.active_fn = active_fn
+        self.period_s = period_s
+        self.override_until = 0.0
+        self.running = True
+        self.decisions = 0
+
+    def override(self, hold_s):
+        """서버 명령 우선: hold_s 동안 자체 결정 중지"""
+        self.override_until = time.monotonic() + hold_s
+        self.policy.reset()
+
+    def step(self):
+        now = time.monotonic()
+        if now < self.override_until or not self.active_fn():
+            self.policy.reset()
+            return None
+        current = self.state.bssid if self.state.connected else None
+        rssi, ages = self.rssi_fn()
+        decision = self.policy.evaluate(now, current, rssi, self.since_handover_fn(), ages)
+        if decision:
+            self.decisions += 1
+            decision["source"] = "policy"
+            print(f"[Policy] handover {decision['from']} → {decision['to']} ({decision['reason']}, "
+                  f"{decision['from_rssi']} → {decision['to_rssi']} dBm)")
+            self.report_fn(decision)
+            self.handover_fn(decision["to"], decision)
+        return decision
+
+    def run(self):
+        version = 0
+        while self.running:
+            try:
+                version = self.state.wait_change(version, timeout=self.period_s)
+                self.step()
+            except Exception as e:
+                print(f"[Policy] error: {e}")
+                time.sleep(1)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+최신 요청 우선(latest-wins) 핸드오버 작업 큐
+- Socket.IO 핸들러/정책 엔진은 submit() 후 바로 반환 → 전용 작업자 스레드가 실행
+- 대기 요청은 최대 1개: 새 대상이 오면 대기 중이던 요청은 "superseded"
+- 실행 중 요청과 대상이 다르면 cancel 설정 + abort_fn(req) 호출 (진행 중 핸드오버 중단)
+- 실행 중/대기 중 요청과 대상이 같으면 새 요청은 기존 요청에 합침 ("coalesced").
+  실행 중 요청과 같으면 다른 대상의 대기 요청은 superseded (실행 X, 대기 Y, 새 X → X 만 남음)
+- notify_fn(req, status, **info): status = queued | coalesced | superseded | done
+"""
+
+import itertools
+import threading
+import time
+
+
+class HandoverRequest:
+    def __init__(self, rid, target, source, meta):
+        self.id = rid
+        self.target = target
+        self.source = source
+        self.meta = meta or {}
+        self.t_enq = time.monotonic()
+        self.t_start = None
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.outcome = None
+
+    def info(self):
+        return {"request_id": self.id, "target": self.target, "source": self.source, **self.meta}
+
+
+class HandoverQueue(threading.Thread):
+    def __init__(self, run_fn, notify_fn, abort_fn=None):
+        super().__init__(daemon=True)
+        self.run_fn = run_fn
+        self.notify_fn = notify_fn
+        self.abort_fn = abort_fn
+        self.cond = threading.Condition()
+        self.pending = None
+        self.current = None
+        self.ids = itertools.count(1)
+        self.counts = {"submitted": 0, "coalesced": 0, "superseded": 0, "aborted": 0, "done": 0}
+        self.running = True
+
+    def _notify(self, req, status, **info):
+        try:
+            self.notify_fn(req, status, **info)
+        except Exception as e:
+            print(f"[HOQ] notify error: {e}")
+
+    def submit(self, target, source="server", meta=None):
+        """요청 등록 → (요청, 대기 순번). 순번 0: 바로 실행, 1: 실행 중 요청 뒤"""
+        req = HandoverRequest(next(self.ids), target, source, meta)
+        superseded = aborted = None
+        with self.cond:
+            self.counts["submitted"] += 1
+            cur = self.current
+            if cur and cur.target == target and not cur.cancel.is_set():
+                # 최신 요청 = 실행 중 대상 → 대기 요청은 더 이상 최신이 아님
+                self.counts["coalesced"] += 1
+                merged = cur
+                if self.pending:
+                    superseded, self.pending = self.pending, None
+                    superseded.outcome = "superseded"
+                    self.counts["superseded"] += 1
+            elif self.pending and self.pending.target == target:
+                self.counts["coalesced"] += 1
+                merged = self.pending
+            else:
+                merged = None
+                if self.pending:
+                    superseded, self.pending = self.pending, None
+                    superseded.outcome = "superseded"
+                    self.counts["superseded"] += 1
+                if cur and cur.target != target and not cur.cancel.is_set():
+                    cur.cancel.set()
+                    aborted = cur
+                    self.counts["aborted"] += 1
+                self.pending = req
+                self.cond.notify_all()
+            position = 1 if self.current else 0
+
+        if superseded:
+            superseded.done.set()
+            self._notify(superseded, "superseded", by=merged.id if merged else req.id)
+        if merged:
+            self._notify(req, "coalesced", into=merged.id, position=0 if merged is cur else position)
+            return merged, 0 if merged is cur else position
+        if aborted:
+            print(f"[HOQ] abort #{aborted.id} → {aborted.target} (superseded by #{req.id} → {target})")
+            if self.abort_fn:
+                self.abort_fn(aborted)
+        self._notify(req, "queued", position=position)
+        return req, position
+
+    def run(self):
+        while self.running:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return
+                req, self.pending = self.pending, None
+                self.current = req
+            req.t_start = time.monotonic()
+            try:
+                req.outcome = self.run_fn(req) or "ok"
+            except Exception as e:
+                print(f"[HOQ] #{req.id} error: {e}")
+                req.outcome = "error"
+            with self.cond:
+                self.current = None
+                self.counts["done"] += 1
+            req.done.set()
+            self._notify(req, "done", outcome=req.outcome,
+                         queued_ms=round((req.t_start - req.t_enq) * 1e3, 1),
+                         run_ms=round((time.monotonic() - req.t_start) * 1e3, 1))
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                **self.counts,
+                "pending": self.pending.id if self.pending else None,
+                "current": self.current.id if self.current else None,
+            }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+핸드오버 단계별 타임라인 계측
+- HandoverTimer: 핸드오버 1회. with timer.phase("roam"): ... 로 단계 시작/종료 monotonic 기록,
+                mark(state) 로 상태 기계 전이 시각 기록, metric(name, ms) 로 단계 외 구간 기록
+                (예: "first_tx" = 경로 전환 → 새 경로 첫 스트림 패킷 송신)
+- TimelineLog: 최근 기록 링 + 단계별 소요 시간 p50/p95/p99 (실행 전체, 단계당 최근 max_samples 개)
+
+기록 예:
+    {"id": 3, "target": "...", "source": "server", "outcome": "ok", "total_ms": 412.3,
+     "phases": [{"name": "roam", "start_ms": 0.0, "dur_ms": 2.1, "ok": true}, ...]}
+"""
+
+import collections
+import contextlib
+import itertools
+import threading
+import time
+
+PHASES = ("scan_preempt", "roam", "bssid_wait", "ip_wait", "neigh", "route", "camera", "udp_restart", "echo")
+
+_ids = itertools.count(1)
+
+
+class HandoverTimer:
+    def __init__(self, target, source="server", iface=None):
+        self.id = next(_ids)
+        self.target = target
+        self.source = source
+        self.iface = iface
+        self.wall = time.time()
+        self.t0 = time.monotonic()
+        self.phases = []
+        self.states = []       # 상태 기계 전이 [{state, at_ms}]
+        self.metrics = {}      # 단계와 겹치는 구간 등 {name: ms}
+        self.outcome = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """단계 구간 측정. 예외가 나면 ok=False 로 기록 후 그대로 전파"""
+        start = time.monotonic()
+        entry = {"name": name, "start_ms": round((start - self.t0) * 1e3, 2), "dur_ms": None, "ok": True}
+        self.phases.append(entry)
+        try:
+            yield entry
+        except Exception:
+            entry["ok"] = False
+            raise
+        finally:
+            entry["dur_ms"] = round((time.monotonic() - start) * 1e3, 2)
+
+    def mark(self, state):
+        """상태 전이 시각 기록"""
+        self.states.append({"state": state, "at_ms": round((time.monotonic() - self.t0) * 1e3, 2)})
+
+    def metric(self, name, ms):
+        self.metrics[name] = round(ms, 2)
+
+    def fail(self, outcome):
+        """마지막 단계를 실패로 표시 (예: 대기 타임아웃)"""
+        if self.phases:
+            self.phases[-1]["ok"] = False
+        self.outcome = outcome
+
+    def record(self, outcome=None):
+        if outcome is not None:
+            self.outcome = outcome
+        return {
+            "id": self.id,
+            "target": self.target,
+            "source": self.source,
+            "iface": self.iface,
+            "start": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.wall)),
+            "outcome": self.outcome or "ok",
+            "total_ms": round((time.monotonic() - self.t0) * 1e3, 2),
+            "phases": self.phases,
+            "states": self.states,
+            "metrics": self.metrics,
+        }
+
+
+class TimelineLog:
+    def __init__(self, capacity=64, max_samples=1024):
+        self.records = collections.deque(maxlen=capacity)
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=max_samples))
+        self.outcomes = collections.Counter()
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+            self.outcomes[record["outcome"]] += 1
+            self.samples["total"].append(record["total_ms"])
+            for ph in record["phases"]:
+                if ph["dur_ms"] is not None:
+                    self.samples[ph["name"]].append(ph["dur_ms"])
+            for name, ms in record.get("metrics", {}).items():
+                self.samples[name].append(ms)
+
+    def recent(self, n=None):
+        with self.lock:
+            recs = list(self.records)
+        return recs if n is None else recs[-n:]
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """{phase: {count, p50, p95, p99, max}} (ms) + outcomes"""
+        with self.lock:
+            snap = {k: sorted(v) for k, v in self.samples.items()}
+            outcomes = dict(self.outcomes)
+        out = {}
+        names = [n for n in PHASES if n in snap] + \
+            sorted(n for n in snap if n not in PHASES and n != "total") + ["total"]
+        for name in names:
+            vals = snap.get(name)
+            if not vals:
+                continue
+            st = {"count": len(vals), "max": vals[-1]}
+            for p in percentiles:
+                st[f"p{p}"] = vals[min(len(vals) - 1, int(round(p / 100 * (len(vals) - 1))))]
+            out[name] = st
+        out["outcomes"] = outcomes
+        return out
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BSSID/ESS 별 마지막 IPv4 lease 캐시 (디스크 상태 파일, JSON)
+- record(bssid, ssid, ip, prefixlen, gateway, expires): BSSID 키와 ESS(ssid) 키에 함께 저장
+- lookup(bssid, ssid): BSSID 항목 우선, 없으면 같은 ESS 항목. 만료(expires, epoch 초)된 항목은 무시
+- invalidate(bssid, ssid): 검증 실패(DHCP 가 다른 주소를 줌) 시 제거
+- 저장은 임시 파일 → os.replace 로 원자적 교체 (전원 차단 시에도 파일이 깨지지 않음)
+
+    python3 lease_cache.py [lease_cache.json]   # 내용 확인
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+
+class LeaseCache:
+    def __init__(self, path, max_entries=64):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}       # "bssid:<mac>" | "ess:<ssid>" → lease dict
+        self.load()
+
+    @staticmethod
+    def _keys(bssid, ssid):
+        keys = []
+        if bssid:
+            keys.append(f"bssid:{bssid.lower()}")
+        if ssid:
+            keys.append(f"ess:{ssid}")
+        return keys
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.entries = data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            print(f"[LEASE] load {self.path} failed: {e}")
+            self.entries = {}
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[LEASE] save {self.path} failed: {e}")
+
+    def record(self, bssid, ssid, ip, prefixlen, gateway, expires):
+        lease = {"ip": ip, "prefixlen": prefixlen, "gateway": gateway or None,
+                 "expires": round(expires), "bssid": bssid, "ssid": ssid, "updated": round(time.time())}
+        with self.lock:
+            changed = False
+            for key in self._keys(bssid, ssid):
+                old = self.entries.get(key)
+                if not old or any(old.get(k) != lease[k] for k in ("ip", "prefixlen", "gateway", "expires")):
+                    self.entries[key] = lease
+                    changed = True
+            if len(self.entries) > self.max_entries:
+                # 오래된 항목부터 정리
+                for key in sorted(self.entries, key=lambda k: self.entries[k].get("updated", 0))[
+                        :len(self.entries) - self.max_entries]:
+                    del self.entries[key]
+                changed = True
+            if changed:
+                self._save()
+        return lease
+
+    def lookup(self, bssid, ssid=None, now=None):
+        """유효한 lease (dict 복사본, "source": "bssid" | "ess") 또는 None"""
+        now = time.time() if now is None else now
+        with self.lock:
+            for key in self._keys(bssid, ssid):
+                lease = self.entries.get(key)
+                if lease and lease.get("expires", 0) > now:
+                    return {**lease, "source": key.split(":", 1)[0]}
+        return None
+
+    def invalidate(self, bssid, ssid=None):
+        with self.lock:
+            removed = [k for k in self._keys(bssid, ssid) if self.entries.pop(k, None)]
+            if removed:
+                self._save()
+        return removed
+
+
+if __name__ == "__main__":
+    cache = LeaseCache(sys.argv[1] if len(sys.argv) > 1 else "lease_cache.json")
+    now = time.time()
+    for key, lease in sorted(cache.entries.items()):
+        left = lease.get("expires", 0) - now
+        print(f"{key:32s} {lease['ip']}/{lease['prefixlen']} gw={lease.get('gateway')} "
+              f"{'expired' if left <= 0 else f'{left:.0f}s left'}")
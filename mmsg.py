@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UDP 배치 송신 헬퍼 (Linux 전용)
+- MmsgSender: ctypes sendmmsg() 로 N개 datagram 을 syscall 1회에 전달
+- GsoSender : UDP_SEGMENT(GSO) 로 큰 버퍼 1개를 커널이 seg_size 단위로 분할
+- LoopSender: 위 두 가지를 쓸 수 없을 때의 fallback (send 반복)
+- MmsgReceiver: recvmmsg() 로 미리 할당된 버퍼에 N개 datagram 일괄 수신
+                (+ SO_RXQ_OVFL 로 소켓 큐 overflow 누적 드롭 수)
+
+세 송신기 모두 미리 할당된 bytearray(buf)를 seg_size 슬롯으로 나눠 쓰며,
+send(n) 은 앞에서부터 n 개 슬롯을 보낸다. 소켓은 connect() 되어 있어야 한다.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import struct
+
+SOL_UDP = 17
+UDP_SEGMENT = 103       # linux/udp.h (kernel >= 4.18)
+UDP_MAX_SEGMENTS = 64   # GSO 1회 최대 세그먼트 수
+MAX_UDP_PAYLOAD = 65507
+
+SO_RCVBUFFORCE = 33
+SO_RXQ_OVFL = 40
+MSG_WAITFORONE = 0x10000
+
+
+class sockaddr_in(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_ubyte * 2),
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_ubyte * 8),
+    ]
+
+
+class cmsghdr(ctypes.Structure):
+    _fields_ = [
+        ("cmsg_len", ctypes.c_size_t),
+        ("cmsg_level", ctypes.c_int),
+        ("cmsg_type", ctypes.c_int),
+    ]
+
+
+class iovec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t),
+    ]
+
+
+class msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", msghdr),
+        ("msg_len", ctypes.c_uint),
+    ]
+
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        _libc.sendmmsg.restype = ctypes.c_int
+        _libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        _libc.recvmmsg.restype = ctypes.c_int
+    return _libc
+
+
+def _raise_errno():
+    e = ctypes.get_errno()
+    raise OSError(e, os.strerror(e))
+
+
+def _buffer_address(buf):
+    return ctypes.addressof(ctypes.c_char.from_buffer(buf))
+
+
+class LoopSender:
+    """fallback: 슬롯마다 send() 1회"""
+    mode = "loop"
+
+    def __init__(self, sock, buf, seg_size):
+        self.sock = sock
+        self.seg_size = seg_size
+        self.view = memoryview(buf)
+        self.max_batch = len(buf) // seg_size
+
+    def send(self, n):
+        ss = self.seg_size
+        for i in range(n):
+            self.sock.send(self.view[i * ss:(i + 1) * ss])
+        return n
+
+    def close(self):
+        self.view.release()
+
+
+class MmsgSender:
+    """sendmmsg(): 슬롯별 iovec/mmsghdr 을 미리 만들어 두고 재사용"""
+    mode = "sendmmsg"
+
+    def __init__(self, sock, buf, seg_size):
+        self.libc = _get_libc()
+        self.sock = sock
+        self.buf = buf   # ctypes 가 주소를 참조하므로 참조 유지 필수
+        self.seg_size = seg_size
+        self.max_batch = len(buf) // seg_size
+        base = _buffer_address(buf)
+        self.iovs = (iovec * self.max_batch)()
+        self.msgs = (mmsghdr * self.max_batch)()
+        for i in range(self.max_batch):
+            self.iovs[i].iov_base = base + i * seg_size
+            self.iovs[i].iov_len = seg_size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def send(self, n):
+        fd = self.sock.fileno()
+        base = ctypes.addressof(self.msgs)
+        sent = 0
+        while sent < n:
+            r = self.libc.sendmmsg(fd, base + sent * ctypes.sizeof(mmsghdr), n - sent, 0)
+            if r < 0:
+                if ctypes.get_errno() == errno.EINTR:
+                    continue
+                _raise_errno()
+            sent += r
+        return sent
+
+    def close(self):
+        self.msgs = None
+        self.iovs = None
+
+
+class GsoSender:
+    """UDP_SEGMENT: 연속된 n*seg_size 바이트를 send() 1회로 전달"""
+    mode = "gso"
+
+    def __init__(self, sock, buf, seg_size):
+        sock.setsockopt(SOL_UDP, UDP_SEGMENT, seg_size)
+        self.sock = sock
+        self.seg_size = seg_size
+        self.view = memoryview(buf)
+        self.max_batch = min(len(buf) // seg_size, UDP_MAX_SEGMENTS,
+                             MAX_UDP_PAYLOAD // seg_size)
+
+    def send(self, n):
+        ss = self.seg_size
+        i = 0
+        while i < n:
+            k = min(n - i, self.max_batch)
+            self.sock.send(self.view[i * ss:(i + k) * ss])
+            i += k
+        return n
+
+    def close(self):
+        self.view.release()
+
+
+SENDERS = {
+    "sendmmsg": MmsgSender,
+    "gso": GsoSender,
+    "loop": LoopSender,
+}
+
+
+def make_batch_sender(mode, sock, buf, seg_size):
+    """
+    mode 에 맞는 송신기 생성. 커널/libc 미지원이면 LoopSender 로 fallback.
+    """
+    cls = SENDERS.get(mode)
+    if cls is None:
+        raise ValueError(f"unknown batch mode: {mode}")
+    try:
+        return cls(sock, buf, seg_size)
+    except (OSError, AttributeError) as e:
+        print(f"[MMSG] {mode} unavailable ({e}), falling back to loop")
+        return LoopSender(sock, buf, seg_size)
+
+
+def auto_batch_size(interval, target_s=1e-3, max_batch=UDP_MAX_SEGMENTS):
+    """
+    패킷 간격(interval)으로 배치 크기 결정: 한 번 깨어날 때 target_s 분량을 송신.
+    저속(interval >= target_s)이면 1 (배치 없음).
+    """
+    if interval <= 0:
+        return max_batch
+    return max(1, min(max_batch, int(target_s / interval)))
+
+
+def _cmsg_align(n):
+    a = ctypes.sizeof(ctypes.c_size_t)
+    return (n + a - 1) & ~(a - 1)
+
+
+class MmsgReceiver:
+    """
+    recvmmsg(): slots 개 수신 버퍼/주소/컨트롤 버퍼를 미리 할당해 재사용.
+    recv() 는 수신 개수를 돌려주고, data(i)/addr(i) 로 i번째 datagram 접근.
+    SO_RCVTIMEO 가 설정돼 있으면 시간 초과 시 0 반환 (소켓은 blocking 이어야 함).
+    """
+    CTRL_SIZE = 64
+
+    def __init__(self, sock, slots=64, buf_size=2048, track_overflow=True):
+        self.libc = _get_libc()
+        self.sock = sock
+        self.slots = slots
+        self.buf_size = buf_size
+        self.buf = bytearray(slots * buf_size)
+        self.view = memoryview(self.buf)
+        self.names = (sockaddr_in * slots)()
+        self.ctrl = (ctypes.c_ubyte * (slots * self.CTRL_SIZE))()
+        self.iovs = (iovec * slots)()
+        self.msgs = (mmsghdr * slots)()
+        base = _buffer_address(self.buf)
+        for i in range(slots):
+            self.iovs[i].iov_base = base + i * buf_size
+            self.iovs[i].iov_len = buf_size
+            h = self.msgs[i].msg_hdr
+            h.msg_name = ctypes.addressof(self.names[i])
+            h.msg_iov = ctypes.pointer(self.iovs[i])
+            h.msg_iovlen = 1
+        self.track_overflow = False
+        if track_overflow:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self.track_overflow = True
+            except OSError as e:
+                print(f"[MMSG] SO_RXQ_OVFL unavailable: {e}")
+        self.drops = 0   # 커널 소켓 큐 overflow 누적 드롭 (SO_RXQ_OVFL)
+
+    def recv(self):
+        fd = self.sock.fileno()
+        ctrl_base = ctypes.addressof(self.ctrl)
+        for i in range(self.slots):
+            h = self.msgs[i].msg_hdr
+            h.msg_namelen = ctypes.sizeof(sockaddr_in)
+            if self.track_overflow:
+                h.msg_control = ctrl_base + i * self.CTRL_SIZE
+                h.msg_controllen = self.CTRL_SIZE
+        while True:
+            r = self.libc.recvmmsg(fd, ctypes.addressof(self.msgs), self.slots, MSG_WAITFORONE, None)
+            if r >= 0:
+                break
+            e = ctypes.get_errno()
+            if e == errno.EINTR:
+                continue
+            if e in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0
+            _raise_errno()
+        if self.track_overflow and r:
+            self._parse_overflow(r - 1)
+        return r
+
+    def _parse_overflow(self, i):
+        """마지막 메시지의 SO_RXQ_OVFL cmsg (uint32 누적 카운터) 반영"""
+        h = self.msgs[i].msg_hdr
+        hdr_len = _cmsg_align(ctypes.sizeof(cmsghdr))
+        off = 0
+        raw = bytes(self.ctrl[i * self.CTRL_SIZE:i * self.CTRL_SIZE + h.msg_controllen])
+        while off + ctypes.sizeof(cmsghdr) <= len(raw):
+            c = cmsghdr.from_buffer_copy(raw, off)
+            if c.cmsg_len < ctypes.sizeof(cmsghdr):
+                break
+            if c.cmsg_level == socket.SOL_SOCKET and c.cmsg_type == SO_RXQ_OVFL:
+                (self.drops,) = struct.unpack_from("I", raw, off + hdr_len)
+            off += _cmsg_align(c.cmsg_len)
+
+    def data(self, i):
+        off = i * self.buf_size
+        return self.view[off:off + self.msgs[i].msg_len]
+
+    def addr(self, i):
+        sa = self.names[i]
+        return (socket.inet_ntoa(bytes(sa.sin_addr)), (sa.sin_port[0] << 8) | sa.sin_port[1])
+
+    def close(self):
+        self.view.release()
+        self.msgs = None
+        self.iovs = None
+
+
+def set_rcvbuf(sock, size):
+    """
+    SO_RCVBUFFORCE(CAP_NET_ADMIN) 우선, 실패 시 SO_RCVBUF (rmem_max 로 제한됨).
+    실제 적용된 크기 반환.
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, size)
+    except OSError:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
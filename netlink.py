@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+최소 netlink 헬퍼 (nl80211 / rtnetlink 공용)
+- 메시지/속성(nlattr) 인코딩·디코딩
+- NetlinkSocket: 요청 → 응답(dump/ack) 수집, batch() 로 여러 요청 1회 전송
+"""
+
+import errno
+import os
+import socket
+import struct
+import threading
+
+NETLINK_ROUTE = 0
+NETLINK_GENERIC = 16
+
+NLMSG_NOOP = 1
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_ROOT = 0x100
+NLM_F_MATCH = 0x200
+NLM_F_DUMP = NLM_F_ROOT | NLM_F_MATCH
+NLM_F_REPLACE = 0x100
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+NLA_F_NESTED = 0x8000
+NLA_TYPE_MASK = 0x3FFF
+
+NLMSGHDR = struct.Struct("=IHHII")
+NLATTR = struct.Struct("=HH")
+GENLMSGHDR = struct.Struct("=BBH")
+
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+
+class NetlinkError(OSError):
+    pass
+
+
+def align4(n):
+    return (n + 3) & ~3
+
+
+# ---- 속성 인코딩 ----
+def attr(atype, data):
+    """nlattr 1개 (4바이트 정렬 패딩 포함)"""
+    n = NLATTR.size + len(data)
+    return NLATTR.pack(n, atype) + data + b"\0" * (align4(n) - n)
+
+
+def attr_u8(atype, v):
+    return attr(atype, struct.pack("=B", v))
+
+
+def attr_u16(atype, v):
+    return attr(atype, struct.pack("=H", v))
+
+
+def attr_u32(atype, v):
+    return attr(atype, struct.pack("=I", v))
+
+
+def attr_str(atype, s):
+    return attr(atype, s.encode() + b"\0")
+
+
+def attr_nested(atype, *attrs):
+    return attr(atype | NLA_F_NESTED, b"".join(attrs))
+
+
+# ---- 속성 디코딩 ----
+def parse_attrs(data, offset=0, end=None):
+    """nlattr 나열 → {type: bytes} (NLA_F_NESTED 등 플래그 제거, 같은 type 은 마지막 값)"""
+    out = {}
+    end = len(data) if end is None else end
+    while offset + NLATTR.size <= end:
+        alen, atype = NLATTR.unpack_from(data, offset)
+        if alen < NLATTR.size or offset + alen > end:
+            break
+        out[atype & NLA_TYPE_MASK] = bytes(data[offset + NLATTR.size:offset + alen])
+        offset += align4(alen)
+    return out
+
+
+def get_u8(attrs, t, default=None):
+    v = attrs.get(t)
+    return v[0] if v else default
+
+
+def get_s8(attrs, t, default=None):
+    v = attrs.get(t)
+    return struct.unpack("=b", v[:1])[0] if v else default
+
+
+def get_u16(attrs, t, default=None):
+    v = attrs.get(t)
+    return struct.unpack("=H", v[:2])[0] if v and len(v) >= 2 else default
+
+
+def get_u32(attrs, t, default=None):
+    v = attrs.get(t)
+    return struct.unpack("=I", v[:4])[0] if v and len(v) >= 4 else default
+
+
+def get_u64(attrs, t, default=None):
+    v = attrs.get(t)
+    return struct.unpack("=Q", v[:8])[0] if v and len(v) >= 8 else default
+
+
+def get_str(attrs, t, default=None):
+    v = attrs.get(t)
+    return v.split(b"\0", 1)[0].decode(errors="replace") if v is not None else default
+
+
+# ---- 메시지 ----
+def iter_messages(buf):
+    """수신 버퍼 → (type, flags, seq, pid, payload) 반복"""
+    off = 0
+    while off + NLMSGHDR.size <= len(buf):
+        mlen, mtype, flags, seq, pid = NLMSGHDR.unpack_from(buf, off)
+        if mlen < NLMSGHDR.size or off + mlen > len(buf):
+            break
+        yield mtype, flags, seq, pid, bytes(buf[off + NLMSGHDR.size:off + mlen])
+        off += align4(mlen)
+
+
+def build_message(mtype, flags, seq, payload, pid=0):
+    return NLMSGHDR.pack(NLMSGHDR.size + len(payload), mtype, flags, seq, pid) + payload
+
+
+class NetlinkSocket:
+    """
+    netlink 요청/응답. groups 를 주면 멀티캐스트 알림도 수신 가능 (recv_messages).
+    request() 는 스레드 안전 (요청 소켓과 알림 소켓은 분리해서 쓰는 것을 권장)
+    """
+
+    def __init__(self, proto, groups=0, rcvbuf=1 << 20):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, proto)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except OSError:
+            pass
+        self.sock.bind((0, groups))
+        self.pid = self.sock.getsockname()[0]
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        self.sock.close()
+
+    def _next_seq(self):
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return self.seq
+
+    def request(self, mtype, flags, payload, raw=None):
+        """
+        요청 후 응답 메시지 목록 [(type, payload)] 반환.
+        NLM_F_DUMP 면 NLMSG_DONE 까지, NLM_F_ACK 면 ack 까지 수집.
+        raw(list) 를 주면 받은 원본 버퍼를 덧붙임 (기록/재생 시험용)
+        """
+        with self.lock:
+            seq = self._next_seq()
+            self.sock.send(build_message(mtype, flags | NLM_F_REQUEST, seq, payload))
+            out = []
+            while True:
+                buf = self.sock.recv(1 << 16)
+                if raw is not None:
+                    raw.append(buf)
+                done = False
+                for t, f, s, _pid, pl in iter_messages(buf):
+                    if s != seq:
+                        continue
+                    if t == NLMSG_ERROR:
+                        (err,) = struct.unpack_from("=i", pl, 0)
+                        if err:
+                            raise NetlinkError(-err, os.strerror(-err))
+                        done = True       # ack
+                        break
+                    if t == NLMSG_DONE:
+                        done = True
+                        break
+                    out.append((t, pl))
+                    if not (f & NLM_F_MULTI) and not (flags & NLM_F_ACK):
+                        done = True
+                if done:
+                    return out
+
+    def batch(self, messages):
+        """
+        여러 요청 [(type, flags, payload)] 을 한 번의 send 로 전달 (각각 NLM_F_ACK).
+        반환: 요청 순서대로 errno 목록 (0 = 성공)
+        """
+        with self.lock:
+            seqs, bufs = [], []
+            for mtype, flags, payload in messages:
+                seq = self._next_seq()
+                seqs.append(seq)
+                bufs.append(build_message(mtype, flags | NLM_F_REQUEST | NLM_F_ACK, seq, payload))
+            self.sock.send(b"".join(bufs))
+            result = {}
+            while len(result) < len(seqs):
+                buf = self.sock.recv(1 << 16)
+                for t, _f, s, _pid, pl in iter_messages(buf):
+                    if t == NLMSG_ERROR and s in seqs:
+                        (err,) = struct.unpack_from("=i", pl, 0)
+                        result[s] = -err
+            return [result[s] for s in seqs]
+
+    def recv_messages(self, timeout=None, with_flags=False):
+        """
+        멀티캐스트 알림 수신: [(type, payload)] 또는 with_flags 면 [(type, flags, payload)] (timeout 이면 []).
+        flags 예: 라우트 알림의 NLM_F_REPLACE (기존 항목 교체).
+        ENOBUFS(OSError) 는 알림 유실 → 호출 측이 전체 재동기화 해야 함
+        """
+        self.sock.settimeout(timeout)
+        try:
+            buf = self.sock.recv(1 << 16)
+        except socket.timeout:
+            return []
+        if with_flags:
+            return [(t, f, pl) for t, f, _s, _p, pl in iter_messages(buf)]
+        return [(t, pl) for t, _f, _s, _p, pl in iter_messages(buf)]
+
+
+# ---- generic netlink ----
+def genl_family_id(nl, name):
+    """generic netlink family 이름 → id (예: 'nl80211')"""
+    payload = GENLMSGHDR.pack(CTRL_CMD_GETFAMILY, 1, 0) + attr_str(CTRL_ATTR_FAMILY_NAME, name)
+    for _t, pl in nl.request(GENL_ID_CTRL, 0, payload):
+        attrs = parse_attrs(pl, GENLMSGHDR.size)
+        fid = get_u16(attrs, CTRL_ATTR_FAMILY_ID)
+        if fid is not None:
+            return fid
+    raise NetlinkError(errno.ENOENT, f"genl family not found: {name}")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+nl80211(generic netlink) 로 연결 중인 AP 의 station 정보 조회 (iw 프로세스 불필요)
+- get_station(): NL80211_CMD_GET_STATION dump → signal / tx·rx bitrate / retry / failed
+- StationSampler: 10~20 Hz 백그라운드 샘플러 (최근 값 + 짧은 이력)
+- parse_station_dump(): 원본 netlink 버퍼 파서 → 기록된 응답으로 오프라인 검증 가능
+
+기록/재생:
+    python3 nl80211.py wlan0 --record station.hex   # 실제 응답을 hex 로 저장
+    python3 nl80211.py --replay station.hex          # 저장된 응답 파싱
+"""
+
+import collections
+import socket
+import sys
+import threading
+import time
+
+import netlink as nl
+
+NL80211_CMD_GET_STATION = 17
+NL80211_CMD_NEW_STATION = 19
+
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_MAC = 6
+NL80211_ATTR_STA_INFO = 21
+
+NL80211_STA_INFO_INACTIVE_TIME = 1
+NL80211_STA_INFO_RX_PACKETS = 9
+NL80211_STA_INFO_TX_PACKETS = 10
+NL80211_STA_INFO_SIGNAL = 7
+NL80211_STA_INFO_TX_BITRATE = 8
+NL80211_STA_INFO_TX_RETRIES = 11
+NL80211_STA_INFO_TX_FAILED = 12
+NL80211_STA_INFO_SIGNAL_AVG = 13
+NL80211_STA_INFO_RX_BITRATE = 14
+NL80211_STA_INFO_BEACON_LOSS = 18
+NL80211_STA_INFO_EXPECTED_THROUGHPUT = 27
+NL80211_STA_INFO_BEACON_SIGNAL_AVG = 30
+
+NL80211_RATE_INFO_BITRATE = 1      # u16, 100 kbps
+NL80211_RATE_INFO_BITRATE32 = 5    # u32, 100 kbps
+
+
+def _bitrate_mbps(raw):
+    if raw is None:
+        return None
+    ri = nl.parse_attrs(raw)
+    v = nl.get_u32(ri, NL80211_RATE_INFO_BITRATE32)
+    if v is None:
+        v = nl.get_u16(ri, NL80211_RATE_INFO_BITRATE)
+    return v / 10.0 if v is not None else None
+
+
+def parse_station(payload):
+    """NEW_STATION genl payload(genlmsghdr 포함) → dict"""
+    attrs = nl.parse_attrs(payload, nl.GENLMSGHDR.size)
+    mac = attrs.get(NL80211_ATTR_MAC)
+    sta = nl.parse_attrs(attrs.get(NL80211_ATTR_STA_INFO, b""))
+    return {
+        "bssid": ":".join(f"{b:02x}" for b in mac) if mac else None,
+        "signal": nl.get_s8(sta, NL80211_STA_INFO_SIGNAL),
+        "signal_avg": nl.get_s8(sta, NL80211_STA_INFO_SIGNAL_AVG),
+        "beacon_signal_avg": nl.get_s8(sta, NL80211_STA_INFO_BEACON_SIGNAL_AVG),
+        "tx_bitrate_mbps": _bitrate_mbps(sta.get(NL80211_STA_INFO_TX_BITRATE)),
+        "rx_bitrate_mbps": _bitrate_mbps(sta.get(NL80211_STA_INFO_RX_BITRATE)),
+        "tx_packets": nl.get_u32(sta, NL80211_STA_INFO_TX_PACKETS),
+        "rx_packets": nl.get_u32(sta, NL80211_STA_INFO_RX_PACKETS),
+        "tx_retries": nl.get_u32(sta, NL80211_STA_INFO_TX_RETRIES),
+        "tx_failed": nl.get_u32(sta, NL80211_STA_INFO_TX_FAILED),
+        "beacon_loss": nl.get_u32(sta, NL80211_STA_INFO_BEACON_LOSS),
+        "inactive_ms": nl.get_u32(sta, NL80211_STA_INFO_INACTIVE_TIME),
+    }
+
+
+def parse_station_dump(buffers, family_id=None):
+    """원본 netlink 수신 버퍼 목록 → station dict 목록 (기록 응답 재생용)"""
+    out = []
+    for buf in buffers:
+        for mtype, _f, _s, _p, pl in nl.iter_messages(buf):
+            if mtype in (nl.NLMSG_DONE, nl.NLMSG_ERROR, nl.NLMSG_NOOP):
+                continue
+            if family_id is not None and mtype != family_id:
+                continue
+            if pl and pl[0] == NL80211_CMD_NEW_STATION:
+                out.append(parse_station(pl))
+    return out
+
+
+class Nl80211:
+    """nl80211 generic netlink 연결 (family id 는 1회 조회 후 재사용)"""
+
+    def __init__(self, iface):
+        self.iface = iface
+        self.ifindex = socket.if_nametoindex(iface)
+        self.sock = nl.NetlinkSocket(nl.NETLINK_GENERIC)
+        self.family = nl.genl_family_id(self.sock, "nl80211")
+
+    def get_station(self, raw=None):
+        """연결된 AP(station 모드에서는 1개) 정보. 미연결이면 None"""
+        payload = nl.GENLMSGHDR.pack(NL80211_CMD_GET_STATION, 0, 0) + \
+            nl.attr_u32(NL80211_ATTR_IFINDEX, self.ifindex)
+        msgs = self.sock.request(self.family, nl.NLM_F_DUMP, payload, raw=raw)
+        for _t, pl in msgs:
+            if pl and pl[0] == NL80211_CMD_NEW_STATION:
+                return parse_station(pl)
+        return None
+
+    def close(self):
+        self.sock.close()
+
+
+class StationSampler(threading.Thread):
+    """
+    hz 주기로 get_station() 샘플링.
+    latest: 최근 샘플 (+ 직전 샘플 대비 retry/failed 증가량), history: 최근 signal 이력
+    """
+
+    def __init__(self, iface, hz=10.0, history=200):
+        super().__init__(daemon=True)
+        self.iface = iface
+        self.period = 1.0 / hz
+        self.latest = None
+        self.history = collections.deque(maxlen=history)   # (monotonic, bssid, signal)
+        self.lock = threading.Lock()
+        self.running = True
+        self.errors = 0
+
+    def _derive(self, cur, prev):
+        """같은 AP 로의 연속 샘플이면 retry/failed/tx 증가량과 재전송 비율 계산"""
+        if not prev or prev.get("bssid") != cur.get("bssid"):
+            return
+        for k in ("tx_retries", "tx_failed", "tx_packets"):
+            if cur.get(k) is not None and prev.get(k) is not None:
+                cur[f"d_{k}"] = (cur[k] - prev[k]) & 0xFFFFFFFF
+        dtx = cur.get("d_tx_packets")
+        if dtx:
+            cur["retry_ratio"] = round(cur.get("d_tx_retries", 0) / dtx, 3)
+
+    def run(self):
+        dev = None
+        next_t = time.monotonic()
+        while self.running:
+            try:
+                if dev is None:
+                    dev = Nl80211(self.iface)
+                sta = dev.get_station()
+                now = time.monotonic()
+                if sta:
+                    sta["ts"] = now
+                    self._derive(sta, self.latest)
+                    with self.lock:
+                        self.history.append((now, sta["bssid"], sta["signal"]))
+                self.latest = sta
+            except OSError as e:
+                self.errors += 1
+                if self.errors % 100 == 1:
+                    print(f"[NL80211] sample error: {e}")
+                if dev:
+                    dev.close()
+                dev = None
+                time.sleep(1.0)
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()
+
+    def stop(self):
+        self.running = False
+
+    def recent_signals(self, window_s):
+        now = time.monotonic()
+        with self.lock:
+            return [(t, b, s) for t, b, s in self.history if now - t <= window_s]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--replay":
+        with open(sys.argv[2]) as f:
+            bufs = [bytes.fromhex(line.strip()) for line in f if line.strip()]
+        for sta in parse_station_dump(bufs):
+            print(sta)
+    else:
+        iface = sys.argv[1] if len(sys.argv) > 1 else "wlan0"
+        dev = Nl80211(iface)
+        raw = []
+        print(dev.get_station(raw=raw))
+        if len(sys.argv) >= 4 and sys.argv[2] == "--record":
+            with open(sys.argv[3], "w") as f:
+                for buf in raw:
+                    f.write(buf.hex() + "\n")
+            print(f"[NL80211] recorded {len(raw)} buffer(s) to {sys.argv[3]}")
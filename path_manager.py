@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+정책 라우팅 기반 경로 관리자 — 경로 전환을 라우트 1개 교체로
+- 인터페이스별 라우팅 테이블: default via <gw> dev <iface>
+- rule (시작 시 1회):
+    from <iface IP> lookup <iface 테이블>        (해당 IP 에 bind 한 소켓)
+    fwmark <mark>   lookup <iface 테이블>        (SO_MARK 소켓)
+    to <관리 목적지> lookup <active 테이블>       (manage())
+    to <고정 목적지> lookup <iface 테이블>        (pin(), 예: 서버는 항상 eth0)
+- switch(iface): active 테이블의 default 라우트 1개 replace → 관리 목적지 전체가 동시에 전환
+- detach(): switch 실패 시 관리 목적지 rule 제거 → main 테이블 호스트 라우트로 대체 가능.
+  다음 switch 성공 시 rule 재설치
+- 전환 소요 시간 집계 (stats)
+
+    sudo ip rule show / ip route show table 100   # 확인
+"""
+
+import collections
+import errno
+import os
+import threading
+import time
+
+from netlink import NetlinkError
+
+DEFAULT_TABLES = {"eth0": (101, 1), "wlan0": (102, 2)}   # iface → (table, fwmark)
+
+
+class PathManager:
+    """
+    rtnl: rtnetlink.Rtnl, gateway_fn(iface) → gw, ip_fn(iface) → 주소 (없으면 None)
+    prio_base: 이 값부터 prio_base+99 까지의 rule 우선순위를 이 관리자가 소유 (시작 시 정리)
+    """
+
+    def __init__(self, rtnl, gateway_fn, ip_fn, tables=None, active_table=100, prio_base=1000):
+        self.rtnl = rtnl
+        self.gateway_fn = gateway_fn
+        self.ip_fn = ip_fn
+        self.tables = dict(tables or DEFAULT_TABLES)
+        self.active_table = active_table
+        self.prio_base = prio_base
+        self.src_ips = {}          # iface → 현재 from rule 에 쓰인 IP (없으면 테이블 미구성 = deferred)
+        self.lock = threading.Lock()   # refresh: 핸드오버 스레드와 주소 알림 스레드가 동시에 호출
+        self.managed = []
+        self.detached = False      # 관리 목적지 rule 을 내려 main 테이블을 따르는 중
+        self.pinned = {}
+        self.active = None
+        self.switch_ms = collections.deque(maxlen=256)
+        self.switches = 0
+        self.failures = 0
+
+    def _prio(self, kind, i=0):
+        return self.prio_base + {"pin": 0, "managed": 10, "src": 50, "mark": 70}[kind] + i
+
+    def cleanup(self):
+        """이전 실행이 남긴 rule (prio_base ~ prio_base+99) 제거"""
+        n = 0
+        for r in self.rtnl.rules():
+            if self.prio_base <= r["priority"] < self.prio_base + 100:
+                try:
+                    self.rtnl.rule_del(r["priority"])
+                    n += 1
+                except NetlinkError:
+                    pass
+        return n
+
+    def _table_route(self, iface, table):
+        gw = self.gateway_fn(iface)
+        self.rtnl.route_replace("0.0.0.0", 0, oif=iface, gateway=gw or None, table=table)
+        return gw
+
+    def refresh(self, iface):
+        """iface 테이블 default 라우트 + from rule 갱신 (주소/GW 변경 후, 예: 핸드오버 후 DHCP)"""
+        table, _mark = self.tables[iface]
+        ip = self.ip_fn(iface)
+        if not ip:
+            return False
+        with self.lock:
+            deferred = iface not in self.src_ips
+            try:
+                self._table_route(iface, table)
+                self._src_rule(iface, ip)
+            except NetlinkError as e:
+                print(f"[PATH] table {table} route for {iface} failed: {e}")
+                return False
+        if deferred:
+            print(f"[PATH] {iface}: table {table} ready ({ip})")
+        return True
+
+    def _src_rule(self, iface, ip):
+        """from <ip> lookup <iface 테이블> (주소가 바뀐 경우만 교체)"""
+        table, _mark = self.tables[iface]
+        idx = list(self.tables).index(iface)
+        old = self.src_ips.get(iface)
+        if old == ip:
+            return
+        if old:
+            try:
+                self.rtnl.rule_del(self._prio("src", idx))
+            except NetlinkError:
+                pass
+        self.rtnl.rule_add(self._prio("src", idx), table, src=ip)
+        self.src_ips[iface] = ip
+
+    def setup(self):
+        """시작 시 1회: 정리 → 인터페이스별 rule + 테이블 default 라우트 (라우트는 rtnetlink 요청 1번으로 일괄)"""
+        removed = self.cleanup()
+        if removed:
+            print(f"[PATH] removed {removed} stale rule(s)")
+        for idx, (iface, (table, mark)) in enumerate(self.tables.items()):
+            self.rtnl.rule_add(self._prio("mark", idx), table, fwmark=mark)
+        ready = [(iface, ip) for iface, ip in ((i, self.ip_fn(i)) for i in self.tables) if ip]
+        errs = self.rtnl.route_batch([
+            dict(dst="0.0.0.0", dst_len=0, oif=iface, gateway=self.gateway_fn(iface) or None,
+                 table=self.tables[iface][0])
+            for iface, _ip in ready
+        ]) if ready else []
+        filled = set()
+        for (iface, ip), err in zip(ready, errs):
+            if err:
+                print(f"[PATH] table {self.tables[iface][0]} route for {iface} failed: {os.strerror(err)}")
+                continue
+            self._src_rule(iface, ip)
+            filled.add(iface)
+        for iface, (table, _mark) in self.tables.items():
+            if iface not in filled:
+                print(f"[PATH] {iface}: no address yet, table {table} deferred")
+        print(f"[PATH] tables {self.tables}, active table {self.active_table}")
+
+    def manage(self, dst):
+        """dst 를 active 테이블 경로로 (switch() 를 따름)"""
+        if dst in self.managed:
+            return
+        self.rtnl.rule_add(self._prio("managed", len(self.managed)), self.active_table, dst=dst)
+        self.managed.append(dst)
+
+    def detach(self):
+        """
+        관리 목적지 rule 제거 (active 테이블이 옛 경로를 가리킨 채 switch 가 실패했을 때).
+        rule 이 남아 있으면 main 테이블 호스트 라우트는 적용되지 않음. 반환: 전부 제거했는지
+        """
+        ok = True
+        for i, dst in enumerate(self.managed):
+            try:
+                self.rtnl.rule_del(self._prio("managed", i), self.active_table, dst=dst)
+            except NetlinkError as e:
+                if e.errno != errno.ENOENT:
+                    print(f"[PATH] detach {dst} failed: {e}")
+                    ok = False
+        self.detached = self.detached or ok
+        if ok:
+            print(f"[PATH] detached {len(self.managed)} dst from table {self.active_table}")
+        return ok
+
+    def _attach(self):
+        for i, dst in enumerate(self.managed):
+            try:
+                self.rtnl.rule_add(self._prio("managed", i), self.active_table, dst=dst)
+            except NetlinkError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        self.detached = False
+        print(f"[PATH] re-attached {len(self.managed)} dst to table {self.active_table}")
+
+    def pin(self, dst, iface):
+        """dst 를 항상 iface 테이블로 (전환과 무관)"""
+        if dst in self.pinned:
+            return
+        table, _mark = self.tables[iface]
+        self.rtnl.rule_add(self._prio("pin", len(self.pinned)), table, dst=dst)
+        self.pinned[dst] = iface
+
+    def switch(self, iface):
+        """
+        active 테이블 default 라우트 교체 → 관리 목적지 전체 전환. 반환: 소요 ms (실패 시 None)
+        detach() 상태였으면 라우트 교체 후 rule 재설치. 시작 시 미뤄진(deferred) iface 테이블은 먼저 구성
+        """
+        if iface not in self.src_ips:
+            self.refresh(iface)
+        t0 = time.perf_counter()
+        try:
+            gw = self._table_route(iface, self.active_table)
+            if self.detached:
+                self._attach()
+        except NetlinkError as e:
+            self.failures += 1
+            print(f"[PATH] switch → {iface} failed: {e}")
+            if e.errno == errno.ENETUNREACH:
+                print(f"[PATH] gateway for {iface} not reachable (no address/carrier?)")
+            return None
+        ms = (time.perf_counter() - t0) * 1e3
+        self.active = iface
+        self.switches += 1
+        self.switch_ms.append(ms)
+        print(f"[PATH] active → {iface} via {gw or 'link'} ({ms:.2f} ms, {len(self.managed)} dst)")
+        return ms
+
+    def fwmark(self, iface):
+        return self.tables[iface][1]
+
+    def stats(self):
+        vals = sorted(self.switch_ms)
+        out = {"active": self.active, "switches": self.switches, "failures": self.failures,
+               "detached": self.detached,
+               "managed": list(self.managed), "last_ms": round(self.switch_ms[-1], 3) if vals else None}
+        for p in (50, 95, 99):
+            out[f"p{p}_ms"] = round(vals[min(len(vals) - 1, int(round(p / 100 * (len(vals) - 1))))], 3) \
+                if vals else None
+        return out
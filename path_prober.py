@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+인터페이스별 경로 품질 측정 (ping fork 대신 프로세스 내 ICMP echo)
+- 인터페이스마다 ICMP 소켓 1개 (SO_BINDTODEVICE): raw(CAP_NET_RAW) → 없으면 비특권 ICMP datagram
+  (net.ipv4.ping_group_range 허용 필요)
+- 대상(targets_fn(iface) → {"gw": ip, "dst": ip})별로 rate_hz 로 echo 송신, 응답을 seq 로 매칭
+- PathQuality: (iface, 대상 이름) 별 RTT(최근/EWMA/p50/p95) 와 최근 window 개 손실률 — 모든 스레드가 공유
+- wait_echo(iface, name, after): after 이후 송신한 echo 의 첫 응답 대기 → 경로 전환 후 "첫 echo" 신호.
+  kick(iface) 로 다음 주기를 기다리지 않고 바로 송신
+
+    sudo python3 path_prober.py eth0 192.168.11.1 10.100.30.21
+"""
+
+import collections
+import itertools
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_HDR = struct.Struct("!BBHHH")      # type, code, checksum, id, seq
+SO_BINDTODEVICE = 25
+SO_MARK = 36
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    s = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    s = (s >> 16) + (s & 0xFFFF)
+    s += s >> 16
+    return ~s & 0xFFFF
+
+
+def echo_request(ident, seq, payload=b""):
+    hdr = ICMP_HDR.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return ICMP_HDR.pack(ICMP_ECHO_REQUEST, 0, checksum(hdr + payload), ident, seq) + payload
+
+
+def open_icmp(iface, mark=None):
+    """
+    (소켓, raw 여부). raw 소켓 응답에는 IP 헤더 포함, datagram 소켓은 ICMP 부터.
+    mark: SO_MARK (정책 라우팅 fwmark rule → 이 인터페이스 테이블; CAP_NET_ADMIN 없으면 생략)
+    """
+    for stype in (socket.SOCK_RAW, socket.SOCK_DGRAM):
+        try:
+            sock = socket.socket(socket.AF_INET, stype, socket.IPPROTO_ICMP)
+        except PermissionError:
+            continue
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, bytes(f"{iface}\0", "utf-8"))
+        except OSError:
+            sock.close()
+            raise
+        if mark:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_MARK, mark)
+            except PermissionError:
+                pass
+        sock.setblocking(False)
+        return sock, stype == socket.SOCK_RAW
+    raise PermissionError("ICMP socket needs CAP_NET_RAW or net.ipv4.ping_group_range")
+
+
+class PathQuality:
+    """(iface, 대상 이름) → 최근 측정. 조회는 snapshot()"""
+
+    def __init__(self, window=20, ewma=0.2):
+        self.window = window
+        self.ewma = ewma
+        self.cond = threading.Condition()
+        self.entries = {}
+
+    def _entry(self, key, ip):
+        e = self.entries.get(key)
+        if e is None or e["ip"] != ip:
+            e = self.entries[key] = {"ip": ip, "sent": 0, "recv": 0, "rtt_ms": None, "rtt_ewma_ms": None,
+                                     "results": collections.deque(maxlen=self.window),   # RTT ms 또는 None(손실)
+                                     "last_reply": 0.0, "last_reply_sent": 0.0}
+        return e
+
+    def sent(self, key, ip):
+        with self.cond:
+            self._entry(key, ip)["sent"] += 1
+
+    def reply(self, key, ip, t_sent, rtt_ms):
+        with self.cond:
+            e = self._entry(key, ip)
+            e["recv"] += 1
+            e["rtt_ms"] = rtt_ms
+            e["rtt_ewma_ms"] = rtt_ms if e["rtt_ewma_ms"] is None else \
+                e["rtt_ewma_ms"] + self.ewma * (rtt_ms - e["rtt_ewma_ms"])
+            e["results"].append(rtt_ms)
+            e["last_reply"] = time.monotonic()
+            e["last_reply_sent"] = max(e["last_reply_sent"], t_sent)
+            self.cond.notify_all()
+
+    def lost(self, key, ip):
+        with self.cond:
+            self._entry(key, ip)["results"].append(None)
+
+    def wait_reply(self, key, after, timeout, cancel=None):
+        """after(monotonic) 이후 송신한 echo 의 응답 대기 → True/False"""
+        def ok():
+            e = self.entries.get(key)
+            return (e is not None and e["last_reply_sent"] >= after) or (cancel is not None and cancel.is_set())
+        with self.cond:
+            self.cond.wait_for(ok, timeout)
+            e = self.entries.get(key)
+            return e is not None and e["last_reply_sent"] >= after
+
+    def snapshot(self):
+        """{iface: {name: {ip, rtt_ms, rtt_ewma_ms, p50_ms, p95_ms, loss, sent, recv, age_s}}}"""
+        now = time.monotonic()
+        out = {}
+        with self.cond:
+            items = [(k, dict(e), list(e["results"])) for k, e in self.entries.items()]
+        for (iface, name), e, results in items:
+            rtts = sorted(r for r in results if r is not None)
+            pct = lambda p: round(rtts[min(len(rtts) - 1, int(round(p / 100 * (len(rtts) - 1))))], 3) \
+                if rtts else None
+            out.setdefault(iface, {})[name] = {
+                "ip": e["ip"],
+                "rtt_ms": round(e["rtt_ms"], 3) if e["rtt_ms"] is not None else None,
+                "rtt_ewma_ms": round(e["rtt_ewma_ms"], 3) if e["rtt_ewma_ms"] is not None else None,
+                "p50_ms": pct(50), "p95_ms": pct(95),
+                "loss": round(1 - len(rtts) / len(results), 3) if results else None,
+                "sent": e["sent"], "recv": e["recv"],
+                "age_s": round(now - e["last_reply"], 2) if e["last_reply"] else None,
+            }
+        return out
+
+
+class PathProber(threading.Thread):
+    """
+    targets_fn(iface) → {이름: ip} (ip 가 없으면 그 대상은 건너뜀), rate_hz: 대상당 초당 echo 수,
+    timeout_s: 응답 없으면 손실 처리, marks: iface → fwmark (비활성 경로도 그 인터페이스 테이블로)
+    """
+
+    def __init__(self, ifaces, targets_fn, rate_hz=5.0, timeout_s=1.0, window=20, payload_size=16, marks=None):
+        super().__init__(daemon=True)
+        self.ifaces = list(ifaces)
+        self.targets_fn = targets_fn
+        self.period = 1.0 / rate_hz
+        self.timeout_s = timeout_s
+        self.marks = dict(marks or {})
+        self.quality = PathQuality(window=window)
+        self.payload = b"\xa5" * payload_size
+        self.icmp_id = os.getpid() & 0xFFFF
+        self.seq = itertools.count(1)
+        self.socks = {}           # iface → (sock, raw)
+        self.inflight = {}        # (iface, seq) → (name, ip, t_sent)
+        self.next_due = {}        # iface → monotonic
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        self.running = True
+
+    # ---- 외부 ----
+    def kick(self, iface):
+        """iface 대상 전체에 바로 echo 송신 (경로 전환 직후)"""
+        with self.lock:
+            self.next_due[iface] = 0.0
+        self._wake()
+
+    def wait_echo(self, iface, name, after, timeout, cancel=None):
+        """after 이후 송신한 echo 응답까지 대기 → 응답 시각 기준 after 부터 ms (타임아웃이면 None)"""
+        if not self.quality.wait_reply((iface, name), after, timeout, cancel):
+            return None
+        return (self.quality.entries[(iface, name)]["last_reply"] - after) * 1e3
+
+    def snapshot(self):
+        return self.quality.snapshot()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+
+    # ---- 내부 ----
+    def _wake(self):
+        try:
+            os.write(self.wake_w, b"k")
+        except BlockingIOError:
+            pass
+
+    def _sock(self, iface):
+        s = self.socks.get(iface)
+        if s is None:
+            try:
+                s = self.socks[iface] = open_icmp(iface, self.marks.get(iface))
+            except OSError as e:
+                if iface not in self.failed:      # 인터페이스 없음 등: 최초 1회만 출력
+                    print(f"[PROBE] {iface}: {e}")
+                    self.failed.add(iface)
+                return None
+            self.failed.discard(iface)
+        return s
+
+    def _close(self, iface):
+        s = self.socks.pop(iface, None)
+        if s:
+            s[0].close()
+
+    def _send(self, iface, now):
+        s = self._sock(iface)
+        if s is None:
+            return
+        try:
+            targets = self.targets_fn(iface) or {}
+        except Exception as e:
+            print(f"[PROBE] targets for {iface}: {e}")
+            return
+        for name, ip in targets.items():
+            if not ip:
+                continue
+            seq = next(self.seq) & 0xFFFF
+            try:
+                s[0].sendto(echo_request(self.icmp_id, seq, self.payload), (ip, 0))
+            except OSError:
+                # 주소 없음/네트워크 도달 불가 (예: 핸드오버 중 wlan0): 손실로 기록
+                self.quality.sent((iface, name), ip)
+                self.quality.lost((iface, name), ip)
+                continue
+            self.inflight[(iface, seq)] = (name, ip, now)
+            self.quality.sent((iface, name), ip)
+
+    def _recv(self, iface, sock, raw):
+        now = time.monotonic()
+        while True:
+            try:
+                data, (src, _port) = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self._close(iface)
+                return
+            off = (data[0] & 0x0F) * 4 if raw else 0
+            if len(data) < off + ICMP_HDR.size:
+                continue
+            itype, _code, _ck, ident, seq = ICMP_HDR.unpack_from(data, off)
+            # datagram 소켓은 커널이 id 를 바꾸고 이 소켓 응답만 전달
+            if itype != ICMP_ECHO_REPLY or (raw and ident != self.icmp_id):
+                continue
+            entry = self.inflight.pop((iface, seq), None)
+            if entry and entry[1] == src:
+                name, ip, t_sent = entry
+                self.quality.reply((iface, name), ip, t_sent, (now - t_sent) * 1e3)
+
+    def _expire(self, now):
+        for key, (name, ip, t_sent) in list(self.inflight.items()):
+            if now - t_sent > self.timeout_s:
+                del self.inflight[key]
+                self.quality.lost((key[0], name), ip)
+
+    def run(self):
+        while self.running:
+            now = time.monotonic()
+            with self.lock:
+                due = [i for i in self.ifaces if self.next_due.get(i, 0.0) <= now]
+                for iface in due:
+                    self.next_due[iface] = now + self.period
+            for iface in due:
+                self._send(iface, now)
+            self._expire(now)
+
+            fds = {s[0].fileno(): (iface, s[0], s[1]) for iface, s in self.socks.items()}
+            with self.lock:
+                wait = max(0.0, min(self.next_due.values(), default=now + self.period) - time.monotonic())
+            try:
+                readable, _, _ = select.select(list(fds) + [self.wake_r], [], [], wait)
+            except OSError:
+                continue
+            for fd in readable:
+                if fd == self.wake_r:
+                    os.read(self.wake_r, 64)
+                else:
+                    self._recv(*fds[fd])
+
+
+if __name__ == "__main__":
+    iface = sys.argv[1] if len(sys.argv) > 1 else "eth0"
+    targets = {f"t{i}": ip for i, ip in enumerate(sys.argv[2:] or ["127.0.0.1"])}
+    prober = PathProber([iface], lambda _i: targets, rate_hz=5)
+    prober.start()
+    while True:
+        time.sleep(2)
+        for name, st in prober.snapshot().get(iface, {}).items():
+            print(f"{iface} {name} {st['ip']}: rtt={st['rtt_ms']} p95={st['p95_ms']} loss={st['loss']} "
+                  f"({st['recv']}/{st['sent']})")
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
+import collections
 import threading
+import multiprocessing
 import socket
-import psutil
+import struct
 import time
 import socketio  # pip install "python-socketio[client]"
 from datetime import datetime
 import config as cfg
+from udp_flow_stats import FlowAnalytics, merge_reports
+from mmsg import MmsgReceiver, set_rcvbuf, SO_RXQ_OVFL
+from rate_estimator import RateEstimator, nic_counter
 
 SERVER_URL = 'http://10.100.30.241:6789'
 # SERVER_URL = "https://6b08ef0ec81e.ngrok.app" # ngrok
@@ -13,6 +18,16 @@ SERVER_URL = 'http://10.100.30.241:6789'
 # to_id = 0 #same as ca_id
 to_id = cfg.to_id
 
+# 흐름별 수신 통계 (udp_server 가 채우고 메인 루프가 보고)
+flow_analytics = FlowAnalytics()
+
+# 고속 수신 모드
+UDP_RX_WORKERS = 0                  # 0: 단일 스레드 recvfrom, N: SO_REUSEPORT 워커 프로세스 N개 (recvmmsg)
+UDP_RX_BATCH = 64                   # recvmmsg 1회 최대 datagram 수
+UDP_RX_BUF_SIZE = 2048              # datagram 당 수신 버퍼 (생성기 패킷 1200B)
+UDP_RX_RCVBUF = 8 * 1024 * 1024     # SO_RCVBUF 목표 크기
+UDP_RX_POLL_S = 0.2                 # 워커 recvmmsg 타임아웃 (보고 주기 확인용)
+
 sio = socketio.Client(
     reconnection=True,
     reconnection_attempts=0,
@@ -51,54 +66,130 @@ def socketio_reconnect_watchdog():
             time.sleep(10)  # 재시도 간격 늘려줌
         time.sleep(3)
 
-def get_throughput(interval=5, iface=None):
-    """
-    interval: 측정 주기 (초)
-    iface: 특정 인터페이스 지정 (예: "eth0"), None이면 전체 합산
-    """
-    # 첫 번째 측정
-    net1 = psutil.net_io_counters(pernic=True if iface else False)
-    if iface:
-        net1 = net1[iface]
-    bytes_recv1 = net1.bytes_recv
-    bytes_sent1 = net1.bytes_sent
-
-    time.sleep(interval)
+class SocketDrops:
+    """SO_RXQ_OVFL 누적 드롭 → delta() 로 (직전 조회 이후 드롭, 누적)"""
+    def __init__(self):
+        self.total = 0
+        self._reported = 0
 
-    # 두 번째 측정
-    net2 = psutil.net_io_counters(pernic=True if iface else False)
-    if iface:
-        net2 = net2[iface]
-    bytes_recv2 = net2.bytes_recv
-    bytes_sent2 = net2.bytes_sent
+    def delta(self):
+        total = self.total
+        d = total - self._reported
+        self._reported = total
+        return d, total
 
-    # 전송량 차이
-    delta_recv = bytes_recv2 - bytes_recv1
-    delta_sent = bytes_sent2 - bytes_sent1
-
-    # 초당 byte → Mbps 변환
-    recv_mbps = (delta_recv * 8) / (interval * 1e6)
-    sent_mbps = (delta_sent * 8) / (interval * 1e6)
-
-    return recv_mbps, sent_mbps
+server_drops = SocketDrops()   # 단일 스레드 udp_server 소켓 드롭
 
 def udp_server(host="0.0.0.0", port=5001, buffer_size=65535):
     """
     간단한 UDP 서버 (iperf -s -u 와 유사)
     클라이언트가 여러 번 실행되어도 매번 수신 가능.
+    recvmsg + SO_RXQ_OVFL 로 소켓 큐 overflow 드롭도 집계 (server_drops)
     """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
+        rcvbuf = set_rcvbuf(sock, UDP_RX_RCVBUF)
+        ancbuf = 0
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            ancbuf = socket.CMSG_SPACE(4)
+        except OSError as e:
+            print(f"SO_RXQ_OVFL unavailable: {e}")
         sock.bind((host, port))
-        print(f"UDP server listening on {host}:{port}")
+        print(f"UDP server listening on {host}:{port} (rcvbuf={rcvbuf})")
         while True:
-            data, addr = sock.recvfrom(buffer_size)
-            # 필요하면 처리 로직 추가
+            data, anc, _flags, addr = sock.recvmsg(buffer_size, ancbuf)
+            for level, ctype, cdata in anc:
+                if level == socket.SOL_SOCKET and ctype == SO_RXQ_OVFL and len(cdata) >= 4:
+                    (server_drops.total,) = struct.unpack_from("I", cdata)
+            flow_analytics.ingest(data, addr, time.monotonic_ns(), time.time_ns())
     except KeyboardInterrupt:
         print("\nServer stopped by user.")
     finally:
         sock.close()
 
+def udp_rx_worker(worker_id, host, port, report_q, interval):
+    """
+    SO_REUSEPORT 수신 워커 (별도 프로세스).
+    recvmmsg 로 일괄 수신 → 자체 FlowAnalytics 집계 → interval 마다 부모로 전달.
+    커널이 4-tuple 해시로 소켓을 고르므로 한 흐름은 항상 같은 워커에 도착.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    rcvbuf = set_rcvbuf(sock, UDP_RX_RCVBUF)
+    sec = int(UDP_RX_POLL_S)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO,
+                    struct.pack("ll", sec, int((UDP_RX_POLL_S - sec) * 1e6)))
+    sock.bind((host, port))
+    rx = MmsgReceiver(sock, UDP_RX_BATCH, UDP_RX_BUF_SIZE)
+    analytics = FlowAnalytics()
+    print(f"[RX{worker_id}] listening on {host}:{port} (rcvbuf={rcvbuf}, batch={UDP_RX_BATCH})")
+
+    next_report = time.monotonic() + interval
+    try:
+        while True:
+            n = rx.recv()
+            if n:
+                arr_mono, arr_wall = time.monotonic_ns(), time.time_ns()
+                for i in range(n):
+                    analytics.ingest(rx.data(i), rx.addr(i), arr_mono, arr_wall)
+            now = time.monotonic()
+            if now >= next_report:
+                report_q.put((worker_id, analytics.report(interval, now), rx.drops))
+                next_report += interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rx.close()
+        sock.close()
+
+class UdpWorkerPool:
+    """
+    udp_rx_worker 프로세스 N개를 띄우고 결과를 모음.
+    report() 는 FlowAnalytics.report 와 같은 형태(흐름 리스트)를 반환.
+    워커 보고는 자체 주기로 도착하므로 report() 사이에 쌓인 보고를 모두 흐름별로 합침.
+    SO_REUSEPORT 는 송신 주소로 워커를 고르므로, 핸드오버 전후 패킷이 다른 워커에 집계될 수 있음
+    (전환 구간 손실/중복을 정확히 보려면 단일 스레드 모드)
+    """
+    def __init__(self, workers, host="0.0.0.0", port=5001, interval=5):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.queue = multiprocessing.Queue()
+        self.procs = []
+        self.lock = threading.Lock()
+        self.pending = collections.defaultdict(list)   # worker_id → 아직 보고 안 된 흐름 리스트들
+        self.drops = {}        # worker_id → 소켓 overflow 누적 드롭
+        self.drop_counter = SocketDrops()
+
+    def start(self):
+        for wid in range(self.workers):
+            p = multiprocessing.Process(target=udp_rx_worker, daemon=True,
+                                        args=(wid, self.host, self.port, self.queue, self.interval))
+            p.start()
+            self.procs.append(p)
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def _collect(self):
+        while True:
+            wid, flows, drops = self.queue.get()
+            with self.lock:
+                self.pending[wid].append(flows)
+                self.drops[wid] = drops
+
+    def report(self, interval_s, now_mono):
+        with self.lock:
+            reports = [fl for fls in self.pending.values() for fl in fls]
+            self.pending.clear()
+        return merge_reports(reports, interval_s)
+
+    def socket_drops(self):
+        """(구간 드롭, 누적 드롭): 네트워크 손실과 분리된 수신 소켓 overflow"""
+        with self.lock:
+            self.drop_counter.total = sum(self.drops.values())
+        return self.drop_counter.delta()
+
 @sio.event
 def connect():
     print('Connected to server.')
@@ -109,22 +200,60 @@ def disconnect():
 
 if __name__ == "__main__":
 
-    threading.Thread(target=socketio_reconnect_watchdog, daemon=True).start()
-    threading.Thread(target=udp_server, kwargs={'port': 5001}, daemon=True).start()
-
     iface = "enp1s0"  # 모니터링할 인터페이스 (None이면 전체)
-    interval = 5    # 5초 평균
+    interval = 5    # 보고 주기 (초)
+    sample_period = 0.1  # 카운터 샘플링 주기 (초), 보고와 독립
+
+    # 워커 프로세스는 다른 스레드 시작 전에 fork
+    rx_pool = None
+    if UDP_RX_WORKERS > 0:
+        rx_pool = UdpWorkerPool(UDP_RX_WORKERS, port=5001, interval=interval)
+        rx_pool.start()
+
+    rate_est = RateEstimator(nic_counter(iface), period_s=sample_period,
+                             capacity=int(60 / sample_period))
+    rate_est.start()
 
+    threading.Thread(target=socketio_reconnect_watchdog, daemon=True).start()
+    if rx_pool is None:
+        threading.Thread(target=udp_server, kwargs={'port': 5001}, daemon=True).start()
+
+    last_report = time.monotonic()
     while True:
-        recv, sent = get_throughput(interval, iface)
+        time.sleep(interval)
+        now_mono = time.monotonic()
+        elapsed, last_report = now_mono - last_report, now_mono   # 처리 시간만큼 interval 보다 김
+        recv = rate_est.rate(interval, "recv") or 0.0
+        sent = rate_est.rate(interval, "sent") or 0.0
+        recv_stats = rate_est.stats(interval, "recv")
+        iface_rate = {
+            "100ms": rate_est.rate(0.1, "recv"),
+            "1s": rate_est.rate(1.0, "recv"),
+            "5s": rate_est.rate(5.0, "recv"),
+            "window": recv_stats,
+        }
         print(f"[{iface}] Incoming: {recv:.2f} Mbps | Outgoing: {sent:.2f} Mbps")
+        if recv_stats:
+            print(f"[{iface}] {sample_period * 1000:.0f}ms min/p5/max: "
+                  f"{recv_stats['min']:.2f}/{recv_stats['p5']:.2f}/{recv_stats['max']:.2f} Mbps")
+
+        # 인터페이스 카운터 대신 측정 흐름 goodput 합계를 throughput 으로 보고
+        rx_stats = rx_pool if rx_pool else flow_analytics
+        flows = rx_stats.report(elapsed, now_mono)
+        goodput = sum(f["goodput_mbps"] for f in flows)
+        drops, drops_total = rx_pool.socket_drops() if rx_pool else server_drops.delta()
 
         time_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         pf_data = {
             "timestamp": time_now,
             "data": {
                 "ca_id": to_id,
-                "throughput": recv
+                "throughput": goodput,
+                "iface_throughput": recv,
+                "iface_rate": iface_rate,
+                "socket_drops": drops,
+                "socket_drops_total": drops_total,
+                "flows": flows
             }
         }
         print(pf_data)
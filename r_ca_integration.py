@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
 import sys
+import errno
 import time
 import json
+import zlib
 import socket
 import signal
 import subprocess
@@ -16,6 +17,25 @@ from urllib.parse import urlparse
 # 사용자 정의 config
 import config as cfg
 from config import ca_id, to_id
+from udp_traffic import TokenBucketPacer, PayloadRing
+from mmsg import make_batch_sender, auto_batch_size
+import udp_header
+from wpa_ctrl import WpaCtrl, WpaCtrlError
+from wifi_state import LinkState, WpaEventMonitor
+from nl80211 import StationSampler
+from signal_filter import SignalFilterBank
+from scan_planner import ScanPlanner
+from handover_policy import HandoverPolicy, HandoverPolicyEngine
+from rssi_forecast import RssiForecaster
+from handover_timeline import HandoverTimer, TimelineLog
+from handover_fsm import HandoverStateMachine, Step, ASSOCIATED, ADDRESSED, ROUTED, STREAMING
+from handover_queue import HandoverQueue
+from scan_gate import ScanGate
+from path_manager import PathManager
+from rtnetlink import NetCache, Rtnl, NUD_VALID, NUD_REACHABLE, NUD_PERMANENT, NUD_NOARP
+from lease_cache import LeaseCache
+from path_prober import PathProber
+from netlink import NetlinkError
 
 AP_INFO = {
     1: {'ap_id':1, 'bssid': 'ec:5a:31:99:ee:99'},
@@ -54,7 +74,67 @@ CAMERA_HEIGHT = 720
 CAMERA_FPS = 30
 CAMERA_PORT = 5000
 UDP_PORT = 6001
+WPA_CTRL_PATH = f"/var/run/wpa_supplicant/{USE_INTERFACE_WLAN}"   # wpa_supplicant 제어 소켓
+WPA_SIGNAL_MONITOR = "THRESHOLD=-70 HYSTERESIS=4"   # 연결 AP 신호 변화 이벤트 (빈 문자열이면 끔)
+SENSING_INTERVAL_S = 10.0       # 이벤트가 없어도 이 주기로 robot_ss_data 발행
+SENSING_MIN_INTERVAL_S = 1.0    # 이벤트 폭주 시 최소 발행 간격
+STATION_SAMPLE_HZ = 10.0        # nl80211 연결 AP signal/bitrate/retry 샘플링 주기
+RSSI_FILTER = "sma"             # "sma" | "ewma" | "kalman"
+RSSI_STALE_S = 60.0             # 이 시간 동안 스캔에 안 보인 BSSID 는 필터에서 제거
+RSSI_TRACK_AP_INFO_ONLY = True  # True: AP_INFO BSSID 만 추적
+RSSI_SSID_WHITELIST = None      # 예: {"HSLSV"} → 해당 SSID 도 추적
+SCAN_INTERVAL_S = 10.0          # 스캔 주기
+SCAN_IMMINENT_INTERVAL_S = 2.0  # handover_imminent 동안 스캔 주기 (후보 RSSI 를 최신으로)
+SCAN_FULL_INTERVAL_S = 120.0    # 전체(모든 채널) 스캔 최소 주기, 그 사이는 AP_INFO 채널만
+SCAN_TIMEOUT_S = 8.0            # 스캔 결과 이벤트 대기 상한
+SCAN_ABORT_WAIT_S = 1.0         # 핸드오버 선점 시 ABORT_SCAN 후 스캔 종료 대기 상한
+
+# 로봇 자체 핸드오버 정책 (서버 command 는 항상 우선)
+AUTO_HANDOVER = False           # True: 정책 엔진이 직접 handover_ap 호출
+POLICY_MARGIN_DB = 6.0          # 히스테리시스 마진
+POLICY_TTT_S = 2.0              # time-to-trigger
+POLICY_MIN_DWELL_S = 10.0       # 직전 핸드오버 후 최소 체류
+POLICY_TRIGGER_DBM = None       # 예: -70 → 현재 AP 가 -70 dBm 보다 나쁠 때만 전환
+POLICY_OVERRIDE_HOLD_S = 30.0   # 서버 command 수신 후 자체 결정 중지 시간
+FORECAST_METHOD = "theil_sen"    # "linear" | "theil_sen" (RSSI 추세 회귀)
+FORECAST_WINDOW_S = 3.0          # 회귀 구간 (nl80211 샘플). rssi_forecast.py 벤치마크 참고
+FORECAST_THRESHOLD_DBM = -72.0   # 이 값 도달 예상 시점을 예측
+FORECAST_LEAD_S = 3.5            # 도달 예상까지 이 시간 이하이면 "handover imminent" (실제 리드 ≥ 3 s 목표)
+FORECAST_PERIOD_S = 0.2          # 예측 주기
+RSSI_TRACE_FILE = None           # 예: "rssi_trace.csv" → 연결 AP signal 기록 (rssi_forecast.py 벤치마크용)
+HO_TIMELINE_CAPACITY = 64        # 최근 핸드오버 타임라인 보관 수
+HO_ASSOC_TIMEOUT_S = 10.0        # ROAMING → ASSOCIATED (CTRL-EVENT-CONNECTED) 대기 상한
+HO_ADDR_TIMEOUT_S = 10.0         # ASSOCIATED → ADDRESSED (wlan0 IPv4 주소) 대기 상한
+HO_UDP_START_TIMEOUT_S = 2.0     # ROUTED → STREAMING (첫 UDP 송신) 대기 상한
+HO_CARRIER_TIMEOUT_S = 2.0       # 유선 복귀 시 eth0 carrier up 대기 상한
+PATH_POLICY_ROUTING = True       # True: 테이블/rule 기반 경로 전환 (False 또는 실패 시 호스트 라우트 교체)
+PATH_TABLES = {USE_INTERFACE_ETH: (101, 1), USE_INTERFACE_WLAN: (102, 2)}   # iface → (table, fwmark)
+PATH_ACTIVE_TABLE = 100          # 관리 목적지(TARGET_TO_IP)가 따르는 테이블
+PATH_RULE_PRIO = 1000            # 이 관리자가 소유하는 rule 우선순위 시작값 (~+99)
+NEIGH_PREWARM = True             # 라우트 전환 전 다음 홉 이웃(ARP) 항목 해석
+NEIGH_RESOLVE_TIMEOUT_S = 0.5    # 이웃 해석 대기 상한 (넘기면 해석 없이 전환)
+NEIGH_PIN = True                 # 해석된 MAC 으로 REACHABLE 갱신 (전환 직후 DELAY/PROBE 재확인 방지)
+PROBE_ENABLED = True             # 프로세스 내 ICMP echo 로 eth0/wlan0 경로 품질 측정
+PROBE_RATE_HZ = 5.0              # 대상(GW, TARGET_TO_IP)·인터페이스당 초당 echo 수
+PROBE_TIMEOUT_S = 1.0            # 응답 없으면 손실
+PROBE_WINDOW = 20                # 손실률/RTT 백분위 계산 구간 (최근 echo 수)
+HO_ECHO_TARGET = "gw"            # 경로 전환 후 첫 echo 확인 대상: "gw" | "dst"(TARGET_TO_IP)
+HO_ECHO_TIMEOUT_S = 1.0          # STREAMING 후 첫 echo 대기 상한 (넘기면 "streaming-timeout")
+LEASE_CACHE_FILE = "lease_cache.json"   # BSSID/ESS 별 마지막 lease (None 이면 캐시 미사용)
+LEASE_VALIDATE_S = 5.0           # 캐시 주소 적용 후 DHCP 가 다른 주소를 주는지 지켜보는 시간
+LEASE_GW_TIMEOUT_S = 1.0         # 캐시 lease 의 GW 가 ARP 에 응답해야 하는 시간 (없으면 무효화)
+LEASE_STATIC_TTL_S = 86400       # 수명 정보가 없는 주소(정적 설정)의 캐시 유효 기간
+LEASE_DHCP_CMD = None            # 예: ["sudo", "dhcpcd", "-n", "wlan0"] → INIT-REBOOT 재확인 (rapid_commit 은 dhcpcd.conf)
 UDP_BITRATE_MBPS = 10.0
+UDP_BURST_BYTES = 12000      # 토큰 버킷 크기 (연속 송신 허용량)
+UDP_MAX_BACKLOG_S = 0.2      # 스톨 후 따라잡을 최대 밀린 시간
+UDP_RATE_REPORT_S = 5.0      # 달성률 출력 주기
+UDP_BATCH_MODE = "sendmmsg"  # "sendmmsg" | "gso" | "loop" | "off"(패킷당 sendto)
+UDP_BATCH_TARGET_S = 1e-3    # 배치 1회가 담당할 송신 시간 → 배치 크기 자동 결정
+UDP_POOL_IFACES = (USE_INTERFACE_ETH, USE_INTERFACE_WLAN)   # 소켓을 항상 열어 둘 후보 (update() = 포인터 교체)
+UDP_OPEN_RETRY_S = (0.05, 2.0)  # 주소는 있는데 소켓 열기 실패 시 재시도 간격 (시작, 상한) — 2배씩 증가
+UDP_OVERLAP_S = 0.0          # >0: 경로 전환 후 이 시간(또는 첫 echo 확인)까지 이전 경로로도 같은 패킷 송신
+UDP_PAYLOAD_FILL = "random"  # "random"(최초 1회) | "zeros" | b"..." 반복 패턴
 TARGET_TO_IP = next((item['to_ip'] for item in TO_IP_LIST if item['to_id'] == to_id), None)
 
 # 인터페이스별 GW 오버라이드
@@ -65,14 +145,37 @@ GW_OVERRIDE = {
 print(TARGET_TO_IP)
 
 robot_id = ca_id
-scan_lock = threading.Lock()
 last_handover_time = 0
-rssi_history = {}
+rssi_latest = {}     # 최근 스캔 결과 필터 값 (bssid → rssi)
 MOVING_AVG_N = 4
+rssi_filter = SignalFilterBank(
+    kind=RSSI_FILTER, window=MOVING_AVG_N, stale_s=RSSI_STALE_S,
+    bssids=[ap['bssid'] for ap in AP_INFO.values()] if RSSI_TRACK_AP_INFO_ONLY else None,
+    ssids=RSSI_SSID_WHITELIST,
+)
 
 # 전역 객체
+rtnl = Rtnl()                  # ip route/addr 대신 rtnetlink 직접 (CAP_NET_ADMIN)
+# eth0/wlan0 링크·주소·라우트 캐시 (알림으로 갱신, 모든 조회가 공유)
+net_cache = NetCache(ifaces=(USE_INTERFACE_ETH, USE_INTERFACE_WLAN))
+path_mgr = None                # 정책 라우팅 경로 관리자 (start_path_manager)
+prober = None                  # 경로 품질 측정 (start_prober)
 camera = None
 udpgen = None
+wpa = WpaCtrl(WPA_CTRL_PATH)   # wpa_cli 대신 제어 소켓 상시 연결
+link_state = LinkState()       # wpa_supplicant 이벤트로 갱신되는 링크 상태
+wpa_monitor = None
+station = StationSampler(USE_INTERFACE_WLAN, hz=STATION_SAMPLE_HZ)   # 연결 AP 고속 샘플링
+scan_planner = ScanPlanner([ap['bssid'] for ap in AP_INFO.values()], full_interval_s=SCAN_FULL_INTERVAL_S)
+policy_engine = None
+forecaster = RssiForecaster(method=FORECAST_METHOD, window_s=FORECAST_WINDOW_S,
+                            threshold_dbm=FORECAST_THRESHOLD_DBM, lead_s=FORECAST_LEAD_S)
+handover_imminent = threading.Event()   # 연결 AP 신호가 곧 임계치 아래로 떨어질 것으로 예측됨
+forecast_latest = None                  # 최근 예측 결과 (sensing 보고용)
+ho_timeline = TimelineLog(capacity=HO_TIMELINE_CAPACITY)
+ho_fsm = HandoverStateMachine()
+lease_cache = LeaseCache(LEASE_CACHE_FILE) if LEASE_CACHE_FILE else None
+lease_applied = {}             # iface → 캐시에서 적용한 lease (DHCP 확인 전)
 
 # ----------- Utils --------------
 def sh(cmd: list, check=True, capture=False):
@@ -91,11 +194,10 @@ def sh(cmd: list, check=True, capture=False):
         return ""
 
 def get_ip_from_interface(iface):
-    result = subprocess.getoutput(f"ip addr show dev {iface}")
-    for line in result.splitlines():
-        if "inet " in line:
-            return line.strip().split()[1].split("/")[0]
-    return "0.0.0.0"
+    """캐시 준비 전(시작 직후)에만 커널에 직접 조회"""
+    if net_cache.ready.is_set():
+        return net_cache.ipv4(iface) or "0.0.0.0"
+    return rtnl.ipv4(iface) or "0.0.0.0"
 
 def host_from_url(url: str) -> str:
     try:
@@ -120,14 +222,19 @@ def get_gw_for_iface(iface: str) -> str:
     """
     해당 인터페이스의 default gateway(IP) 조회.
     """
-    out = subprocess.getoutput("ip -4 route show default")
-    for line in out.splitlines():
-        # 예: "default via 10.100.30.1 dev eth0 proto dhcp ..."
-        if f" dev {iface} " in f" {line} " or line.strip().endswith(f" dev {iface}"):
-            parts = line.split()
-            if "via" in parts:
-                return parts[parts.index("via")+1]
-    return ""  # 게이트웨이 없으면 빈 문자열
+    if net_cache.ready.is_set():
+        return net_cache.gateway(iface) or ""
+    return rtnl.default_gateway(iface) or ""  # 게이트웨이 없으면 빈 문자열
+
+def iface_ip(iface):
+    """get_ip_from_interface 와 같지만 주소가 없으면 None"""
+    ip = get_ip_from_interface(iface)
+    return None if ip == "0.0.0.0" else ip
+
+def iface_gateway(iface: str) -> str:
+    """① GW 오버라이드 ② 캐시에서 적용한 lease 의 GW ③ 시스템 라우팅 테이블의 default GW"""
+    lease = lease_applied.get(iface)
+    return GW_OVERRIDE.get(iface, "") or (lease and lease["gateway"]) or get_gw_for_iface(iface)
 
 def route_replace_host(dest_ip: str, iface: str):
     """
@@ -135,26 +242,163 @@ def route_replace_host(dest_ip: str, iface: str):
     - iface에 대한 GW 오버라이드가 있으면 그걸 via로 사용
     - 없으면 해당 iface의 default gateway를 탐색
     - 둘 다 없으면 on-link 전송(scope link)
+    반환: 교체 후 커널 조회 결과가 iface 를 가리키는지
     """
     if not dest_ip or not iface:
+        return False
+
+    gw = iface_gateway(iface)
+
+    try:
+        rtnl.route_replace(dest_ip, 32, oif=iface, gateway=gw or None)
+    except NetlinkError as e:
+        if e.errno != errno.EPERM:
+            print(f"[ROUTE] replace {dest_ip} dev {iface} failed: {e}")
+            return False
+        # CAP_NET_ADMIN 없이 실행된 경우: 기존 sudo ip 경로
+        if gw:
+            cmd = ["sudo", "ip", "route", "replace", f"{dest_ip}/32", "via", gw, "dev", iface]
+        else:
+            cmd = ["sudo", "ip", "route", "replace", f"{dest_ip}/32", "dev", iface, "scope", "link"]
+        sh(cmd, check=False)
+    except OSError as e:        # 인터페이스 없음 (if_nametoindex)
+        print(f"[ROUTE] replace {dest_ip} dev {iface} failed: {e}")
+        return False
+    try:
+        got = rtnl.route_get(dest_ip)
+    except OSError as e:        # NetlinkError 포함 (예: 핸드오버 중 ENETUNREACH)
+        print(f"[ROUTE] get {dest_ip} failed: {e}")
+        return False
+    if got:
+        print(f"[ROUTE] {dest_ip} -> via {got['gateway']} dev {got['oif']} src {got['prefsrc']}")
+    return bool(got) and got["oif"] == iface
+
+def start_path_manager():
+    """테이블/rule 1회 구성 + TARGET_TO_IP 관리. 실패(권한 등) 시 호스트 라우트 교체 방식 유지"""
+    global path_mgr
+    if not PATH_POLICY_ROUTING:
+        return
+    pm = PathManager(rtnl, gateway_fn=iface_gateway, ip_fn=iface_ip,
+                     tables=PATH_TABLES, active_table=PATH_ACTIVE_TABLE, prio_base=PATH_RULE_PRIO)
+    try:
+        pm.setup()
+        if TARGET_TO_IP:
+            pm.manage(TARGET_TO_IP)
+    except NetlinkError as e:
+        print(f"[PATH] policy routing unavailable ({e}), using host routes")
         return
+    path_mgr = pm
+    net_cache.subscribe(on_net_event)
 
-    # ① 오버라이드 우선
-    gw = GW_OVERRIDE.get(iface, "")
+def on_net_event(event, iface):
+    """주소 추가/GW 변경 → 그 iface 테이블 갱신 (시작 시 주소가 없어 미뤄진 테이블 포함, fwmark 측정도 이 테이블 사용)"""
+    if path_mgr and iface in PATH_TABLES:
+        path_mgr.refresh(iface)
 
-    # ② 오버라이드 없으면 시스템 라우팅 테이블에서 GW 추출
-    if not gw:
-        gw = get_gw_for_iface(iface)
+def switch_path(iface):
+    """
+    스트림 목적지 경로 전환: active 테이블 라우트 1개 교체.
+    실패 시 관리 rule 을 내린 뒤 main 테이블 호스트 라우트 (rule 이 남으면 호스트 라우트는 무시됨).
+    반환: 전환 성공 여부
+    """
+    if path_mgr:
+        was_detached = path_mgr.detached
+        if path_mgr.switch(iface) is not None:
+            if was_detached:
+                try:
+                    rtnl.route_delete(TARGET_TO_IP, 32)     # 대체로 넣었던 main 호스트 라우트 정리
+                except NetlinkError:
+                    pass
+            return True
+        if not path_mgr.detach():
+            print(f"[ROUTE] {TARGET_TO_IP}: policy rule still in place, stream stays on {path_mgr.active}")
+            return False
+    return route_replace_host(TARGET_TO_IP, iface)
+
+def next_hop(iface):
+    """iface 경로의 다음 홉: GW (없으면 on-link 목적지 자체)"""
+    return iface_gateway(iface) or TARGET_TO_IP
+
+def poke_neighbor(ip, iface):
+    """datagram 1개로 커널 ARP 해석 유발 (netlink 권한이 없을 때)"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, 25, bytes(f"{iface}\0", "utf-8"))
+            s.sendto(b"", (ip, 9))      # discard 포트: 응답 불필요, ARP 해석만 유발
+    except OSError as e:
+        print(f"[NEIGH] poke {ip} on {iface} failed: {e}")
 
-    if gw:
-        cmd = ["sudo", "ip", "route", "replace", f"{dest_ip}/32", "via", gw, "dev", iface]
-    else:
-        cmd = ["sudo", "ip", "route", "replace", f"{dest_ip}/32", "dev", iface, "scope", "link"]
+def prewarm_neighbor(iface, timeout=NEIGH_RESOLVE_TIMEOUT_S):
+    """
+    라우트 전환 전에 다음 홉 이웃(ARP) 항목 준비 → 전환 직후 패킷이 ARP 해석 뒤에 쌓였다 버려지지 않도록.
+    유효 항목이 없으면 netlink NTF_USE 로 해석을 유발하고 알림 대기 (timeout 0: 유발만).
+    반환: lladdr 또는 None
+    """
+    ip = next_hop(iface)
+    if not NEIGH_PREWARM or not ip or not net_cache.ready.is_set():
+        return None
+    n = net_cache.neigh(iface, ip)
+    if not (n and n["state"] & NUD_VALID):
+        since = time.monotonic()
+        try:
+            rtnl.neigh_resolve(ip, iface)
+        except NetlinkError:
+            poke_neighbor(ip, iface)
+        if timeout <= 0:
+            return None
+        if not net_cache.wait_for_neigh(iface, ip, since, timeout):
+            print(f"[NEIGH] {ip} on {iface} unresolved after {timeout}s, switching anyway")
+            return None
+        n = net_cache.neigh(iface, ip)
+        if not n or not n["lladdr"]:
+            return None         # 대기 직후 항목이 삭제/갱신됨
+    if NEIGH_PIN and not n["state"] & (NUD_REACHABLE | NUD_PERMANENT | NUD_NOARP):
+        try:
+            rtnl.neigh_replace(ip, iface, n["lladdr"])
+        except NetlinkError as e:
+            print(f"[NEIGH] pin {ip} on {iface} failed: {e}")
+    return n["lladdr"]
 
-    sh(cmd, check=False)
-    got = sh(["ip", "route", "get", dest_ip], check=False, capture=True)
-    if got:
-        print(f"[ROUTE] {dest_ip} -> {got}")
+def probe_targets(iface):
+    return {"gw": iface_gateway(iface) or None, "dst": TARGET_TO_IP}
+
+def start_prober():
+    global prober
+    if not PROBE_ENABLED:
+        return
+    marks = {iface: path_mgr.fwmark(iface) for iface in PATH_TABLES} if path_mgr else None
+    prober = PathProber((USE_INTERFACE_ETH, USE_INTERFACE_WLAN), probe_targets, rate_hz=PROBE_RATE_HZ,
+                        timeout_s=PROBE_TIMEOUT_S, window=PROBE_WINDOW, marks=marks)
+    prober.start()
+
+def wait_first_echo(timer, iface, t_switch, timeout=HO_ECHO_TIMEOUT_S):
+    """
+    경로 전환(t_switch) 후 송신한 echo 의 첫 응답 → ms 를 first_echo 로 기록 (핸드오버 완료 신호).
+    전환 직후 prober.kick() 으로 echo 를 보내 두면 카메라/UDP 재시작과 겹쳐 진행. 측정기가 없으면 True
+    """
+    if not prober:
+        return True
+    ms = prober.wait_echo(iface, HO_ECHO_TARGET, t_switch, timeout)
+    if ms is None:
+        print(f"[HO] no echo from {HO_ECHO_TARGET} on {iface} within {timeout}s")
+        return False
+    timer.metric("first_echo", ms)
+    if udpgen:
+        udpgen.confirm()
+    print(f"[HO] switch → first echo ({HO_ECHO_TARGET}) on {iface}: {ms:.2f} ms")
+    return True
+
+def report_first_tx(timer, iface, t_switch):
+    """
+    경로 전환 시각 t_switch → 새 epoch 스트림 첫 송신 성공(UDPGenerator.first_send) 까지 ms 를 first_tx 로 기록.
+    udpgen.started 가 set 된 뒤 호출 (ARP/ICMP/DHCP 등 다른 송신은 섞이지 않음)
+    """
+    t_first = udpgen.first_send
+    if t_first is None:
+        return
+    ms = (t_first - t_switch) * 1e3
+    timer.metric("first_tx", ms)
+    print(f"[HO] switch → first stream tx on {iface}: {ms:.2f} ms")
 
 # ----------- Camera Streamer ----------------------
 class CameraStreamer:
@@ -164,8 +408,7 @@ class CameraStreamer:
 
     def start(self, iface, bind_ip):
         self.stop()
-        # 스트림 목적지 IP를 지정 인터페이스로 강제 라우팅
-        route_replace_host(TARGET_TO_IP, iface)
+        # 스트림 목적지 경로는 호출 측(switch_path)이 먼저 전환
 
         cmd = [
             "gst-launch-1.0",
@@ -191,6 +434,13 @@ class CameraStreamer:
             self.proc = None
 
 # ----------- UDP Generator ------------------------
+def flow_id_for(rid) -> int:
+    """robot_id → 32-bit flow id (숫자면 그대로, 아니면 crc32)"""
+    try:
+        return int(rid) & 0xFFFFFFFF
+    except (TypeError, ValueError):
+        return zlib.crc32(str(rid).encode())
+
 class UDPGenerator(threading.Thread):
     def __init__(self):
         super().__init__(daemon=True)
@@ -198,63 +448,220 @@ class UDPGenerator(threading.Thread):
         self.iface = USE_INTERFACE_ETH
         self.packet_size = 1200
         self.interval = (self.packet_size * 8) / (UDP_BITRATE_MBPS * 1e6)
+        self.pacer = TokenBucketPacer(UDP_BITRATE_MBPS * 1e6,
+                                      burst_bytes=UDP_BURST_BYTES,
+                                      max_backlog_s=UDP_MAX_BACKLOG_S)
+        self.rate_stats = {}
+        # 배치 송신: 페이싱 간격으로 배치 크기 결정 (저속이면 1 → 배치 안 함)
+        self.batch = auto_batch_size(self.interval, UDP_BATCH_TARGET_S) if UDP_BATCH_MODE != "off" else 1
+        # 송신 버퍼 링: 배치 슬롯 수만큼 미리 할당, 헤더만 덮어씀
+        self.ring = PayloadRing(self.batch, self.packet_size, fill=UDP_PAYLOAD_FILL,
+                                header_size=udp_header.HEADER_SIZE)
+        # 측정 헤더 필드 (udp_header v1)
+        self.flow_id = flow_id_for(robot_id)
+        self.seq = 0
+        self.epoch = 0   # 경로 전환(update)마다 +1
         self.lock = threading.Lock()
-        self.sock = None  # 소켓 멤버 유지
+        # 후보 iface 별 bound+connected 소켓 풀: iface → {ip, sock, sender}. 주소 변경 시 run() 이 갱신
+        self.pool = {}
+        self.pool_version = None     # 마지막 갱신 시 net_cache.version (None: 다음 루프에서 갱신)
+        self.overlap = None          # (이전 iface, 종료 monotonic): 새 경로 확인 전까지 양쪽 송신
+        self.dup_packets = 0
+        self.open_fail = {}          # iface → (연속 실패 수, 다음 출력 monotonic): 오류 출력 제한
+        self.switched = threading.Event()  # update() 시 set → 재시도 대기 중이면 바로 깨움
+        self.started = threading.Event()   # update() 후 첫 패킷 송신 시 set
+        self.first_send = None             # 그 첫 송신 성공 monotonic (핸드오버 first_tx 측정)
 
     def update(self, iface):
+        """경로 전환 = 풀 소켓 포인터 교체 (소켓 생성·주소 조회 없음). UDP_OVERLAP_S > 0 이면 이전 경로로도 복제 송신"""
         with self.lock:
+            old = self.iface
             self.iface = iface
-            if self.sock:
-                try:
-                    self.sock.close()
-                except:
-                    pass
-                self.sock = None
+            self.epoch += 1
+            self.started.clear()
+            self.first_send = None
+            self.switched.set()
+            self.overlap = (old, time.monotonic() + UDP_OVERLAP_S) if UDP_OVERLAP_S > 0 and old != iface else None
+            self.dup_packets = 0
+
+    def confirm(self):
+        """새 경로 확인됨 (첫 echo) → 중복 송신 종료"""
+        with self.lock:
+            if self.overlap:
+                print(f"[UDP] overlap on {self.overlap[0]} ended: path confirmed ({self.dup_packets} dup pkts)")
+                self.overlap = None
+
+    def prewarm(self, iface):
+        """핸드오버 임박: 다음 루프에서 풀 재확인 (iface 소켓은 주소가 있는 한 이미 열려 있음)"""
+        with self.lock:
+            if iface not in self.pool:
+                self.pool_version = None
+
+    def _open_entry(self, iface, ip):
+        """iface 에 묶고(SO_BINDTODEVICE + bind ip) 목적지에 connect 한 소켓 + 배치 송신기"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, 25, bytes(f"{iface}\0", "utf-8"))
+            sock.bind((ip, 0))
+            sock.connect((TARGET_TO_IP, UDP_PORT))
+            sender = make_batch_sender(UDP_BATCH_MODE, sock, self.ring.buf, self.packet_size) \
+                if self.batch > 1 else None
+        except OSError as e:
+            sock.close()
+            fails, next_log = self.open_fail.get(iface, (0, 0.0))
+            now = time.monotonic()
+            if now >= next_log:
+                print(f"[UDP] open socket on {iface} ({ip}) failed: {e}"
+                      + (f" ({fails} more since last report)" if fails else ""))
+                fails, next_log = 0, now + 5.0
+            self.open_fail[iface] = (fails + 1, next_log)
+            return None
+        self.open_fail.pop(iface, None)
+        return {"ip": ip, "sock": sock, "sender": sender}
+
+    @staticmethod
+    def _close_entry(entry):
+        if entry["sender"]:
+            entry["sender"].close()
+        entry["sock"].close()
+
+    def _refresh_pool(self):
+        """주소가 바뀐 iface 는 소켓 재생성, 주소가 없어지면 닫음 (run 스레드에서 lock 보유 상태로 호출)"""
+        self.pool_version = net_cache.version
+        for iface in UDP_POOL_IFACES:
+            ip = iface_ip(iface)
+            entry = self.pool.get(iface)
+            if entry and entry["ip"] == ip:
+                continue
+            if entry:
+                self._close_entry(self.pool.pop(iface))
+            if ip:
+                entry = self._open_entry(iface, ip)
+                if entry:
+                    self.pool[iface] = entry
+                    mode = entry["sender"].mode if entry["sender"] else "sendto"
+                    print(f"[UDP] socket ready on {iface} ({ip}, {mode}, batch={self.batch})")
+
+    def _report_rate(self):
+        self.rate_stats = self.pacer.report()
+        print(f"[UDP] rate target={self.rate_stats['target_mbps']:.2f} Mbps "
+              f"achieved={self.rate_stats['achieved_mbps']:.2f} Mbps "
+              f"(total {self.rate_stats['total_mbps']:.2f}, lost {self.rate_stats['lost_s']}s)")
+
+    def _send_batch(self, sender, iface_id, epoch, dup=None):
+        """배치 1회: 페이싱 후 슬롯 헤더만 갱신해 한 번에 전달. dup=(iface, sender): 같은 배치를 이전 경로로도"""
+        ps = self.packet_size
+        self.pacer.wait(self.batch * ps)
+        for i in range(self.batch):
+            self._stamp(i * ps, iface_id, epoch)
+        sender.send(self.batch)
+        if dup:
+            old_id = udp_header.iface_id(dup[0])
+            for i in range(self.batch):
+                udp_header.set_iface(self.ring.buf, i * ps, old_id)
+            self._send_dup(dup[1].send, self.batch)
+
+    def _send_one(self, sock, iface_id, epoch, dup=None):
+        self.pacer.wait(self.packet_size)
+        i = self.ring.next()
+        off = self.ring.offset(i)
+        self._stamp(off, iface_id, epoch)
+        sock.send(self.ring.views[i])
+        if dup:
+            udp_header.set_iface(self.ring.buf, off, udp_header.iface_id(dup[0]))
+            self._send_dup(dup[1].send, self.ring.views[i])
+
+    def _send_dup(self, send, arg):
+        """이전 경로 복제 송신: 실패(주소 소멸 등)해도 본 송신에는 영향 없음"""
+        try:
+            send(arg)
+            self.dup_packets += self.batch
+        except OSError:
+            pass
+
+    def _stamp(self, offset, iface_id, epoch):
+        """ring.buf[offset] 슬롯에 측정 헤더 기록 후 seq 증가 (iface/epoch 는 송신 소켓을 고른 시점 값)"""
+        udp_header.pack_into(self.ring.buf, offset, self.flow_id, self.seq, iface_id, epoch,
+                             time.monotonic_ns(), time.time_ns())
+        self.seq += 1
+
+    def _overlap_entry(self):
+        """중복 송신 대상 (iface, 풀 항목) 또는 None (lock 보유 상태)"""
+        if not self.overlap:
+            return None
+        old, until = self.overlap
+        if time.monotonic() >= until:
+            print(f"[UDP] overlap on {old} ended: window {UDP_OVERLAP_S}s elapsed ({self.dup_packets} dup pkts)")
+            self.overlap = None
+            return None
+        entry = self.pool.get(old)
+        return (old, entry) if entry else None
 
     def run(self):
+        self.pacer.reset()
+        next_report = time.monotonic() + UDP_RATE_REPORT_S
+        waiting = None
+        retry = UDP_OPEN_RETRY_S[0]
         while self.running:
             try:
                 with self.lock:
-                    if self.sock is None:
-                        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                        # SO_BINDTODEVICE: 해당 NIC로 강제 송신 (linux에서 번호 25)
-                        self.sock.setsockopt(socket.SOL_SOCKET, 25, bytes(f"{self.iface}\0", "utf-8"))
-                        ip = get_ip_from_interface(self.iface)
-                        if ip == "0.0.0.0":
-                            print(f"[UDP] No IP for {self.iface}")
-                            time.sleep(1)
-                            continue
-                        self.sock.bind((ip, 0))
-                        print(f"[UDP] New socket bound to {self.iface} ({ip})")
-
-                    dst = (TARGET_TO_IP, UDP_PORT)
-
-                timestamp = time.time()
-                ts_bytes = struct.pack('!d', timestamp)
-                payload = ts_bytes + os.urandom(self.packet_size - 8)
-                # send loop
-                self.sock.sendto(payload, dst)
-                # self.sock.sendto(os.urandom(self.packet_size), dst)
-                time.sleep(self.interval)
+                    if self.pool_version != net_cache.version or self.iface not in self.pool:
+                        self._refresh_pool()
+                    # 소켓·iface·epoch 를 한 번에 스냅샷 → 송신 도중 update() 가 와도 헤더와 소켓이 일치
+                    iface, epoch = self.iface, self.epoch
+                    self.switched.clear()
+                    entry = self.pool.get(iface)
+                    dup = self._overlap_entry()
+
+                if entry is None:
+                    if iface_ip(iface):
+                        # 주소는 있는데 소켓을 못 엶 (bind/connect 실패 등): 지수 백오프 후 재시도
+                        switched = self.switched.wait(retry)
+                        retry = UDP_OPEN_RETRY_S[0] if switched else min(retry * 2, UDP_OPEN_RETRY_S[1])
+                        continue
+                    if waiting != iface:
+                        print(f"[UDP] No IP for {iface}, waiting")
+                        waiting = iface
+                    wait_for_ip(iface, 0.5)
+                    continue
+                waiting = None
+                retry = UDP_OPEN_RETRY_S[0]
+
+                iface_id = udp_header.iface_id(iface)
+                if entry["sender"] is not None:
+                    self._send_batch(entry["sender"], iface_id, epoch, dup and (dup[0], dup[1]["sender"]))
+                else:
+                    self._send_one(entry["sock"], iface_id, epoch, dup and (dup[0], dup[1]["sock"]))
+                if not self.started.is_set():
+                    t_sent = time.monotonic()
+                    with self.lock:
+                        if epoch == self.epoch:     # 이전 경로 소켓으로 보낸 배치는 "새 경로 첫 송신" 아님
+                            self.first_send = t_sent
+                            self.started.set()
+
+                if time.monotonic() >= next_report:
+                    self._report_rate()
+                    next_report += UDP_RATE_REPORT_S
             except Exception as e:
                 print(f"[UDP] Error: {e}")
-                time.sleep(1)
+                with self.lock:
+                    self.pool_version = None     # 소켓 오류 → 다음 루프에서 풀 재확인
+                time.sleep(0.1)
 
     def stop(self):
         self.running = False
-        if self.sock:
-            self.sock.close()
-            self.sock = None
+        with self.lock:
+            for entry in self.pool.values():
+                self._close_entry(entry)
+            self.pool = {}
 
 # ----------- WiFi Functions -----------------------
 def get_current_bssid():
     try:
-        output = subprocess.check_output(["sudo", "wpa_cli", "status"], text=True)
-        for line in output.splitlines():
-            if line.startswith("bssid="):
-                return line.split("=", 1)[1].strip().lower()
-    except subprocess.CalledProcessError:
-        pass
+        bssid = wpa.status().get("bssid")
+        return bssid.lower() if bssid else None
+    except WpaCtrlError as e:
+        print(f"[WPA] status failed: {e}")
     return None
 
 def get_ap_id_from_bssid(bssid):
@@ -263,75 +670,329 @@ def get_ap_id_from_bssid(bssid):
             return ap['ap_id']
     return None
 
-def get_rssi_map_from_scan_results():
-    global rssi_history
-    try:
-        output = subprocess.check_output(["sudo", "wpa_cli", "scan_results"], text=True)
-    except subprocess.CalledProcessError:
-        return {}
+def get_rssi_map_from_scan_results(results=None):
+    """results 가 없으면 SCAN_RESULTS 직접 조회 (모니터 미연결 시)"""
+    if results is None:
+        try:
+            results = wpa.scan_results()
+        except WpaCtrlError as e:
+            print(f"[WPA] scan_results failed: {e}")
+            return {}
 
     rssi_map = {}
-    for line in output.splitlines()[1:]:
-        parts = line.split()
-        if len(parts) >= 3:
-            bssid, signal = parts[0], parts[2]
-            try:
-                rssi_val = float(signal)
-                history = rssi_history.setdefault(bssid, [])
-                history.append(rssi_val)
-                if len(history) > MOVING_AVG_N:
-                    history.pop(0)
-                avg = sum(history) / len(history)
-                rssi_map[bssid.lower()] = avg
-            except:
-                continue
+    for r in results:
+        val = rssi_filter.update(r["bssid"], r["signal"], ssid=r.get("ssid"))
+        if val is not None:
+            rssi_map[r["bssid"]] = val
+    rssi_filter.evict()
     return rssi_map
 
-def handover_ap(target_bssid):
-    global last_handover_time, camera, udpgen
-    try:
-        print(f"[HO] Trying roam → {target_bssid}")
-        subprocess.run(["sudo", "wpa_cli", "roam", target_bssid], check=True)
-        subprocess.run(["sudo", "wpa_cli", "set_network", "0", "bssid", target_bssid], check=True)
-        subprocess.run(["sudo", "wpa_cli", "set_network", "0", "bgscan", ""], check=True)
-
-        # ✅ 연결 확인 루프
-        success = False
-        for _ in range(10):  # 최대 10초 대기
-            cur_bssid = get_current_bssid()
-            if cur_bssid and cur_bssid.lower() == target_bssid.lower():
-                success = True
-                break
-            time.sleep(1)
-
-        if not success:
-            print(f"❌ Handover to {target_bssid} failed (timeout)")
-            return
-
-        print(f"✅ Handover completed to {target_bssid}")
-        last_handover_time = time.time()
+def events_available():
+    return wpa_monitor is not None and wpa_monitor.attached.is_set()
 
-        # ✅ IP 확인 대기 (DHCP 환경이면 더 길게 필요)
-        new_ip = None
-        for _ in range(10):
-            new_ip = get_ip_from_interface(USE_INTERFACE_WLAN)
-            if new_ip and new_ip != "0.0.0.0":
-                break
-            time.sleep(1)
+def on_link_event(event, st):
+    """LinkState 구독: 스캔 결과가 갱신될 때만 이동평균 반영"""
+    global rssi_latest
+    if event == "CTRL-EVENT-SCAN-RESULTS":
+        rssi_latest = get_rssi_map_from_scan_results(list(st.scan.values()))
 
+def wait_for_bssid(target_bssid, timeout=10.0, cancel=None):
+    """
+    target_bssid 연결 완료 대기. 이벤트 모니터가 없으면 100 ms 폴링 (STATUS 는 제어 소켓이라 저렴).
+    cancel(Event) 설정 시 False 반환
+    """
+    target = target_bssid.lower()
+    cancelled = (lambda: cancel is not None and cancel.is_set())
+    if events_available():
+        link_state.wait_for(lambda st: (st.connected and st.bssid == target) or cancelled(), timeout)
+        return link_state.connected and link_state.bssid == target and not cancelled()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not cancelled():
+        cur_bssid = get_current_bssid()
+        if cur_bssid and cur_bssid.lower() == target:
+            return True
+        time.sleep(0.1)
+    return False
+
+def start_wpa_monitor():
+    global wpa_monitor
+    link_state.subscribe(on_link_event)
+    wpa_monitor = WpaEventMonitor(WPA_CTRL_PATH, link_state, wpa)
+    wpa_monitor.start()
+    if WPA_SIGNAL_MONITOR:
+        try:
+            wpa.request(f"SIGNAL_MONITOR {WPA_SIGNAL_MONITOR}")
+        except WpaCtrlError as e:
+            print(f"[WPA] SIGNAL_MONITOR failed: {e}")
+
+def switch_stream_path(timer, iface, bind_ip):
+    """이웃 준비 → 라우트 → 카메라 → UDP → 첫 echo 확인 순 경로 전환 (각 단계 timer 에 기록)"""
+    with timer.phase("neigh"):
+        prewarm_neighbor(iface)
+    with timer.phase("route"):
+        if not switch_path(iface):
+            timer.fail("route-failed")
+        t_switch = time.monotonic()
+    if prober:
+        prober.kick(iface)
+    if camera:
+        with timer.phase("camera"):
+            camera.start(iface=iface, bind_ip=bind_ip)
+    with timer.phase("udp_restart"):
+        udpgen.update(iface=iface)
+        if not udpgen.started.wait(HO_UDP_START_TIMEOUT_S):
+            timer.fail("udp-timeout")
+        else:
+            report_first_tx(timer, iface, t_switch)
+    if prober:
+        with timer.phase("echo"):
+            if not wait_first_echo(timer, iface, t_switch):
+                timer.fail("echo-timeout")
+
+def finish_handover(timer, outcome=None):
+    """타임라인 기록 → 링 보관 + 요약 출력 + 서버 보고. 기록 반환"""
+    rec = timer.record(outcome)
+    ho_timeline.add(rec)
+    summary = ho_timeline.summary()
+    phases = ", ".join(f"{ph['name']}={ph['dur_ms']}" for ph in rec["phases"])
+    phases += "".join(f", {name}={ms}" for name, ms in rec["metrics"].items())
+    print(f"[HO] timeline #{rec['id']} {rec['outcome']} total={rec['total_ms']} ms ({phases})")
+    if "total" in summary:
+        print(f"[HO] total p50={summary['total']['p50']} p95={summary['total']['p95']} "
+              f"p99={summary['total']['p99']} ms (n={summary['total']['count']})")
+    if sio.connected:
+        sio.emit("robot_ho_timeline", {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "data": {"robot_id": robot_id, "record": rec, "summary": summary},
+        })
+    return rec
+
+def switch_to_eth(source="server"):
+    """유선 복귀 (Wi-Fi 단계 없이 경로 전환만 계측) → outcome"""
+    timer = HandoverTimer(None, source=source, iface=USE_INTERFACE_ETH)
+    try:
+        if net_cache.ready.is_set() and not net_cache.carrier(USE_INTERFACE_ETH):
+            with timer.phase("carrier_wait"):
+                if not net_cache.wait_for_carrier(USE_INTERFACE_ETH, HO_CARRIER_TIMEOUT_S):
+                    print(f"⚠️ {USE_INTERFACE_ETH} carrier down, switching anyway")
+        switch_stream_path(timer, USE_INTERFACE_ETH, get_ip_from_interface(USE_INTERFACE_ETH))
+    except Exception as e:
+        print(f"[HO] Error during eth switch: {e}")
+        timer.fail("error")
+    return finish_handover(timer)["outcome"]
+
+def wait_for_ip(iface, timeout, cancel=None):
+    """iface IPv4 대기. 주소 모니터가 없으면 100 ms 폴링"""
+    if net_cache.ready.is_set():
+        return net_cache.wait_for_addr(iface, timeout, cancel=cancel)
+    deadline = time.monotonic() + timeout
+    while True:
+        ip = get_ip_from_interface(iface)
+        if ip != "0.0.0.0":
+            return ip
+        if time.monotonic() >= deadline or (cancel is not None and cancel.is_set()):
+            return None
+        time.sleep(0.1)
+
+def ho_roam(ctx, _timeout):
+    print(f"[HO] Trying roam → {ctx['target']}")
+    wpa.roam(ctx["target"])
+    wpa.set_network(0, "bssid", ctx["target"])
+    wpa.set_network(0, "bgscan", '""')
+    return True
+
+def ho_wait_assoc(ctx, timeout):
+    """CTRL-EVENT-CONNECTED(대상 BSSID) 대기"""
+    global last_handover_time
+    if not wait_for_bssid(ctx["target"], timeout=timeout, cancel=ctx.get("cancel")):
+        return False
+    print(f"✅ Handover completed to {ctx['target']}")
+    last_handover_time = time.time()
+    return True
+
+def target_ssid(bssid):
+    entry = link_state.scan.get(bssid) or link_state.scan.get(bssid.lower()) or {}
+    return entry.get("ssid")
+
+def remember_lease(iface, bssid):
+    """현재 iface 주소/GW 를 bssid(+ESS) lease 로 기록 (DHCP 로 확인된 주소만)"""
+    if not lease_cache or not bssid or not net_cache.ready.is_set() or iface in lease_applied:
+        return None
+    info = net_cache.addr_info(iface)
+    if not info:
+        return None
+    ttl = info["valid_lft"] if info["valid_lft"] is not None else LEASE_STATIC_TTL_S
+    return lease_cache.record(bssid, target_ssid(bssid), info["ip"], info["prefixlen"],
+                              iface_gateway(iface) or None, time.time() + ttl)
+
+def apply_cached_lease(iface, bssid):
+    """
+    알려진 AP 면 캐시 lease 로 iface 주소를 바로 교체 → ip (없거나 실패 시 None).
+    이전 AP 의 주소와 GW 이웃 항목은 제거 (GW 는 validate_lease 가 새로 해석). 커널이 만료 시각에 주소 제거
+    """
+    if not lease_cache:
+        return None
+    lease = lease_cache.lookup(bssid, target_ssid(bssid))
+    if not lease:
+        return None
+    try:
+        rtnl.addr_add(lease["ip"], lease["prefixlen"], iface,
+                      valid_lft=max(1, int(lease["expires"] - time.time())))
+    except NetlinkError as e:
+        print(f"[LEASE] apply {lease['ip']}/{lease['prefixlen']} on {iface} failed: {e}")
+        return None
+    known = {lease["ip"]}
+    for ip in list(net_cache.addrs.get(iface, [])):
+        meta = net_cache.addr_meta.get((iface, ip))
+        if ip == lease["ip"] or not meta:
+            continue
+        try:
+            rtnl.addr_del(ip, meta["prefixlen"], iface)
+            print(f"[LEASE] {iface} -{ip}/{meta['prefixlen']} (previous AP)")
+        except NetlinkError as e:
+            if e.errno != errno.EADDRNOTAVAIL:
+                print(f"[LEASE] remove {ip} on {iface} failed: {e}")
+                known.add(ip)       # 남은 주소를 DHCP 결과로 오인하지 않도록
+    if lease["gateway"]:
+        try:
+            rtnl.neigh_del(lease["gateway"], iface)
+        except NetlinkError as e:
+            if e.errno != errno.ENOENT:
+                print(f"[LEASE] flush neigh {lease['gateway']} on {iface} failed: {e}")
+    # 이후 새로 붙는 주소 = DHCP 결과, since 이후 GW 이웃 항목 = 이 링크에서 새로 해석된 것
+    lease_applied[iface] = {**lease, "known": known, "since": time.monotonic()}
+    print(f"[LEASE] {iface} ← {lease['ip']}/{lease['prefixlen']} gw={lease['gateway']} "
+          f"(cached by {lease['source']}, {lease['expires'] - time.time():.0f}s left)")
+    return lease["ip"]
+
+def lease_gateway_alive(iface, lease):
+    """캐시 lease 의 GW 가 이 링크에서 ARP 에 응답하는지 (적용 시 지운 뒤 새로 해석된 항목만 인정)"""
+    gw = lease["gateway"]
+    if not gw:
+        return True         # on-link 전용 lease: 확인할 GW 없음
+    try:
+        rtnl.neigh_resolve(gw, iface)
+    except NetlinkError:
+        poke_neighbor(gw, iface)
+    mac = net_cache.wait_for_neigh(iface, gw, lease["since"], LEASE_GW_TIMEOUT_S)
+    if not mac:
+        print(f"[LEASE] {iface} gw {gw} no ARP reply in {LEASE_GW_TIMEOUT_S}s")
+    return mac is not None
+
+def validate_lease(iface, bssid, lease):
+    """
+    백그라운드: GW ARP 응답 확인 + (설정 시) DHCP INIT-REBOOT 요청 → LEASE_VALIDATE_S 동안 다른 주소가 붙는지 확인.
+    GW 무응답이거나 다른 주소면 캐시 무효화 + 캐시 주소 제거 + (DHCP 주소로) 경로/카메라 재설정,
+    아니면 확인된 lease 로 갱신
+    """
+    if LEASE_DHCP_CMD:
+        sh(LEASE_DHCP_CMD, check=False)
+    gw_ok = lease_gateway_alive(iface, lease)
+    new_ip = net_cache.wait_for_new_addr(iface, lease["known"], 0 if not gw_ok else LEASE_VALIDATE_S)
+    if lease_applied.get(iface) is not lease:
+        return              # 그 사이 다른 핸드오버가 새 lease 를 적용
+    del lease_applied[iface]
+    if gw_ok and not new_ip:
+        remember_lease(iface, bssid)
+        print(f"[LEASE] {iface} {lease['ip']} confirmed")
+        return
+    reason = f"got {new_ip} ≠ cached {lease['ip']}" if new_ip else f"gw {lease['gateway']} unreachable"
+    print(f"[LEASE] {iface} {reason} → invalidate")
+    lease_cache.invalidate(bssid, lease["ssid"])
+    try:
+        rtnl.addr_del(lease["ip"], lease["prefixlen"], iface)
+    except NetlinkError as e:
+        print(f"[LEASE] remove {lease['ip']} failed: {e}")
+    if not new_ip:
+        new_ip = net_cache.wait_for_new_addr(iface, lease["known"], LEASE_VALIDATE_S)
         if not new_ip:
-            print(f"⚠️ Got BSSID {target_bssid}, but no IP on wlan0 yet")
+            print(f"[LEASE] {iface} no DHCP address after invalidation")
             return
-
-        print(f"[HO] Camera bind_ip={new_ip}, UDP iface={USE_INTERFACE_WLAN}")
-
-        # 라우트 및 경로 전환
-        route_replace_host(TARGET_TO_IP, USE_INTERFACE_WLAN)
-        camera.start(iface=USE_INTERFACE_WLAN, bind_ip=new_ip)
-        udpgen.update(iface=USE_INTERFACE_WLAN)
-
+    if path_mgr:
+        path_mgr.refresh(iface)
+    if not path_mgr or path_mgr.active == iface:
+        switch_path(iface)
+        if camera:
+            camera.start(iface=iface, bind_ip=new_ip)
+    remember_lease(iface, bssid)
+
+def ho_wait_addr(ctx, timeout):
+    """캐시 lease 가 있으면 즉시 적용(백그라운드 검증), 없으면 rtnetlink 주소 알림으로 IPv4 대기"""
+    ip = apply_cached_lease(ctx["iface"], ctx["target"])
+    if ip:
+        ctx["ip"], ctx["lease"] = ip, "cached"
+        threading.Thread(target=validate_lease, daemon=True,
+                         args=(ctx["iface"], ctx["target"], lease_applied[ctx["iface"]])).start()
+        return True
+    ctx["lease"] = "dhcp"
+    ctx["ip"] = wait_for_ip(ctx["iface"], timeout, cancel=ctx.get("cancel"))
+    if ctx["ip"]:
+        print(f"[HO] Camera bind_ip={ctx['ip']}, UDP iface={ctx['iface']}")
+    return ctx["ip"] is not None
+
+def ho_neigh(ctx, timeout):
+    """GW 이웃 항목 준비 (실패해도 전환은 진행)"""
+    prewarm_neighbor(ctx["iface"], timeout)
+    return True
+
+def ho_route(ctx, _timeout):
+    if path_mgr:
+        path_mgr.refresh(ctx["iface"])     # 핸드오버 후 주소/GW 가 바뀌었을 수 있음
+    if not switch_path(ctx["iface"]):
+        return False
+    ctx["t_switch"] = time.monotonic()
+    if prober:
+        prober.kick(ctx["iface"])
+    return True
+
+def ho_echo(ctx, timeout):
+    """새 경로가 실제로 전달되는지: 전환 직후 보낸 echo 의 첫 응답 (스트림 재시작 후 완료 확인)"""
+    return wait_first_echo(ctx["timer"], ctx["iface"], ctx["t_switch"], timeout)
+
+def ho_camera(ctx, _timeout):
+    camera.start(iface=ctx["iface"], bind_ip=ctx["ip"])
+    return True
+
+def ho_stream(ctx, timeout):
+    """UDP 경로 전환 후 첫 패킷 송신까지"""
+    udpgen.update(iface=ctx["iface"])
+    if not udpgen.started.wait(timeout):
+        return False
+    report_first_tx(ctx["timer"], ctx["iface"], ctx["t_switch"])
+    return True
+
+def handover_steps():
+    return [
+        Step("roam", ho_roam, None, None),
+        Step("bssid_wait", ho_wait_assoc, HO_ASSOC_TIMEOUT_S, ASSOCIATED),
+        Step("ip_wait", ho_wait_addr, HO_ADDR_TIMEOUT_S, ADDRESSED),
+        Step("neigh", ho_neigh if NEIGH_PREWARM else None, NEIGH_RESOLVE_TIMEOUT_S, None),
+        Step("route", ho_route, None, ROUTED),
+        Step("camera", ho_camera if camera else None, None, None),
+        Step("udp_restart", ho_stream, HO_UDP_START_TIMEOUT_S, STREAMING),
+        Step("echo", ho_echo if prober else None, HO_ECHO_TIMEOUT_S, None),
+    ]
+
+def handover_ap(target_bssid, timer=None, cancel=None):
+    """
+    ROAMING → ASSOCIATED → ADDRESSED → ROUTED → STREAMING (이벤트 기반, 단계별 타임아웃).
+    cancel(Event): 새 요청이 이 핸드오버를 대체하면 설정됨. 반환: outcome
+    """
+    timer = timer or HandoverTimer(target_bssid, iface=USE_INTERFACE_WLAN)
+    ctx = {"target": target_bssid, "iface": USE_INTERFACE_WLAN, "ip": None, "cancel": cancel, "timer": timer}
+    try:
+        _state, outcome = ho_fsm.run(timer, handover_steps(), ctx)
+        for ph in timer.phases:
+            if ph["name"] == "ip_wait" and ctx.get("lease"):
+                ph["lease"] = ctx["lease"]       # "cached" | "dhcp"
+        if outcome != "ok":
+            print(f"❌ Handover to {target_bssid} failed ({outcome})")
+        elif ctx.get("lease") == "dhcp":
+            remember_lease(ctx["iface"], target_bssid)
     except Exception as e:
-        print(f"[HO] Error during handover: {e}")
+        print(f"[HO] Error during handover ({ho_fsm.state}): {e}")
+        timer.fail("error")
+    return finish_handover(timer)["outcome"]
 
 # ----------- Socket.IO ----------------------------
 # 내장 재연결은 끔: 중복/폭주 방지 (우리가 watchdog으로 제어)
@@ -439,6 +1100,10 @@ def command(data):
         if data.get('robot_id') != str(robot_id):
             return
 
+        # 서버 명령이 우선: 정책 엔진 자체 결정 잠시 중지
+        if policy_engine:
+            policy_engine.override(POLICY_OVERRIDE_HOLD_S)
+
         # 핸드오버 명령
         handover = data.get('handover')
         if handover is None:
@@ -452,15 +1117,9 @@ def command(data):
             return
 
         if handover_id == 0:
-            # 유선으로 복귀
+            # 유선으로 복귀 (스트림 목적지 라우트 eth0으로 강제)
             print(f"[{robot_id}] Handover ID is 0 → Use eth0, no Wi-Fi handover")
-            iface = USE_INTERFACE_ETH
-            local_ip = get_ip_from_interface(iface)
-            # 스트림 목적지 라우트 eth0으로 강제
-            route_replace_host(TARGET_TO_IP, iface)
-            camera.start(iface=iface, bind_ip=local_ip)
-            udpgen.update(iface=iface)
-            return
+            return request_handover(USE_INTERFACE_ETH, meta={"handover": 0})
 
         # Wi-Fi로 핸드오버
         target_bssid = AP_INFO.get(handover_id, {}).get('bssid', '').lower()
@@ -469,28 +1128,100 @@ def command(data):
             return
 
         print(f"[{robot_id}] Received handover request to BSSID: {target_bssid}")
-
-        if scan_lock.acquire(timeout=5):
-            try:
-                print(f"[{robot_id}] Starting handover_ap() ...")
-                handover_ap(target_bssid)
-            finally:
-                scan_lock.release()
-        else:
-            print(f"[{robot_id}] ⚠️ Scan loop busy, forcing handover anyway")
-            # 락 못 잡아도 handover는 강제로 실행
-            handover_ap(target_bssid)
+        return request_handover(target_bssid, meta={"handover": handover_id})
 
     except Exception as e:
         print(f"[CMD] handler error: {e}")
 
+def request_handover(target, decision=None, meta=None):
+    """
+    서버 command / 정책 엔진 공용 핸드오버 진입점: 큐에 넣고 바로 반환.
+    target: BSSID 또는 USE_INTERFACE_ETH(유선 복귀). 반환: ack dict (Socket.IO 콜백 응답 겸용)
+    """
+    source = decision.get("source", "server") if decision else "server"
+    req, position = ho_queue.submit(target, source=source, meta=meta)
+    return {"robot_id": robot_id, "request_id": req.id, "target": target, "position": position}
+
+def execute_handover(req):
+    """핸드오버 작업자 스레드: 요청 1개 실행 → outcome"""
+    if req.target == USE_INTERFACE_ETH:
+        return switch_to_eth(source=req.source)
+    timer = HandoverTimer(req.target, source=req.source, iface=USE_INTERFACE_WLAN)
+    # 진행 중 스캔은 ABORT_SCAN 으로 선점, 스캐너는 핸드오버가 끝난 뒤 재개
+    with timer.phase("scan_preempt"):
+        delay = scan_gate.begin_handover()
+    if delay:
+        print(f"[{robot_id}] Scan preempted for handover #{req.id} ({delay * 1e3:.1f} ms)")
+    try:
+        print(f"[{robot_id}] Starting handover_ap() #{req.id} ...")
+        return handover_ap(req.target, timer, cancel=req.cancel)
+    finally:
+        scan_gate.end_handover()
+
+def abort_handover(req):
+    """진행 중 핸드오버 대기(연결/주소)를 깨워 cancel 확인하게 함"""
+    with link_state.cond:
+        link_state.cond.notify_all()
+    net_cache.wake()
+
+def notify_handover(req, status, **info):
+    """큐 상태 보고: queued/coalesced/superseded → robot_ho_ack, done → robot_ho_result"""
+    print(f"[HOQ] #{req.id} → {req.target}: {status} {info}")
+    if not sio.connected:
+        return
+    event = "robot_ho_result" if status == "done" else "robot_ho_ack"
+    sio.emit(event, {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data": {"robot_id": robot_id, **req.info(), "status": status, **info},
+    })
+
+ho_queue = HandoverQueue(execute_handover, notify_handover, abort_fn=abort_handover)
+
 # ----------- Sensing & Scan -----------------------
+def station_link_info(cur_bssid):
+    """nl80211 최근 샘플 중 현재 AP 것만 (1초 이상 지난 샘플은 버림)"""
+    sta = station.latest
+    if not sta or not cur_bssid or sta.get("bssid") != cur_bssid.lower():
+        return None
+    if time.monotonic() - sta["ts"] > 1.0:
+        return None
+    return {
+        "signal": sta.get("signal"),
+        "signal_avg": sta.get("signal_avg"),
+        "tx_bitrate_mbps": sta.get("tx_bitrate_mbps"),
+        "rx_bitrate_mbps": sta.get("rx_bitrate_mbps"),
+        "tx_retries": sta.get("tx_retries"),
+        "tx_failed": sta.get("tx_failed"),
+        "retry_ratio": sta.get("retry_ratio"),
+    }
+
 def sensing_loop():
+    """
+    링크 상태 변화(스캔 결과/연결/해제/신호 변화)마다 즉시 발행,
+    변화가 없으면 SENSING_INTERVAL_S 주기로 발행
+    """
+    version = 0
+    last_emit = 0.0
     while True:
         try:
-            cur_bssid = get_current_bssid()
+            version = link_state.wait_change(version, timeout=SENSING_INTERVAL_S)
+            wait = SENSING_MIN_INTERVAL_S - (time.monotonic() - last_emit)
+            if wait > 0:
+                time.sleep(wait)
+                version = link_state.version
+            last_emit = time.monotonic()
+
+            if events_available():
+                cur_bssid = link_state.bssid if link_state.connected else None
+                rssi_map = dict(rssi_latest)
+                # 연결 AP 는 SIGNAL-CHANGE 가 스캔보다 최신이면 그 값 사용
+                if cur_bssid and link_state.rssi is not None and link_state.rssi_ts > link_state.scan_ts:
+                    rssi_map[cur_bssid] = link_state.rssi
+            else:
+                cur_bssid = get_current_bssid()
+                rssi_map = get_rssi_map_from_scan_results()
             cur_ap_id = get_ap_id_from_bssid(cur_bssid) if cur_bssid else None
-            rssi_map = get_rssi_map_from_scan_results()
+            link = station_link_info(cur_bssid)
 
             connections = [
                 {
@@ -498,6 +1229,7 @@ def sensing_loop():
                     "mac_address": AP_INFO[gw_id]['bssid'],
                     "connected": str(gw_id == cur_ap_id).lower(),
                     "rssi": rssi_map.get(AP_INFO[gw_id]['bssid'].lower(), -100),
+                    "link": link if gw_id == cur_ap_id else None,
                 }
                 for gw_id in AP_INFO.keys()
             ]
@@ -506,7 +1238,11 @@ def sensing_loop():
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "data": {
                     "robot_id": robot_id,
-                    "connections": connections
+                    "connections": connections,
+                    "scan": {**scan_planner.stats(), "preemption": scan_gate.stats()},
+                    "forecast": forecast_latest,
+                    "path": path_mgr.stats() if path_mgr else None,
+                    "path_quality": prober.snapshot() if prober else None,
                 }
             }
             # 디버그 출력
@@ -518,32 +1254,202 @@ def sensing_loop():
                 print("[Sensing] Socket.IO not connected. Skipping emit.")
         except Exception as e:
             print(f"[Sensing] error: {e}")
-        time.sleep(10.0)
+            time.sleep(1.0)
+
+def measure_scan(kind, freqs, t0):
+    """스캔 결과 이벤트까지 시간 측정 + 대상 AP 채널 학습 (핸드오버가 선점하면 기록 안 함)"""
+    if events_available():
+        done = link_state.wait_for(
+            lambda st: st.scan_ts > t0 or (scan_gate.preempted.is_set() and not st.scanning),
+            SCAN_TIMEOUT_S)
+        if scan_gate.preempted.is_set():
+            print(f"[Scan] {kind} scan preempted by handover")
+            return
+        if not done:
+            print(f"[Scan] {kind} scan: no results within {SCAN_TIMEOUT_S}s")
+            return
+        scan_planner.learn(list(link_state.scan.values()), full=(kind == "full"))
+        scan_planner.record(kind, freqs, link_state.scan_ts - t0, home_freq=link_state.freq)
+    else:
+        scan_planner.learn(wpa.scan_results(), full=False)
+        scan_planner.record(kind, freqs, None)
+
+def abort_scan():
+    """핸드오버 선점: ABORT_SCAN + 결과 대기 중인 스캐너 깨우기"""
+    try:
+        wpa.abort_scan()
+    finally:
+        with link_state.cond:
+            link_state.cond.notify_all()
+
+def wait_scan_end(timeout):
+    if not events_available():
+        return True
+    return link_state.wait_for(lambda st: not st.scanning, timeout)
+
+scan_gate = ScanGate(abort_scan, scanning_fn=lambda: link_state.scanning,
+                     wait_scan_end_fn=wait_scan_end, abort_wait_s=SCAN_ABORT_WAIT_S)
 
 def scan_loop():
+    n_scans = 0
     while True:
         try:
             if time.time() - last_handover_time < 3:
                 time.sleep(1)
                 continue
-            if scan_lock.acquire(blocking=False):
-                try:
-                    subprocess.run(["sudo", "wpa_cli", "scan"],
-                                   check=True,
-                                   stdout=subprocess.DEVNULL,
-                                   stderr=subprocess.DEVNULL)
-                except Exception:
-                    pass
-                finally:
-                    scan_lock.release()
-            time.sleep(10.0)
+            kind, freqs = scan_planner.next_scan()
+            if not scan_gate.try_begin():
+                # 핸드오버 또는 사전 준비 스캔 진행 중: 끝나면 바로 재개
+                scan_gate.wait_idle()
+                continue
+            try:
+                t0 = time.monotonic()
+                wpa.scan(freqs)
+                measure_scan(kind, freqs, t0)
+            except WpaCtrlError as e:
+                print(f"[Scan] {kind} scan request failed: {e}")
+            finally:
+                scan_gate.end()
+            n_scans += 1
+            if n_scans % 10 == 0:
+                print(f"[Scan] stats: {scan_planner.stats()} preemption: {scan_gate.stats()}")
+            if handover_imminent.is_set():
+                time.sleep(SCAN_IMMINENT_INTERVAL_S)
+            else:
+                # 예측 신호가 오면 주기를 기다리지 않고 바로 다음 스캔 → 정책 엔진이 최신 후보 RSSI 로 판단
+                handover_imminent.wait(SCAN_INTERVAL_S)
         except Exception as e:
             print(f"[Scan] error: {e}")
             time.sleep(2)
 
+# ----------- Handover Policy -----------------------
+def policy_rssi():
+    """AP_INFO BSSID 필터 RSSI + 경과 시간. 연결 AP 는 nl80211 최신 샘플 우선"""
+    now = time.monotonic()
+    rssi, ages = {}, {}
+    for ap in AP_INFO.values():
+        b = ap['bssid'].lower()
+        v = rssi_filter.value(b)
+        if v is not None:
+            rssi[b] = v
+            ages[b] = now - rssi_filter.last_seen(b)
+    sta = station.latest
+    if sta and sta.get("signal") is not None and now - sta["ts"] < 1.0 and sta["bssid"] in rssi:
+        rssi[sta["bssid"]] = float(sta["signal"])
+        ages[sta["bssid"]] = now - sta["ts"]
+    return rssi, ages
+
+def report_decision(decision):
+    payload = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data": {"robot_id": robot_id, **decision},
+    }
+    if sio.connected:
+        sio.emit("robot_ho_decision", payload)
+
+def start_policy_engine():
+    global policy_engine
+    policy = HandoverPolicy(margin_db=POLICY_MARGIN_DB, ttt_s=POLICY_TTT_S,
+                            min_dwell_s=POLICY_MIN_DWELL_S, trigger_dbm=POLICY_TRIGGER_DBM)
+    policy_engine = HandoverPolicyEngine(
+        policy, link_state,
+        rssi_fn=policy_rssi,
+        since_handover_fn=lambda: time.time() - last_handover_time,
+        handover_fn=request_handover,
+        report_fn=report_decision,
+        # 유선 경로 사용 중에는 AP 간 로밍 판단 안 함
+        active_fn=lambda: udpgen is not None and udpgen.iface == USE_INTERFACE_WLAN,
+    )
+    policy_engine.start()
+
+# ----------- RSSI Forecast & Pre-warm --------------
+def prewarm_path(target_bssid):
+    """
+    핸드오버 전 대상 경로 사전 준비 (roam 명령 전에 끝나도록 가벼운 작업만)
+    - 대상 AP 채널만 스캔 → roam 시 wpa_supplicant BSS 항목이 최신
+    - wlan0 GW 이웃(ARP) 해석 유발 (대기 없음)
+    - UDPGenerator 에 wlan0 소켓 미리 열기
+    """
+    freq = scan_planner.freqs.get(target_bssid) if target_bssid else None
+    if freq and scan_gate.try_begin():
+        try:
+            wpa.scan([freq])
+        except WpaCtrlError as e:
+            print(f"[Prewarm] scan {freq} failed: {e}")
+        finally:
+            scan_gate.end()
+
+    prewarm_neighbor(USE_INTERFACE_WLAN, timeout=0)
+
+    if udpgen:
+        udpgen.prewarm(USE_INTERFACE_WLAN)
+
+def forecast_candidate(cur_bssid):
+    """현재 AP 를 제외한 가장 좋은 AP_INFO 후보"""
+    rssi, _ages = policy_rssi()
+    rssi.pop(cur_bssid, None)
+    return max(rssi, key=rssi.get) if rssi else None
+
+def report_imminent(cur_bssid, target_bssid, fc):
+    payload = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data": {"robot_id": robot_id, "from": cur_bssid, "to": target_bssid, **fc},
+    }
+    if sio.connected:
+        sio.emit("robot_ho_imminent", payload)
+
+def forecast_loop():
+    """
+    연결 AP nl80211 signal 추세 회귀 → 임계치 도달 예상이 FORECAST_LEAD_S 이내면
+    handover_imminent 신호 + 경로 사전 준비. 신호 회복 또는 AP 변경 시 재무장
+    """
+    global forecast_latest
+    trace = open(RSSI_TRACE_FILE, "a") if RSSI_TRACE_FILE else None
+    last_t = 0.0
+    fired_for = None
+    while True:
+        try:
+            time.sleep(FORECAST_PERIOD_S)
+            samples = station.recent_signals(FORECAST_WINDOW_S)
+            if trace:
+                for t, b, v in samples:
+                    if t > last_t and v is not None:
+                        trace.write(f"{t:.3f},{b},{v}\n")
+                        last_t = t
+                trace.flush()
+
+            sta = station.latest
+            cur = sta.get("bssid") if sta else None
+            if cur != fired_for:
+                fired_for = None
+                handover_imminent.clear()
+            series = [(t, v) for t, b, v in samples if b == cur and v is not None]
+            fc = forecaster.forecast(series, now=time.monotonic()) if cur else None
+            forecast_latest = fc
+            if not fc:
+                continue
+            if fc["time_to_threshold_s"] is None:
+                fired_for = None
+                handover_imminent.clear()
+            elif fc["imminent"] and fired_for is None:
+                fired_for = cur
+                target = forecast_candidate(cur)
+                print(f"[Forecast] {cur} → {FORECAST_THRESHOLD_DBM} dBm in {fc['time_to_threshold_s']}s "
+                      f"(slope {fc['slope_db_s']} dB/s), pre-warm → {target}")
+                handover_imminent.set()
+                report_imminent(cur, target, fc)
+                prewarm_path(target)
+        except Exception as e:
+            print(f"[Forecast] error: {e}")
+            time.sleep(1.0)
+
 # ----------- MAIN ----------------------------
 def main():
     global camera, udpgen
+    # 0) 링크/주소/라우트 캐시 먼저 (이후 조회는 모두 캐시)
+    net_cache.start()
+    net_cache.ready.wait(2.0)
+
     # 4) 최초 연결 (실패 시 watchdog이 책임짐)
     reconnect_socket()
 
@@ -553,21 +1459,35 @@ def main():
     # 1) Socket.IO 서버 IP는 항상 eth0로 라우팅 고정
     server_host = host_from_url(SERVER_URL)
     server_ip = resolve_host_to_ip(server_host) if server_host else ""
+    start_path_manager()
     if server_ip:
-        route_replace_host(server_ip, USE_INTERFACE_ETH)
+        if path_mgr:
+            path_mgr.pin(server_ip, USE_INTERFACE_ETH)
+        else:
+            route_replace_host(server_ip, USE_INTERFACE_ETH)
+
+    start_prober()
 
     # 2) 초기 스트림은 eth0 사용
     default_iface = USE_INTERFACE_ETH
     default_ip = get_ip_from_interface(default_iface)
-    route_replace_host(TARGET_TO_IP, default_iface)
+    switch_path(default_iface)
     # camera.start(iface=default_iface, bind_ip=default_ip)
     udpgen.start()
 
     # 3) 백그라운드 스레드 시작
+    start_wpa_monitor()
+    if link_state.connected:
+        remember_lease(USE_INTERFACE_WLAN, link_state.bssid)
+    ho_queue.start()
+    station.start()
+    if AUTO_HANDOVER:
+        start_policy_engine()
     threading.Thread(target=socketio_reconnect_watchdog, daemon=True).start()
     threading.Thread(target=keepalive_ping_loop, daemon=True).start()
     threading.Thread(target=sensing_loop, daemon=True).start()
     threading.Thread(target=scan_loop, daemon=True).start()
+    threading.Thread(target=forecast_loop, daemon=True).start()
 
     # 5) 메인 루프 유지
     while True:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+비블로킹 슬라이딩 윈도 처리량 추정기.
+- 백그라운드 스레드가 period_s 마다 누적 바이트 카운터를 샘플링해 고정 크기 링에 저장
+- rate()/stats() 는 임의 윈도(0.1 s, 1 s, 5 s ...)에 대해 즉시 응답 (sleep 없음)
+"""
+
+import threading
+import time
+from array import array
+
+
+def nic_counter(iface=None):
+    """psutil 인터페이스 카운터 → () -> (bytes_recv, bytes_sent)"""
+    import psutil
+
+    def read():
+        if iface:
+            c = psutil.net_io_counters(pernic=True)[iface]
+        else:
+            c = psutil.net_io_counters()
+        return c.bytes_recv, c.bytes_sent
+    return read
+
+
+class RateEstimator(threading.Thread):
+    """
+    read_counter: () -> (recv_bytes, sent_bytes) 단조 증가 카운터
+    period_s: 샘플링 주기, capacity: 링 크기 (기본 600 × 0.1 s = 60 s)
+    """
+    DIRS = ("recv", "sent")
+
+    def __init__(self, read_counter, period_s=0.1, capacity=600):
+        super().__init__(daemon=True)
+        self.read_counter = read_counter
+        self.period_s = period_s
+        self.capacity = capacity
+        self.t = array("d", bytes(8 * capacity))
+        self.c = {d: array("d", bytes(8 * capacity)) for d in self.DIRS}
+        self.idx = 0        # 다음 기록 위치
+        self.count = 0
+        self.lock = threading.Lock()
+        self.running = True
+
+    def run(self):
+        next_t = time.monotonic()
+        while self.running:
+            try:
+                recv, sent = self.read_counter()
+                now = time.monotonic()
+                with self.lock:
+                    i = self.idx
+                    self.t[i] = now
+                    self.c["recv"][i] = recv
+                    self.c["sent"][i] = sent
+                    self.idx = (i + 1) % self.capacity
+                    self.count = min(self.count + 1, self.capacity)
+            except Exception as e:
+                print(f"[Rate] sample error: {e}")
+            next_t += self.period_s
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()
+
+    def stop(self):
+        self.running = False
+
+    def _snapshot(self, window_s, direction):
+        """윈도 안의 (시각, 카운터) 샘플을 오래된 순으로 복사"""
+        with self.lock:
+            n = self.count
+            if n < 2:
+                return [], []
+            start = (self.idx - n) % self.capacity
+            ts, cs = [], []
+            tail_t = self.t[(self.idx - 1) % self.capacity]
+            for k in range(n):
+                j = (start + k) % self.capacity
+                if tail_t - self.t[j] <= window_s + self.period_s / 2:
+                    ts.append(self.t[j])
+                    cs.append(self.c[direction][j])
+        return ts, cs
+
+    def rate(self, window_s, direction="recv"):
+        """윈도 평균 처리량 (Mbps). 샘플 부족하면 None"""
+        ts, cs = self._snapshot(window_s, direction)
+        if len(ts) < 2 or ts[-1] <= ts[0]:
+            return None
+        return (cs[-1] - cs[0]) * 8 / ((ts[-1] - ts[0]) * 1e6)
+
+    def stats(self, window_s, direction="recv", percentiles=(5, 50, 95)):
+        """
+        윈도 내 샘플 간 순간 처리량(Mbps)의 mean/min/max/percentile.
+        예: stats(5.0) → 5초 동안 100 ms 단위 최저치로 핸드오버 순간의 dip 확인
+        """
+        ts, cs = self._snapshot(window_s, direction)
+        rates = sorted(
+            (cs[k] - cs[k - 1]) * 8 / ((ts[k] - ts[k - 1]) * 1e6)
+            for k in range(1, len(ts)) if ts[k] > ts[k - 1]
+        )
+        if not rates:
+            return None
+        out = {
+            "mean": (cs[-1] - cs[0]) * 8 / ((ts[-1] - ts[0]) * 1e6),
+            "min": rates[0],
+            "max": rates[-1],
+        }
+        for p in percentiles:
+            out[f"p{p}"] = rates[min(len(rates) - 1, int(round(p / 100 * (len(rates) - 1))))]
+        return out
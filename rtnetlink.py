@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rtnetlink(NETLINK_ROUTE) 헬퍼 — ip 명령(fork/sudo) 대신 netlink 직접 사용 (CAP_NET_ADMIN 필요)
+- Rtnl: 라우트 replace/get/delete, 정책 라우팅 rule add/del/dump,
+        주소 add(수명 지정)/del·default GW 조회, 여러 라우트 변경을 1회 요청으로 (batch),
+        이웃(ARP) 항목 해석 유발(neigh_resolve)/고정(neigh_replace)/조회
+- parse_link()/parse_addr()/parse_route()/parse_neigh(): RTM_*LINK / *ADDR / *ROUTE / *NEIGH 메시지 파서
+- NetCache: 링크/주소/라우트 알림으로 유지되는 캐시 (조회 비용 0),
+            wait_for_addr()/wait_for_carrier() 로 주소 할당·carrier up 을 이벤트 기반으로 대기,
+            addr_info() 로 prefix/남은 lease 수명, wait_for_neigh() 로 이웃 해석 완료 대기
+"""
+
+import errno
+import socket
+import struct
+import threading
+import time
+
+import netlink as nl
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+RTM_GETROUTE = 26
+
+RTM_NEWNEIGH = 28
+RTM_DELNEIGH = 29
+RTM_GETNEIGH = 30
+
+RTM_NEWRULE = 32
+RTM_DELRULE = 33
+RTM_GETRULE = 34
+
+RTMGRP_LINK = 0x1
+RTMGRP_NEIGH = 0x4
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_CARRIER = 33
+
+IFF_UP = 0x1
+IFF_LOWER_UP = 0x10000
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_BROADCAST = 4
+IFA_CACHEINFO = 6
+INFINITY_LIFE_TIME = 0xFFFFFFFF
+
+IFA_CACHEINFO_S = struct.Struct("=IIII")   # prefered, valid, cstamp, tstamp
+
+NDA_DST = 1
+NDA_LLADDR = 2
+
+NUD_INCOMPLETE = 0x01
+NUD_REACHABLE = 0x02
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+NUD_NOARP = 0x40
+NUD_PERMANENT = 0x80
+NUD_VALID = NUD_PERMANENT | NUD_NOARP | NUD_REACHABLE | NUD_PROBE | NUD_STALE | NUD_DELAY
+NUD_NAMES = {NUD_INCOMPLETE: "incomplete", NUD_REACHABLE: "reachable", NUD_STALE: "stale",
+             NUD_DELAY: "delay", NUD_PROBE: "probe", NUD_FAILED: "failed", NUD_NOARP: "noarp",
+             NUD_PERMANENT: "permanent"}
+NTF_USE = 0x01
+
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_PREFSRC = 7
+RTA_TABLE = 15
+
+FRA_DST = 1
+FRA_SRC = 2
+FRA_PRIORITY = 6
+FRA_FWMARK = 10
+FRA_TABLE = 15
+FRA_FWMASK = 16
+FR_ACT_TO_TBL = 1
+
+RT_TABLE_MAIN = 254
+RTPROT_STATIC = 4
+RT_SCOPE_UNIVERSE = 0
+RT_SCOPE_LINK = 253
+RT_SCOPE_NOWHERE = 255
+RTN_UNICAST = 1
+
+IFINFOMSG = struct.Struct("=BxHiII")  # family, type, index, flags, change
+IFADDRMSG = struct.Struct("=BBBBI")   # family, prefixlen, flags, scope, index
+RTMSG = struct.Struct("=BBBBBBBBI")   # family, dst_len, src_len, tos, table, protocol, scope, type, flags
+FIBRULEHDR = struct.Struct("=BBBBBBBBI")   # family, dst_len, src_len, tos, table, res1, res2, action, flags
+NDMSG = struct.Struct("=BxxxiHBB")    # family, ifindex, state, flags, type
+
+
+def ifname(index):
+    try:
+        return socket.if_indextoname(index)
+    except OSError:
+        return None
+
+
+def parse_link(payload):
+    """ifinfomsg + 속성 → {name, index, up, carrier, mac}"""
+    _family, _type, index, flags, _change = IFINFOMSG.unpack_from(payload, 0)
+    attrs = nl.parse_attrs(payload, IFINFOMSG.size)
+    carrier = nl.get_u8(attrs, IFLA_CARRIER)
+    mac = attrs.get(IFLA_ADDRESS)
+    return {
+        "name": nl.get_str(attrs, IFLA_IFNAME) or ifname(index),
+        "index": index,
+        "up": bool(flags & IFF_UP),
+        "carrier": bool(flags & IFF_LOWER_UP) if carrier is None else bool(carrier and flags & IFF_UP),
+        "mac": ":".join(f"{b:02x}" for b in mac) if mac else None,
+    }
+
+
+def parse_addr(payload):
+    """ifaddrmsg + 속성 → (ifname, ip, prefixlen). IPv4 가 아니면 None"""
+    family, prefixlen, _flags, _scope, index = IFADDRMSG.unpack_from(payload, 0)
+    if family != socket.AF_INET:
+        return None
+    attrs = nl.parse_attrs(payload, IFADDRMSG.size)
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+    if not raw:
+        return None
+    return ifname(index), socket.inet_ntoa(raw[:4]), prefixlen
+
+
+def addr_valid_lft(payload):
+    """주소 유효 수명(초). DHCP 클라이언트는 보통 lease 시간으로 설정. 무기한이면 None"""
+    attrs = nl.parse_attrs(payload, IFADDRMSG.size)
+    ci = attrs.get(IFA_CACHEINFO)
+    if not ci or len(ci) < IFA_CACHEINFO_S.size:
+        return None
+    _pref, valid, _c, _t = IFA_CACHEINFO_S.unpack_from(ci, 0)
+    return None if valid == INFINITY_LIFE_TIME else valid
+
+
+def addr_payload(ip, prefixlen, iface, valid_lft=None):
+    """IPv4 주소 ifaddrmsg + 속성. valid_lft(초) 를 주면 만료 시 커널이 자동 제거"""
+    net = struct.unpack("!I", socket.inet_aton(ip))[0]
+    bcast = socket.inet_ntoa(struct.pack("!I", net | ((1 << (32 - prefixlen)) - 1))) if prefixlen < 31 else None
+    body = IFADDRMSG.pack(socket.AF_INET, prefixlen, 0, RT_SCOPE_UNIVERSE, socket.if_nametoindex(iface))
+    body += nl.attr(IFA_LOCAL, socket.inet_aton(ip)) + nl.attr(IFA_ADDRESS, socket.inet_aton(ip))
+    if bcast:
+        body += nl.attr(IFA_BROADCAST, socket.inet_aton(bcast))
+    if valid_lft is not None:
+        body += nl.attr(IFA_CACHEINFO, IFA_CACHEINFO_S.pack(valid_lft, valid_lft, 0, 0))
+    return body
+
+
+def dump_addrs(sock):
+    """현재 IPv4 주소 전체 → {ifname: [ip, ...]}"""
+    out = {}
+    payload = IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+    for t, pl in sock.request(RTM_GETADDR, nl.NLM_F_DUMP, payload):
+        if t != RTM_NEWADDR:
+            continue
+        a = parse_addr(pl)
+        if a and a[0]:
+            out.setdefault(a[0], []).append(a[1])
+    return out
+
+
+def _ip4(raw):
+    return socket.inet_ntoa(raw[:4]) if raw else None
+
+
+def parse_route(payload):
+    """rtmsg + 속성 → dict (dst, dst_len, gateway, oif, prefsrc, table, scope, priority)"""
+    family, dst_len, _src_len, _tos, table, proto, scope, rtype, _flags = RTMSG.unpack_from(payload, 0)
+    attrs = nl.parse_attrs(payload, RTMSG.size)
+    oif = nl.get_u32(attrs, RTA_OIF)
+    return {
+        "family": family,
+        "dst": _ip4(attrs.get(RTA_DST)) or ("0.0.0.0" if dst_len == 0 else None),
+        "dst_len": dst_len,
+        "gateway": _ip4(attrs.get(RTA_GATEWAY)),
+        "oif": ifname(oif) if oif else None,
+        "prefsrc": _ip4(attrs.get(RTA_PREFSRC)),
+        "table": nl.get_u32(attrs, RTA_TABLE, table),
+        "protocol": proto,
+        "scope": scope,
+        "type": rtype,
+        "priority": nl.get_u32(attrs, RTA_PRIORITY),
+    }
+
+
+def route_payload(dst, dst_len=32, oif=None, gateway=None, table=RT_TABLE_MAIN, scope=None,
+                  protocol=RTPROT_STATIC):
+    """IPv4 라우트 rtmsg + 속성. scope 미지정 시 gateway 가 있으면 universe, 없으면 link"""
+    if scope is None:
+        scope = RT_SCOPE_UNIVERSE if gateway else RT_SCOPE_LINK
+    body = RTMSG.pack(socket.AF_INET, dst_len, 0, 0, table if table < 256 else 0,
+                      protocol, scope, RTN_UNICAST, 0)
+    body += nl.attr(RTA_DST, socket.inet_aton(dst))
+    if table >= 256:
+        body += nl.attr_u32(RTA_TABLE, table)
+    if gateway:
+        body += nl.attr(RTA_GATEWAY, socket.inet_aton(gateway))
+    if oif:
+        body += nl.attr_u32(RTA_OIF, socket.if_nametoindex(oif))
+    return body
+
+
+def rule_payload(priority, table=None, dst=None, dst_len=32, src=None, src_len=32, fwmark=None,
+                 fwmask=0xFFFFFFFF):
+    """IPv4 정책 라우팅 rule: [from src] [to dst] [fwmark m/mask] lookup table, pref priority"""
+    body = FIBRULEHDR.pack(socket.AF_INET, dst_len if dst else 0, src_len if src else 0, 0,
+                           table if table is not None and table < 256 else 0, 0, 0,
+                           FR_ACT_TO_TBL if table is not None else 0, 0)
+    body += nl.attr_u32(FRA_PRIORITY, priority)
+    if table is not None:
+        body += nl.attr_u32(FRA_TABLE, table)
+    if dst:
+        body += nl.attr(FRA_DST, socket.inet_aton(dst))
+    if src:
+        body += nl.attr(FRA_SRC, socket.inet_aton(src))
+    if fwmark is not None:
+        body += nl.attr_u32(FRA_FWMARK, fwmark) + nl.attr_u32(FRA_FWMASK, fwmask)
+    return body
+
+
+def parse_rule(payload):
+    family, dst_len, src_len, _tos, table, _r1, _r2, action, _flags = FIBRULEHDR.unpack_from(payload, 0)
+    attrs = nl.parse_attrs(payload, FIBRULEHDR.size)
+    return {
+        "family": family,
+        "priority": nl.get_u32(attrs, FRA_PRIORITY, 0),
+        "table": nl.get_u32(attrs, FRA_TABLE, table),
+        "dst": _ip4(attrs.get(FRA_DST)),
+        "dst_len": dst_len,
+        "src": _ip4(attrs.get(FRA_SRC)),
+        "src_len": src_len,
+        "fwmark": nl.get_u32(attrs, FRA_FWMARK),
+        "action": action,
+    }
+
+
+def parse_neigh(payload):
+    """ndmsg + 속성 → {ifname, dst, lladdr, state(NUD_*)}. IPv4 가 아니면 None"""
+    family, index, state, _flags, _type = NDMSG.unpack_from(payload, 0)
+    if family != socket.AF_INET:
+        return None
+    attrs = nl.parse_attrs(payload, NDMSG.size)
+    mac = attrs.get(NDA_LLADDR)
+    return {
+        "ifname": ifname(index),
+        "dst": _ip4(attrs.get(NDA_DST)),
+        "lladdr": ":".join(f"{b:02x}" for b in mac) if mac else None,
+        "state": state,
+    }
+
+
+def neigh_payload(ip, iface, state=0, flags=0, lladdr=None):
+    body = NDMSG.pack(socket.AF_INET, socket.if_nametoindex(iface), state, flags, 0)
+    body += nl.attr(NDA_DST, socket.inet_aton(ip))
+    if lladdr:
+        body += nl.attr(NDA_LLADDR, bytes(int(b, 16) for b in lladdr.split(":")))
+    return body
+
+
+class Rtnl:
+    """
+    rtnetlink 요청 클라이언트 (요청 소켓 1개 재사용, 스레드 안전).
+    실패는 NetlinkError(errno) — 예: EPERM 은 CAP_NET_ADMIN 없음
+    """
+
+    REPLACE = nl.NLM_F_CREATE | nl.NLM_F_REPLACE | nl.NLM_F_ACK
+
+    def __init__(self):
+        self.sock = nl.NetlinkSocket(nl.NETLINK_ROUTE)
+
+    def close(self):
+        self.sock.close()
+
+    # ---- 라우트 ----
+    def route_replace(self, dst, dst_len=32, oif=None, gateway=None, table=RT_TABLE_MAIN, scope=None):
+        """ip route replace dst/dst_len [via gateway] dev oif [scope link]"""
+        self.sock.request(RTM_NEWROUTE, self.REPLACE,
+                          route_payload(dst, dst_len, oif, gateway, table, scope))
+
+    def route_delete(self, dst, dst_len=32, oif=None, table=RT_TABLE_MAIN):
+        # scope NOWHERE: 삭제 시 scope 무관하게 일치 (ip route del 과 동일)
+        payload = RTMSG.pack(socket.AF_INET, dst_len, 0, 0, table if table < 256 else 0,
+                             0, RT_SCOPE_NOWHERE, 0, 0)
+        payload += nl.attr(RTA_DST, socket.inet_aton(dst))
+        if table >= 256:
+            payload += nl.attr_u32(RTA_TABLE, table)
+        if oif:
+            payload += nl.attr_u32(RTA_OIF, socket.if_nametoindex(oif))
+        self.sock.request(RTM_DELROUTE, nl.NLM_F_ACK, payload)
+
+    def route_batch(self, routes):
+        """
+        여러 라우트 replace 를 한 번의 요청으로: routes = [dict(dst=..., oif=..., gateway=...), ...]
+        반환: 각 항목 errno 목록 (0 = 성공)
+        """
+        return self.sock.batch([
+            (RTM_NEWROUTE, nl.NLM_F_CREATE | nl.NLM_F_REPLACE, route_payload(**r)) for r in routes
+        ])
+
+    def route_get(self, dst):
+        """ip route get dst → parse_route dict 또는 None"""
+        payload = RTMSG.pack(socket.AF_INET, 32, 0, 0, 0, 0, 0, 0, 0) + \
+            nl.attr(RTA_DST, socket.inet_aton(dst))
+        for t, pl in self.sock.request(RTM_GETROUTE, 0, payload):
+            if t == RTM_NEWROUTE:
+                return parse_route(pl)
+        return None
+
+    def routes(self, table=RT_TABLE_MAIN):
+        """IPv4 라우트 dump (table 만)"""
+        payload = RTMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0)
+        out = []
+        for t, pl in self.sock.request(RTM_GETROUTE, nl.NLM_F_DUMP, payload):
+            if t == RTM_NEWROUTE:
+                r = parse_route(pl)
+                if table is None or r["table"] == table:
+                    out.append(r)
+        return out
+
+    def default_gateway(self, iface):
+        """iface 의 default route gateway (없으면 None)"""
+        for r in self.routes():
+            if r["dst_len"] == 0 and r["oif"] == iface and r["gateway"]:
+                return r["gateway"]
+        return None
+
+    # ---- 정책 라우팅 rule ----
+    def rule_add(self, priority, table, **match):
+        """ip rule add [from/to/fwmark ...] lookup table pref priority (match: rule_payload 인자)"""
+        self.sock.request(RTM_NEWRULE, nl.NLM_F_CREATE | nl.NLM_F_EXCL | nl.NLM_F_ACK,
+                          rule_payload(priority, table, **match))
+
+    def rule_del(self, priority, table=None, **match):
+        self.sock.request(RTM_DELRULE, nl.NLM_F_ACK, rule_payload(priority, table, **match))
+
+    def rules(self):
+        payload = FIBRULEHDR.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0)
+        return [parse_rule(pl) for t, pl in self.sock.request(RTM_GETRULE, nl.NLM_F_DUMP, payload)
+                if t == RTM_NEWRULE]
+
+    # ---- 주소 ----
+    def addr_add(self, ip, prefixlen, iface, valid_lft=None):
+        """ip addr replace ip/prefixlen dev iface [valid_lft N preferred_lft N]"""
+        self.sock.request(RTM_NEWADDR, self.REPLACE, addr_payload(ip, prefixlen, iface, valid_lft))
+
+    def addr_del(self, ip, prefixlen, iface):
+        self.sock.request(RTM_DELADDR, nl.NLM_F_ACK, addr_payload(ip, prefixlen, iface))
+
+    def addrs(self):
+        return dump_addrs(self.sock)
+
+    # ---- 이웃(ARP) ----
+    def neigh_resolve(self, ip, iface):
+        """
+        NTF_USE: 패킷을 보낼 때처럼 커널이 이웃 해석(ARP 요청)을 시작 — 항목이 없으면 생성.
+        이미 유효하면 상태만 갱신. 완료는 RTM_NEWNEIGH 알림 (NetCache.wait_for_neigh)
+        """
+        self.sock.request(RTM_NEWNEIGH, nl.NLM_F_CREATE | nl.NLM_F_ACK, neigh_payload(ip, iface, flags=NTF_USE))
+
+    def neigh_replace(self, ip, iface, lladdr, state=NUD_REACHABLE):
+        """ip neigh replace ip lladdr mac dev iface nud state"""
+        self.sock.request(RTM_NEWNEIGH, self.REPLACE, neigh_payload(ip, iface, state, lladdr=lladdr))
+
+    def neigh_del(self, ip, iface):
+        """ip neigh del ip dev iface (이전 링크에서 해석된 항목 폐기)"""
+        self.sock.request(RTM_DELNEIGH, nl.NLM_F_ACK, neigh_payload(ip, iface))
+
+    def neigh_get(self, ip, iface):
+        """ip neigh get ip dev iface → parse_neigh dict 또는 None"""
+        try:
+            for t, pl in self.sock.request(RTM_GETNEIGH, 0, neigh_payload(ip, iface)):
+                if t == RTM_NEWNEIGH:
+                    return parse_neigh(pl)
+        except nl.NetlinkError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        return None
+
+    def ipv4(self, iface):
+        ips = self.addrs().get(iface)
+        return ips[0] if ips else None
+
+
+class NetCache(threading.Thread):
+    """
+    링크/주소/라우트/이웃 캐시 — RTMGRP_LINK | NEIGH | IPV4_IFADDR | IPV4_ROUTE 알림으로 항상 최신 유지.
+    조회(ipv4/carrier/gateway/link/route/neigh)는 dict 조회만 (커널 요청 없음).
+    알림 구독 후 전체 dump 로 초기화 (구독 전 변화 유실 방지), ENOBUFS(알림 유실) 시 재동기화.
+    갱신마다 version 증가 + cond 알림 → wait_for_addr()/wait_for_carrier() 로 이벤트 대기.
+    ifaces 를 주면 해당 인터페이스만 추적 (None 이면 전부)
+    """
+
+    GROUPS = RTMGRP_LINK | RTMGRP_NEIGH | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE
+
+    def __init__(self, ifaces=None):
+        super().__init__(daemon=True)
+        self.ifaces = set(ifaces) if ifaces else None
+        self.cond = threading.Condition()
+        self.links = {}      # ifname → {index, up, carrier, mac}
+        self.addrs = {}      # ifname → [ip, ...]
+        self.addr_meta = {}  # (ifname, ip) → {prefixlen, valid_lft, ts}
+        self.gateways = {}   # ifname → default gateway (main table)
+        self.routes = {}     # (dst, dst_len, table, priority, oif) → parse_route dict
+        self.neighs = {}     # (ifname, ip) → {lladdr, state, ts}
+        self.version = 0
+        self.subscribers = []
+        self._events = []    # (event, ifname): _handle 이 잠금 밖에서 구독자에게 전달
+        self.ready = threading.Event()
+        self.running = True
+
+    def _tracked(self, name):
+        return name is not None and (self.ifaces is None or name in self.ifaces)
+
+    def subscribe(self, callback):
+        """callback(event, iface): "addr"(IPv4 추가) | "gateway"(main default GW 변경). 캐시 스레드에서 호출 (빨리 끝낼 것)"""
+        self.subscribers.append(callback)
+
+    def _changed(self):
+        self.version += 1
+        self.cond.notify_all()
+
+    # ---- 알림/덤프 반영 (cond 보유 상태에서 호출) ----
+    def _apply_link(self, mtype, payload, _flags=0):
+        link = parse_link(payload)
+        if not self._tracked(link["name"]):
+            return
+        prev = self.links.get(link["name"])
+        if mtype == RTM_DELLINK:
+            self.links.pop(link["name"], None)
+            link["carrier"] = False
+        else:
+            self.links[link["name"]] = link
+        if prev is None or prev["carrier"] != link["carrier"]:
+            print(f"[RTNL] {link['name']} carrier {'up' if link['carrier'] else 'down'}")
+
+    def _apply_addr(self, mtype, payload, _flags=0):
+        a = parse_addr(payload)
+        if not a or not self._tracked(a[0]):
+            return
+        name, ip, plen = a
+        cur = [x for x in self.addrs.get(name, []) if x != ip]
+        if mtype == RTM_NEWADDR:
+            if ip not in self.addrs.get(name, []):
+                self._events.append(("addr", name))
+            cur.append(ip)
+            self.addr_meta[(name, ip)] = {"prefixlen": plen, "valid_lft": addr_valid_lft(payload),
+                                          "ts": time.monotonic()}
+        else:
+            self.addr_meta.pop((name, ip), None)
+        self.addrs[name] = cur
+        print(f"[RTNL] {'+' if mtype == RTM_NEWADDR else '-'}{ip} {name}")
+
+    @staticmethod
+    def _route_key(r):
+        # 같은 목적지라도 인터페이스/metric 이 다르면 별개 (예: eth0·wlan0 각자의 main default)
+        return r["dst"], r["dst_len"], r["table"], r["priority"] or 0, r["oif"]
+
+    def _main_gateway(self, iface):
+        """iface 의 main 테이블 default 중 metric 이 가장 낮은 것의 GW (없으면 None)"""
+        best = min((r for r in self.routes.values()
+                    if r["dst_len"] == 0 and r["table"] == RT_TABLE_MAIN and r["oif"] == iface and r["gateway"]),
+                   key=lambda r: r["priority"] or 0, default=None)
+        return best["gateway"] if best else None
+
+    def _apply_route(self, mtype, payload, flags=0):
+        r = parse_route(payload)
+        if r["family"] != socket.AF_INET or r["type"] != RTN_UNICAST:
+            return
+        key = self._route_key(r)
+        affected = {r["oif"]}
+        if mtype == RTM_DELROUTE:
+            self.routes.pop(key, None)
+        else:
+            if flags & nl.NLM_F_REPLACE:
+                # replace 는 같은 (dst, table, metric) 항목을 교체 — 이전 oif 항목은 삭제 알림 없이 사라짐
+                for k in [k for k in self.routes if k[:4] == key[:4] and k != key]:
+                    affected.add(self.routes.pop(k)["oif"])
+            self.routes[key] = r
+        if r["dst_len"] != 0 or r["table"] != RT_TABLE_MAIN:
+            return
+        for iface in affected:
+            if not self._tracked(iface):
+                continue
+            gw = self._main_gateway(iface)
+            if gw and self.gateways.get(iface) != gw:
+                self._events.append(("gateway", iface))
+            if gw:
+                self.gateways[iface] = gw
+            else:
+                self.gateways.pop(iface, None)
+
+    def _apply_neigh(self, mtype, payload, _flags=0):
+        n = parse_neigh(payload)
+        if not n or not n["dst"] or not self._tracked(n["ifname"]):
+            return
+        key = (n["ifname"], n["dst"])
+        if mtype == RTM_DELNEIGH:
+            self.neighs.pop(key, None)
+        else:
+            self.neighs[key] = {"lladdr": n["lladdr"], "state": n["state"], "ts": time.monotonic()}
+
+    APPLY = {
+        RTM_NEWLINK: _apply_link, RTM_DELLINK: _apply_link,
+        RTM_NEWADDR: _apply_addr, RTM_DELADDR: _apply_addr,
+        RTM_NEWROUTE: _apply_route, RTM_DELROUTE: _apply_route,
+        RTM_NEWNEIGH: _apply_neigh, RTM_DELNEIGH: _apply_neigh,
+    }
+
+    def _handle(self, msgs, reset=False):
+        with self.cond:
+            if reset:
+                self.links, self.addrs, self.gateways, self.routes = {}, {}, {}, {}
+                self.addr_meta, self.neighs = {}, {}
+            for t, flags, pl in msgs:
+                fn = self.APPLY.get(t)
+                if fn:
+                    fn(self, t, pl, flags)
+            self._changed()
+            events, self._events = list(dict.fromkeys(self._events)), []
+        for event, iface in events:
+            for cb in list(self.subscribers):
+                try:
+                    cb(event, iface)
+                except Exception as e:
+                    print(f"[RTNL] subscriber error: {e}")
+
+    def resync(self, req):
+        msgs = []
+        for mtype, hdr in ((RTM_GETLINK, IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)),
+                           (RTM_GETADDR, IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)),
+                           (RTM_GETROUTE, RTMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0)),
+                           (RTM_GETNEIGH, NDMSG.pack(socket.AF_INET, 0, 0, 0, 0))):
+            msgs += [(t, 0, pl) for t, pl in req.request(mtype, nl.NLM_F_DUMP, hdr)]
+        self._handle(msgs, reset=True)
+
+    def run(self):
+        while self.running:
+            sub = req = None
+            try:
+                sub = nl.NetlinkSocket(nl.NETLINK_ROUTE, groups=self.GROUPS)
+                req = nl.NetlinkSocket(nl.NETLINK_ROUTE)
+                self.resync(req)
+                self.ready.set()
+                while self.running:
+                    try:
+                        msgs = sub.recv_messages(timeout=1.0, with_flags=True)
+                    except OSError as e:
+                        print(f"[RTNL] notification lost ({e}), resync")
+                        self.resync(req)
+                        continue
+                    if msgs:
+                        self._handle(msgs)
+            except OSError as e:
+                print(f"[RTNL] cache error: {e}")
+                self.ready.clear()
+                time.sleep(2.0)
+            finally:
+                for s in (sub, req):
+                    if s:
+                        s.close()
+
+    def stop(self):
+        self.running = False
+
+    def wake(self):
+        """대기 중인 wait_for_*() 를 깨움 (취소 확인용)"""
+        with self.cond:
+            self.cond.notify_all()
+
+    # ---- O(1) 조회 ----
+    def ipv4(self, iface):
+        ips = self.addrs.get(iface)
+        return ips[0] if ips else None
+
+    def addr_info(self, iface):
+        """첫 IPv4 의 {ip, prefixlen, valid_lft(남은 초, 무기한이면 None)}"""
+        ip = self.ipv4(iface)
+        meta = self.addr_meta.get((iface, ip)) if ip else None
+        if not meta:
+            return None
+        left = meta["valid_lft"]
+        if left is not None:
+            left = max(0, int(left - (time.monotonic() - meta["ts"])))
+        return {"ip": ip, "prefixlen": meta["prefixlen"], "valid_lft": left}
+
+    def carrier(self, iface):
+        link = self.links.get(iface)
+        return bool(link and link["carrier"])
+
+    def gateway(self, iface):
+        return self.gateways.get(iface)
+
+    def link(self, iface):
+        return self.links.get(iface)
+
+    def route(self, dst, dst_len=32, table=RT_TABLE_MAIN, oif=None):
+        """(dst, dst_len, table) 라우트 중 metric 이 가장 낮은 것 (oif 지정 시 그 인터페이스만)"""
+        with self.cond:
+            cands = [r for k, r in self.routes.items()
+                     if k[:3] == (dst, dst_len, table) and (oif is None or k[4] == oif)]
+        return min(cands, key=lambda r: r["priority"] or 0, default=None)
+
+    # ---- 이벤트 대기 ----
+    def _wait(self, pred, timeout, cancel):
+        with self.cond:
+            return self.cond.wait_for(lambda: pred() or (cancel is not None and cancel.is_set()), timeout)
+
+    def wait_for_addr(self, iface, timeout=None, cancel=None):
+        """
+        iface 에 IPv4 가 생길 때까지 대기 → ip 또는 None(타임아웃).
+        cancel(Event) 이 설정되면 다음 wake() 에서 바로 반환
+        """
+        self._wait(lambda: self.addrs.get(iface), timeout, cancel)
+        return self.ipv4(iface)
+
+    def neigh(self, iface, ip):
+        """{lladdr, state, ts} 또는 None. 유효 여부는 state & NUD_VALID"""
+        return self.neighs.get((iface, ip))
+
+    def wait_for_neigh(self, iface, ip, since, timeout=None, cancel=None):
+        """
+        since(monotonic, 해석 요청 직전) 이후 갱신된 항목이 유효/FAILED 가 될 때까지 대기
+        → lladdr 또는 None (FAILED/타임아웃). 요청 전부터 캐시에 있던 FAILED/INCOMPLETE 는 무시
+        """
+        def fresh():
+            n = self.neighs.get((iface, ip))
+            return n if n and n["ts"] >= since else None
+
+        def done():
+            n = fresh()
+            return n is not None and n["state"] & (NUD_VALID | NUD_FAILED)
+        self._wait(done, timeout, cancel)
+        with self.cond:
+            n = fresh()
+            return n["lladdr"] if n and n["state"] & NUD_VALID else None
+
+    def wait_for_new_addr(self, iface, known, timeout=None, cancel=None):
+        """iface 에 known(주소 모음) 에 없는 IPv4 가 생길 때까지 대기 → 그 ip 또는 None"""
+        other = lambda: next((ip for ip in self.addrs.get(iface, []) if ip not in known), None)
+        self._wait(other, timeout, cancel)
+        with self.cond:
+            return other()
+
+    def wait_for_carrier(self, iface, timeout=None, cancel=None):
+        """iface carrier(LOWER_UP) 대기 → True/False"""
+        self._wait(lambda: self.carrier(iface), timeout, cancel)
+        return self.carrier(iface)
+
+
+if __name__ == "__main__":
+    cache = NetCache()
+    cache.start()
+    cache.ready.wait(2.0)
+    try:
+        while True:
+            print({n: {"carrier": cache.carrier(n), "ip": cache.ipv4(n), "gw": cache.gateway(n)}
+                   for n in cache.links})
+            v = cache.version
+            with cache.cond:
+                cache.cond.wait_for(lambda: cache.version != v)
+    except KeyboardInterrupt:
+        pass
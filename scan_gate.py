@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스캔 ↔ 핸드오버 조정 (핸드오버 우선)
+- 스캐너: try_begin() 이 True 일 때만 스캔 요청, 결과 처리 후 end().
+          핸드오버 중이거나 다른 스캐너(예: 핸드오버 사전 준비 스캔)가 스캔 중이면 False →
+          wait_idle() 로 끝날 때까지 대기 후 재개. 동시에 스캔 1개만 (end() 가 남의 스캔을 풀지 않도록)
+- 핸드오버: begin_handover() → 진행 중 스캔이 있으면 abort_fn()(ABORT_SCAN) 후
+            wait_scan_end_fn(abort_wait_s) 로 스캔 종료 대기, end_handover() 로 스캐너 재개
+- preempted(Event): 핸드오버 중 set → 스캐너가 결과 대기를 일찍 끝내고 통계에서 제외
+- 스캔 때문에 지연된 핸드오버 횟수/시간 집계 (stats)
+"""
+
+import threading
+import time
+
+
+class ScanGate:
+    def __init__(self, abort_fn, scanning_fn, wait_scan_end_fn, abort_wait_s=1.0):
+        self.abort_fn = abort_fn
+        self.scanning_fn = scanning_fn
+        self.wait_scan_end_fn = wait_scan_end_fn
+        self.abort_wait_s = abort_wait_s
+        self.cond = threading.Condition()
+        self.active = False          # 스캐너가 스캔 요청~결과 처리 중
+        self.handovers = 0           # 진행 중 핸드오버 수
+        self.preempted = threading.Event()
+        self.counts = {"handovers": 0, "delayed": 0, "aborted_scans": 0, "skipped_scans": 0, "busy_scans": 0}
+        self.delay_total_s = 0.0
+        self.delay_max_s = 0.0
+
+    # ---- 스캐너 측 ----
+    def try_begin(self):
+        with self.cond:
+            if self.handovers:
+                self.counts["skipped_scans"] += 1
+                return False
+            if self.active:
+                self.counts["busy_scans"] += 1
+                return False
+            self.active = True
+            return True
+
+    def end(self):
+        with self.cond:
+            self.active = False
+            self.cond.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """진행 중 핸드오버와 다른 스캐너의 스캔이 끝날 때까지 대기"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.handovers == 0 and not self.active, timeout)
+
+    # ---- 핸드오버 측 ----
+    def begin_handover(self):
+        """스캔 선점. 반환: 스캔 때문에 지연된 시간(초), 스캔이 없었으면 0.0"""
+        t0 = time.monotonic()
+        with self.cond:
+            self.handovers += 1
+            self.counts["handovers"] += 1
+            self.preempted.set()
+            busy = self.active
+        busy = busy or self.scanning_fn()
+        if not busy:
+            return 0.0
+        try:
+            self.abort_fn()
+            self.counts["aborted_scans"] += 1
+        except Exception as e:
+            print(f"[ScanGate] abort scan failed: {e}")
+        if not self.wait_scan_end_fn(self.abort_wait_s):
+            print(f"[ScanGate] scan did not end within {self.abort_wait_s}s, proceeding")
+        delay = time.monotonic() - t0
+        with self.cond:
+            self.counts["delayed"] += 1
+            self.delay_total_s += delay
+            self.delay_max_s = max(self.delay_max_s, delay)
+        return delay
+
+    def end_handover(self):
+        with self.cond:
+            self.handovers -= 1
+            if self.handovers == 0:
+                self.preempted.clear()
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            d = self.counts["delayed"]
+            return {
+                **self.counts,
+                "delay_ms_avg": round(self.delay_total_s / d * 1e3, 1) if d else None,
+                "delay_ms_max": round(self.delay_max_s * 1e3, 1),
+            }
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+채널 한정 스캔 계획기
+- 스캔 결과에서 대상 BSSID(AP_INFO) 의 주파수를 학습
+- 학습이 끝나면 해당 채널만 스캔 (SCAN freq=...), full_interval_s 마다 전체 스캔으로 재학습
+- 스캔 소요 시간 / off-channel 추정 시간을 종류별로 집계해 절감 효과 확인
+"""
+
+import time
+
+# 전체 스캔 채널 수 추정치 (2.4 GHz 13 + 5 GHz 25). 전체 스캔 결과로 갱신됨
+DEFAULT_FULL_CHANNELS = 38
+
+
+class ScanPlanner:
+    def __init__(self, bssids, full_interval_s=120.0):
+        self.targets = {b.lower() for b in bssids}
+        self.full_interval_s = full_interval_s
+        self.freqs = {}              # bssid → freq (MHz)
+        self.last_full = None
+        self.full_channels = DEFAULT_FULL_CHANNELS
+        self.stats_by_kind = {
+            kind: {"count": 0, "total_s": 0.0, "max_s": 0.0, "off_channel_s": 0.0}
+            for kind in ("full", "targeted")
+        }
+
+    def learn(self, results, full=False):
+        """스캔 결과 [{bssid, freq, ...}] 에서 대상 BSSID 주파수 갱신"""
+        for r in results:
+            b = r["bssid"].lower()
+            if b in self.targets and r.get("freq"):
+                self.freqs[b] = int(r["freq"])
+        if full:
+            seen = {int(r["freq"]) for r in results if r.get("freq")}
+            if seen:
+                self.full_channels = max(len(seen), self.full_channels)
+
+    def next_scan(self, now=None):
+        """('full', None) 또는 ('targeted', [freq, ...])"""
+        now = time.monotonic() if now is None else now
+        # 안 보이는 대상 AP 는 주기적 전체 스캔에서 다시 찾음
+        if (self.last_full is None
+                or now - self.last_full >= self.full_interval_s
+                or not self.freqs):
+            return "full", None
+        return "targeted", sorted(set(self.freqs.values()))
+
+    def record(self, kind, freqs, duration_s, home_freq=None, now=None):
+        """
+        스캔 1회 결과 기록 (duration_s=None 이면 전체 스캔 시각만 갱신).
+        off-channel 시간은 스캔 채널 중 현재 채널(home_freq)
+        비율을 뺀 근사치: duration × (다른 채널 수 / 스캔 채널 수)
+        """
+        now = time.monotonic() if now is None else now
+        if kind == "full":
+            self.last_full = now
+        if duration_s is None:
+            return      # 소요 시간 측정 불가 (이벤트 모니터 없음)
+        if kind == "full":
+            n = self.full_channels
+            n_off = n - 1 if home_freq else n
+        else:
+            n = len(freqs) if freqs else 1
+            n_off = n - (1 if home_freq in (freqs or []) else 0)
+        st = self.stats_by_kind[kind]
+        st["count"] += 1
+        st["total_s"] += duration_s
+        st["max_s"] = max(st["max_s"], duration_s)
+        st["off_channel_s"] += duration_s * n_off / n if n else 0.0
+
+    def stats(self):
+        out = {"freqs": dict(self.freqs)}
+        for kind, st in self.stats_by_kind.items():
+            c = st["count"]
+            out[kind] = {
+                "count": c,
+                "avg_s": round(st["total_s"] / c, 3) if c else None,
+                "max_s": round(st["max_s"], 3),
+                "off_channel_s": round(st["off_channel_s"], 3),
+            }
+        return out
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BSSID 별 신호(RSSI) 필터 뱅크 — 장시간 실행에도 메모리 일정
+- 고정 크기 링(array) 에 최근 샘플/시각 저장 (list.pop(0) 없음)
+- 필터: "sma"(단순 이동평균) | "ewma"(지수 이동평균) | "kalman"(1차원)
+- stale_s 동안 안 보인 BSSID 제거, max_entries 로 항목 수 상한
+- 화이트리스트: ssids / bssids 중 하나라도 맞아야 추적 (둘 다 None 이면 전부)
+"""
+
+import time
+from array import array
+
+FILTER_KINDS = ("sma", "ewma", "kalman")
+
+
+class _Track:
+    """BSSID 1개 상태"""
+    __slots__ = ("vals", "ts", "idx", "count", "est", "p", "last_seen", "ssid")
+
+    def __init__(self, window):
+        self.vals = array("d", bytes(8 * window))
+        self.ts = array("d", bytes(8 * window))
+        self.idx = 0
+        self.count = 0
+        self.est = None     # ewma / kalman 추정값
+        self.p = None       # kalman 오차 분산
+        self.last_seen = 0.0
+        self.ssid = None
+
+
+class SignalFilterBank:
+    def __init__(self, kind="sma", window=4, alpha=0.5, kalman_q=0.5, kalman_r=4.0,
+                 stale_s=60.0, max_entries=64, ssids=None, bssids=None):
+        if kind not in FILTER_KINDS:
+            raise ValueError(f"unknown filter kind: {kind}")
+        self.kind = kind
+        self.window = window
+        self.alpha = alpha
+        self.kalman_q = kalman_q     # 프로세스 잡음 (샘플 간 실제 신호 변화 분산)
+        self.kalman_r = kalman_r     # 측정 잡음 (RSSI 측정 분산)
+        self.stale_s = stale_s
+        self.max_entries = max_entries
+        self.ssids = set(ssids) if ssids else None
+        self.bssids = {b.lower() for b in bssids} if bssids else None
+        self.tracks = {}
+
+    def accepts(self, bssid, ssid=None):
+        if self.ssids is None and self.bssids is None:
+            return True
+        if self.bssids is not None and bssid.lower() in self.bssids:
+            return True
+        if self.ssids is not None and ssid in self.ssids:
+            return True
+        return False
+
+    def update(self, bssid, value, ssid=None, ts=None):
+        """샘플 1개 반영 후 필터 값 반환. 화이트리스트 밖이면 None"""
+        bssid = bssid.lower()
+        if not self.accepts(bssid, ssid):
+            return None
+        now = time.monotonic() if ts is None else ts
+        tr = self.tracks.get(bssid)
+        if tr is None:
+            if len(self.tracks) >= self.max_entries:
+                self.evict(now)
+                if len(self.tracks) >= self.max_entries:
+                    oldest = min(self.tracks, key=lambda b: self.tracks[b].last_seen)
+                    del self.tracks[oldest]
+            tr = self.tracks[bssid] = _Track(self.window)
+        tr.vals[tr.idx] = value
+        tr.ts[tr.idx] = now
+        tr.idx = (tr.idx + 1) % self.window
+        tr.count = min(tr.count + 1, self.window)
+        tr.last_seen = now
+        if ssid is not None:
+            tr.ssid = ssid
+
+        if self.kind == "ewma":
+            tr.est = value if tr.est is None else tr.est + self.alpha * (value - tr.est)
+        elif self.kind == "kalman":
+            if tr.est is None:
+                tr.est, tr.p = value, self.kalman_r
+            else:
+                p = tr.p + self.kalman_q
+                k = p / (p + self.kalman_r)
+                tr.est += k * (value - tr.est)
+                tr.p = (1 - k) * p
+        return self._value(tr)
+
+    def _value(self, tr):
+        if tr.count == 0:
+            return None
+        if self.kind == "sma":
+            return sum(tr.vals[i] for i in range(tr.count)) / tr.count if tr.count < self.window \
+                else sum(tr.vals) / self.window
+        return tr.est
+
+    def value(self, bssid):
+        tr = self.tracks.get(bssid.lower())
+        return self._value(tr) if tr else None
+
+    def values(self):
+        return {b: self._value(tr) for b, tr in self.tracks.items()}
+
+    def series(self, bssid):
+        """원본 샘플 [(ts, value)] 오래된 순"""
+        tr = self.tracks.get(bssid.lower())
+        if not tr:
+            return []
+        start = (tr.idx - tr.count) % self.window
+        return [(tr.ts[(start + k) % self.window], tr.vals[(start + k) % self.window])
+                for k in range(tr.count)]
+
+    def last_seen(self, bssid):
+        tr = self.tracks.get(bssid.lower())
+        return tr.last_seen if tr else None
+
+    def evict(self, now=None):
+        """stale_s 이상 안 보인 BSSID 제거, 제거 수 반환"""
+        now = time.monotonic() if now is None else now
+        stale = [b for b, tr in self.tracks.items() if now - tr.last_seen > self.stale_s]
+        for b in stale:
+            del self.tracks[b]
+        return len(stale)
+
+    def __len__(self):
+        return len(self.tracks)
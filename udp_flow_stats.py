@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+수신측 흐름별 통계 (q_to_udp_receiver 용)
+- udp_header 로 송신 헤더를 해석해 flow_id 단위로 집계 (v0 헤더는 flow_id 가 없어 송신 IP 단위).
+  핸드오버로 송신 IP 가 바뀌어도 같은 seq 공간 → 전환 구간 손실/중복(overlap 복제)이 이어서 집계됨
+- goodput / loss / reordering / duplicate / RFC 3550 jitter / one-way delay
+"""
+
+import threading
+
+import udp_header
+
+SEQ_WINDOW = 1024          # 중복 판정용 비트마스크 창 크기
+SEQ_RESET_GAP = 100000     # 이 이상 seq 가 되돌아가면 송신측 재시작으로 간주
+FLOW_IDLE_S = 30.0         # 이 시간 동안 수신 없으면 흐름 제거
+
+
+class FlowStats:
+    """단일 흐름 상태. 누적값 + 직전 report 이후 구간값"""
+
+    def __init__(self, src, flow_id):
+        self.src = src             # 최근 seq 를 전진시킨 송신 IP (현재 경로)
+        self.prev_src = None       # 그 이전 송신 IP (핸드오버 전 경로)
+        self.src_changes = 0
+        self.flow_id = flow_id
+        self.iface_id = 0
+        self.epoch = 0
+        self.version = 0
+        self.last_seen = 0.0
+        self._reset_seq()
+        # 누적
+        self.packets = 0
+        self.bytes = 0
+        self.duplicates = 0
+        self.reordered = 0
+        # RFC 3550 interarrival jitter (ns)
+        self.jitter_ns = 0.0
+        self._transit_prev = None
+        self._new_interval()
+
+    def _reset_seq(self):
+        self.base_seq = None
+        self.max_seq = None
+        self.window = 0          # bit k → (max_seq - k) 수신 여부
+        self.received = 0        # 현재 seq 구간에서 받은 고유 패킷 수
+        self._expected_prior = 0
+        self._lost_prior = 0
+
+    def _new_interval(self):
+        self.i_packets = 0
+        self.i_bytes = 0
+        self.i_dups = 0
+        self.i_reordered = 0
+        self.i_owd_sum = 0
+        self.i_owd_n = 0
+        self.i_owd_min = None
+        self.i_owd_max = None
+
+    def _track_seq(self, seq):
+        """seq 반영. 중복이면 False"""
+        if self.max_seq is None or seq + SEQ_RESET_GAP < self.max_seq:
+            self._reset_seq()
+            self.base_seq = seq
+            self.max_seq = seq
+            self.window = 1
+            return True
+        if seq > self.max_seq:
+            shift = seq - self.max_seq
+            self.window = ((self.window << shift) | 1) & ((1 << SEQ_WINDOW) - 1) if shift < SEQ_WINDOW else 1
+            self.max_seq = seq
+            return True
+        # 과거 seq: 순서 뒤바뀜 또는 중복
+        back = self.max_seq - seq
+        if back < SEQ_WINDOW:
+            bit = 1 << back
+            if self.window & bit:
+                self.duplicates += 1
+                self.i_dups += 1
+                return False
+            self.window |= bit
+        if seq < self.base_seq:
+            self.base_seq = seq
+        self.reordered += 1
+        self.i_reordered += 1
+        return True
+
+    def update(self, hdr, nbytes, arr_mono_ns, arr_wall_ns, src=None):
+        self.last_seen = arr_mono_ns / 1e9
+        self.version = hdr.version
+        # 경로 속성은 seq 를 전진시킨 패킷 기준 (이전 경로로 온 overlap 복제·지연 패킷은 제외)
+        advancing = hdr.seq is None or self.max_seq is None or hdr.seq > self.max_seq
+
+        if hdr.seq is not None:
+            if not self._track_seq(hdr.seq):
+                return
+            self.received += 1
+        if advancing:
+            self.iface_id = hdr.iface_id
+            self.epoch = hdr.epoch
+            if src is not None and src != self.src:
+                self.prev_src, self.src = self.src, src
+                self.src_changes += 1
+
+        self.packets += 1
+        self.bytes += nbytes
+        self.i_packets += 1
+        self.i_bytes += nbytes
+
+        # jitter: 송신 monotonic 기준 (송신측 시계 보정 불필요)
+        if hdr.mono_ns is not None:
+            transit = arr_mono_ns - hdr.mono_ns
+            if self._transit_prev is not None:
+                d = abs(transit - self._transit_prev)
+                self.jitter_ns += (d - self.jitter_ns) / 16.0
+            self._transit_prev = transit
+
+        # one-way delay: 양단 wall-clock 동기(NTP/PTP) 전제
+        if hdr.wall_ns is not None:
+            owd = arr_wall_ns - hdr.wall_ns
+            self.i_owd_sum += owd
+            self.i_owd_n += 1
+            if self.i_owd_min is None or owd < self.i_owd_min:
+                self.i_owd_min = owd
+            if self.i_owd_max is None or owd > self.i_owd_max:
+                self.i_owd_max = owd
+
+    def report(self, interval_s):
+        """구간 통계 dict 반환 후 구간 카운터 초기화"""
+        # RFC 3550 방식: 누적 (expected - received) 의 구간 차분
+        if self.max_seq is not None:
+            total_expected = self.max_seq - self.base_seq + 1
+            total_lost = max(0, total_expected - self.received)
+            expected = total_expected - self._expected_prior
+            lost = max(0, total_lost - self._lost_prior)
+            self._expected_prior = total_expected
+            self._lost_prior = total_lost
+        else:
+            expected = lost = total_lost = 0
+
+        out = {
+            "src": self.src,
+            "prev_src": self.prev_src,
+            "src_changes": self.src_changes,
+            "flow_id": self.flow_id,
+            "version": self.version,
+            "iface": udp_header.IFACE_NAMES.get(self.iface_id, str(self.iface_id)),
+            "epoch": self.epoch,
+            "goodput_mbps": round((self.i_bytes * 8) / (interval_s * 1e6), 3) if interval_s > 0 else 0.0,
+            "bytes": self.i_bytes,
+            "packets": self.i_packets,
+            "expected": expected,
+            "lost": lost,
+            "loss_pct": round(100.0 * lost / expected, 3) if expected > 0 else 0.0,
+            "reordered": self.i_reordered,
+            "duplicates": self.i_dups,
+            "jitter_ms": round(self.jitter_ns / 1e6, 3),
+            "owd_ms": round(self.i_owd_sum / self.i_owd_n / 1e6, 3) if self.i_owd_n else None,
+            "owd_min_ms": round(self.i_owd_min / 1e6, 3) if self.i_owd_min is not None else None,
+            "owd_max_ms": round(self.i_owd_max / 1e6, 3) if self.i_owd_max is not None else None,
+            "owd_n": self.i_owd_n,
+            "total_lost": total_lost,
+        }
+        self._new_interval()
+        return out
+
+
+def flow_key(version, src, flow_id):
+    """v1 은 flow_id 만 (송신 IP 가 바뀌어도 같은 흐름), v0 은 flow_id 가 없으므로 송신 IP"""
+    return (None, flow_id) if version else (src, flow_id)
+
+
+SUM_FIELDS = ("bytes", "packets", "expected", "lost", "reordered", "duplicates")
+
+
+def merge_reports(reports, interval_s):
+    """
+    여러 FlowStats.report() 리스트(예: 워커가 보고 주기 사이에 두 번 보고)를 흐름별로 합침.
+    구간 카운터는 합산, owd 는 표본 수 가중 평균, 나머지(iface/epoch/jitter/누적 손실)는 마지막 값.
+    goodput 은 합친 바이트 / interval_s 로 다시 계산
+    """
+    merged = {}
+    for flows in reports:
+        for f in flows:
+            key = flow_key(f["version"], f["src"], f["flow_id"])
+            m = merged.get(key)
+            if m is None:
+                merged[key] = dict(f)
+                continue
+            owd_n = m["owd_n"] + f["owd_n"]
+            owd = ((m["owd_ms"] or 0) * m["owd_n"] + (f["owd_ms"] or 0) * f["owd_n"]) / owd_n if owd_n else None
+            mins = [v for v in (m["owd_min_ms"], f["owd_min_ms"]) if v is not None]
+            maxs = [v for v in (m["owd_max_ms"], f["owd_max_ms"]) if v is not None]
+            sums = {k: m[k] + f[k] for k in SUM_FIELDS}
+            m.update(f)
+            m.update(sums, owd_n=owd_n, owd_ms=round(owd, 3) if owd is not None else None,
+                     owd_min_ms=min(mins) if mins else None, owd_max_ms=max(maxs) if maxs else None)
+    for m in merged.values():
+        m["goodput_mbps"] = round(m["bytes"] * 8 / (interval_s * 1e6), 3) if interval_s > 0 else 0.0
+        m["loss_pct"] = round(100.0 * m["lost"] / m["expected"], 3) if m["expected"] > 0 else 0.0
+    return list(merged.values())
+
+
+class FlowAnalytics:
+    """
+    흐름 테이블. 수신 스레드는 ingest(), 보고 스레드는 report() 호출.
+    """
+
+    def __init__(self, idle_s=FLOW_IDLE_S):
+        self.flows = {}
+        self.idle_s = idle_s
+        self.lock = threading.Lock()
+        self.undecodable = 0
+
+    def ingest(self, data, addr, arr_mono_ns, arr_wall_ns):
+        hdr = udp_header.decode(data)
+        if hdr is None:
+            self.undecodable += 1
+            return
+        key = flow_key(hdr.version, addr[0], hdr.flow_id)
+        with self.lock:
+            fs = self.flows.get(key)
+            if fs is None:
+                fs = self.flows[key] = FlowStats(addr[0], hdr.flow_id)
+            fs.update(hdr, len(data), arr_mono_ns, arr_wall_ns, addr[0])
+
+    def report(self, interval_s, now_mono):
+        """흐름별 구간 통계 리스트. 오래 조용한 흐름은 제거"""
+        with self.lock:
+            for key in [k for k, f in self.flows.items() if now_mono - f.last_seen > self.idle_s]:
+                del self.flows[key]
+            return [f.report(interval_s) for f in self.flows.values()]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UDP 측정 패킷 헤더 (송신: r_ca_integration.UDPGenerator / 수신: q_to_udp_receiver)
+
+v1 레이아웃 (network byte order, 36 bytes)
+  magic    H   0x4944 ("ID")
+  version  B   1
+  iface_id B   송신 인터페이스 (IFACE_IDS)
+  flow_id  I   흐름 ID (로봇별)
+  seq      Q   64-bit 시퀀스 (흐름별 0부터 증가)
+  mono_ns  Q   송신측 monotonic 시각 (ns)
+  wall_ns  Q   송신측 wall-clock 시각 (ns, epoch 기준)
+  epoch    I   핸드오버 epoch (경로 전환마다 +1)
+
+v0 (구버전): 선두 8바이트 '!d' time.time() 만 존재. decode() 가 호환 처리.
+"""
+
+import struct
+from collections import namedtuple
+
+MAGIC = 0x4944
+VERSION = 1
+HEADER = struct.Struct("!HBBIQQQI")
+HEADER_SIZE = HEADER.size
+IFACE_OFFSET = 3    # iface_id 바이트 위치
+LEGACY_HEADER = struct.Struct("!d")
+
+IFACE_IDS = {
+    "eth0": 1,
+    "wlan0": 2,
+}
+IFACE_NAMES = {v: k for k, v in IFACE_IDS.items()}
+
+PacketHeader = namedtuple(
+    "PacketHeader",
+    ["version", "iface_id", "flow_id", "seq", "mono_ns", "wall_ns", "epoch"],
+)
+
+
+def iface_id(iface):
+    return IFACE_IDS.get(iface, 0)
+
+
+def pack_into(buf, offset, flow_id, seq, iface, epoch, mono_ns, wall_ns):
+    """buf[offset:] 에 v1 헤더를 제자리 기록 (할당 없음)"""
+    HEADER.pack_into(buf, offset, MAGIC, VERSION, iface, flow_id, seq, mono_ns, wall_ns, epoch)
+
+
+def set_iface(buf, offset, iface):
+    """이미 기록된 헤더의 iface_id 만 교체 (경로 중복 송신 시 같은 seq 를 다른 인터페이스로)"""
+    buf[offset + IFACE_OFFSET] = iface
+
+
+def encode(flow_id, seq, iface, epoch, mono_ns, wall_ns):
+    return HEADER.pack(MAGIC, VERSION, iface, flow_id, seq, mono_ns, wall_ns, epoch)
+
+
+def decode(data):
+    """
+    패킷 선두에서 헤더 해석. v1 이 아니면 v0(타임스탬프만)으로 간주.
+    데이터가 너무 짧으면 None.
+    """
+    if len(data) >= HEADER_SIZE:
+        magic, version, iface, flow_id, seq, mono_ns, wall_ns, epoch = HEADER.unpack_from(data, 0)
+        if magic == MAGIC and version == VERSION:
+            return PacketHeader(version, iface, flow_id, seq, mono_ns, wall_ns, epoch)
+    if len(data) >= LEGACY_HEADER.size:
+        (ts,) = LEGACY_HEADER.unpack_from(data, 0)
+        return PacketHeader(0, 0, 0, None, None, int(ts * 1e9), 0)
+    return None
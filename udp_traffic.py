@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UDP 트래픽 생성기 공용 헬퍼.
+- TokenBucketPacer: 모노토닉 시계 기반 절대 데드라인 페이서
+- PayloadRing: 미리 할당된 송신 버퍼 링 (헤더만 pack_into 로 덮어씀)
+"""
+
+import os
+import time
+
+
+class TokenBucketPacer:
+    """
+    절대 데드라인(모노토닉 시계) 기반 토큰 버킷 페이서.
+
+    - 패킷마다 sleep(interval) 하지 않고, 다음 송신 가능 시각(_next)을 누적 계산
+      → sleep 오차/송신 비용이 간격에 더해지지 않음
+    - burst_bytes: 버킷 크기. 이만큼은 쉬지 않고 연속 송신 허용
+    - max_backlog_s: 스케줄러 정지 등으로 밀린 시간 중 따라잡을 최대치
+      (그 이상 밀린 시간은 버리고 lost_s 로 기록)
+    """
+
+    def __init__(self, rate_bps, burst_bytes=0, max_backlog_s=0.2):
+        if rate_bps <= 0:
+            raise ValueError(f"rate_bps must be positive: {rate_bps}")
+        self.rate_bps = float(rate_bps)
+        self.byte_time = 8.0 / self.rate_bps          # 1 byte 당 소요 시간 (s)
+        self.burst_s = burst_bytes * self.byte_time   # 버킷 크기를 시간으로 환산
+        self.max_backlog_s = max_backlog_s
+        self.reset()
+
+    def reset(self):
+        now = time.monotonic()
+        self._next = now
+        self.start = now
+        self.sent_bytes = 0
+        self.lost_s = 0.0
+        self._report_t = now
+        self._report_bytes = 0
+
+    def wait(self, nbytes):
+        """nbytes 송신이 허용되는 시각까지 대기 후 토큰 차감"""
+        now = time.monotonic()
+        lag = now - self._next
+        if lag > self.max_backlog_s:
+            # 너무 오래 밀림: 따라잡을 수 있는 만큼만 남기고 나머지는 손실 처리
+            self.lost_s += lag - self.max_backlog_s
+            self._next = now - self.max_backlog_s
+        ahead = self._next - now - self.burst_s
+        if ahead > 0:
+            time.sleep(ahead)
+        self._next += nbytes * self.byte_time
+        self.sent_bytes += nbytes
+
+    def achieved_bps(self):
+        elapsed = time.monotonic() - self.start
+        return (self.sent_bytes * 8) / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        """
+        직전 report() 이후 구간의 달성률 반환.
+        {target_mbps, achieved_mbps, total_mbps, lost_s}
+        """
+        now = time.monotonic()
+        dt = now - self._report_t
+        dbytes = self.sent_bytes - self._report_bytes
+        self._report_t = now
+        self._report_bytes = self.sent_bytes
+        return {
+            "target_mbps": self.rate_bps / 1e6,
+            "achieved_mbps": (dbytes * 8) / (dt * 1e6) if dt > 0 else 0.0,
+            "total_mbps": self.achieved_bps() / 1e6,
+            "lost_s": round(self.lost_s, 3),
+        }
+
+
+class PayloadRing:
+    """
+    bytearray 하나를 packet_size 슬롯 slots 개로 나눈 송신 버퍼 링.
+    - 페이로드 본문은 생성 시 1회만 채우고, 송신 때는 헤더 영역만 pack_into 로 갱신
+      → 정상 상태에서 패킷당 새 bytes 할당 없음
+    - fill: "random"(urandom 1회) | "zeros" | bytes 패턴(반복)
+    - views[i]: i번째 슬롯 memoryview (sendto/sendmmsg 에 그대로 사용)
+    """
+
+    def __init__(self, slots, packet_size, fill="random", header_size=8):
+        if packet_size <= header_size:
+            raise ValueError(f"packet_size({packet_size}) must exceed header_size({header_size})")
+        self.slots = slots
+        self.packet_size = packet_size
+        self.header_size = header_size
+        self.buf = bytearray(slots * packet_size)
+        self._fill(fill)
+        mv = memoryview(self.buf)
+        self.views = [mv[i * packet_size:(i + 1) * packet_size] for i in range(slots)]
+        self.pos = 0
+
+    def _fill(self, fill):
+        n = len(self.buf)
+        if fill == "random":
+            self.buf[:] = os.urandom(n)
+        elif fill == "zeros":
+            pass
+        elif isinstance(fill, (bytes, bytearray)) and fill:
+            reps = n // len(fill) + 1
+            self.buf[:] = (bytes(fill) * reps)[:n]
+        else:
+            raise ValueError(f"unknown payload fill: {fill!r}")
+
+    def offset(self, i):
+        return i * self.packet_size
+
+    def next(self):
+        """다음 슬롯 번호 반환 후 링 위치 전진"""
+        i = self.pos
+        self.pos = (i + 1) % self.slots
+        return i
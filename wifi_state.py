@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+wpa_supplicant 비요청(unsolicited) 이벤트 기반 Wi-Fi 링크 상태
+- LinkState: 현재 BSSID/연결 여부/RSSI/스캔 결과를 담는 메모리 모델.
+             subscribe() 콜백 또는 wait_for()/wait_change() 로 변화를 기다림
+- WpaEventMonitor: 제어 소켓에 ATTACH 후 CTRL-EVENT-* 를 LinkState 로 반영
+"""
+
+import os
+import re
+import socket
+import threading
+import time
+
+from wpa_ctrl import WpaCtrlError, _client_seq
+
+_RE_CONNECTED = re.compile(r"Connection to ([0-9a-fA-F:]{17}) completed")
+_RE_BSSID = re.compile(r"bssid=([0-9a-fA-F:]{17})")
+_RE_SIGNAL = re.compile(r"signal=(-?\d+)")
+
+
+class LinkState:
+    """
+    이벤트로 갱신되는 링크 상태. 모든 필드는 cond 보호 아래에서 갱신되며
+    갱신마다 version 이 증가한다.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.version = 0
+        self.bssid = None
+        self.connected = False
+        self.freq = None
+        self.rssi = None
+        self.rssi_ts = 0.0
+        self.scanning = False
+        self.scan = {}          # bssid → {freq, signal, ssid, flags}
+        self.scan_ts = 0.0
+        self.last_event = None
+        self.last_event_ts = 0.0
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """callback(event, state): 갱신 직후 모니터 스레드에서 호출 (빨리 끝낼 것)"""
+        self.subscribers.append(callback)
+
+    def update(self, event, **fields):
+        now = time.monotonic()
+        with self.cond:
+            for k, v in fields.items():
+                setattr(self, k, v)
+            if "rssi" in fields:
+                self.rssi_ts = now
+            if "scan" in fields:
+                self.scan_ts = now
+            self.last_event = event
+            self.last_event_ts = now
+            self.version += 1
+            self.cond.notify_all()
+        for cb in list(self.subscribers):
+            try:
+                cb(event, self)
+            except Exception as e:
+                print(f"[LinkState] subscriber error: {e}")
+
+    def wait_for(self, predicate, timeout=None):
+        """predicate(state) 가 참이 될 때까지 대기. 시간 초과면 False"""
+        with self.cond:
+            return self.cond.wait_for(lambda: predicate(self), timeout)
+
+    def wait_change(self, since_version, timeout=None):
+        """version 이 since_version 보다 커질 때까지 대기 후 현재 version 반환"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version > since_version, timeout)
+            return self.version
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                "bssid": self.bssid,
+                "connected": self.connected,
+                "freq": self.freq,
+                "rssi": self.rssi,
+                "scan": dict(self.scan),
+                "scan_ts": self.scan_ts,
+                "version": self.version,
+            }
+
+
+class WpaEventMonitor(threading.Thread):
+    """
+    ATTACH 된 모니터 소켓으로 이벤트 수신.
+    ctrl(WpaCtrl): 스캔 결과/상태 조회용 요청 소켓 (모니터 소켓과 분리)
+    ping_s 동안 이벤트가 없으면 PING 으로 생존 확인, 끊기면 재연결 + 상태 재동기화
+    """
+
+    def __init__(self, path, state, ctrl, ping_s=5.0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.state = state
+        self.ctrl = ctrl
+        self.ping_s = ping_s
+        self.sock = None
+        self.running = True
+        self.attached = threading.Event()
+
+    def _attach(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(f"\0wpa_mon_{os.getpid()}_{next(_client_seq)}")
+        sock.connect(self.path)
+        sock.settimeout(2.0)
+        sock.send(b"ATTACH")
+        while True:
+            reply = sock.recv(4096).decode(errors="replace").strip()
+            if not reply.startswith("<"):
+                break
+        if reply != "OK":
+            sock.close()
+            raise OSError(f"ATTACH failed: {reply}")
+        sock.settimeout(self.ping_s)
+        self.sock = sock
+        self.attached.set()
+        print(f"[WPA-MON] attached to {self.path}")
+
+    def resync(self):
+        """재연결 직후 등 이벤트를 놓쳤을 수 있을 때 STATUS/SCAN_RESULTS 로 상태 동기화"""
+        try:
+            st = self.ctrl.status()
+            bssid = st.get("bssid", "").lower() or None
+            connected = st.get("wpa_state") == "COMPLETED"
+            freq = int(st["freq"]) if st.get("freq", "").isdigit() else None
+            self.state.update("RESYNC", bssid=bssid, connected=connected, freq=freq)
+            self._update_scan()
+        except WpaCtrlError as e:
+            print(f"[WPA-MON] resync failed: {e}")
+
+    def _update_scan(self):
+        results = self.ctrl.scan_results()
+        scan = {r["bssid"]: r for r in results}
+        fields = {"scan": scan, "scanning": False}
+        cur = self.state.bssid
+        if cur and cur in scan:
+            fields["rssi"] = scan[cur]["signal"]
+        self.state.update("CTRL-EVENT-SCAN-RESULTS", **fields)
+
+    def handle(self, msg):
+        """'<N>CTRL-EVENT-...' 한 줄 처리"""
+        if msg.startswith("<"):
+            msg = msg[msg.find(">") + 1:]
+        if msg.startswith("CTRL-EVENT-SCAN-RESULTS"):
+            try:
+                self._update_scan()
+            except WpaCtrlError as e:
+                print(f"[WPA-MON] scan_results failed: {e}")
+        elif msg.startswith("CTRL-EVENT-CONNECTED"):
+            m = _RE_CONNECTED.search(msg)
+            bssid = m.group(1).lower() if m else None
+            fields = {"bssid": bssid, "connected": True}
+            ent = self.state.scan.get(bssid) if bssid else None
+            if ent:
+                fields["freq"] = ent["freq"]
+                fields["rssi"] = ent["signal"]
+            self.state.update("CTRL-EVENT-CONNECTED", **fields)
+        elif msg.startswith("CTRL-EVENT-DISCONNECTED"):
+            m = _RE_BSSID.search(msg)
+            self.state.update("CTRL-EVENT-DISCONNECTED", connected=False,
+                              bssid=m.group(1).lower() if m else self.state.bssid)
+        elif msg.startswith("CTRL-EVENT-SIGNAL-CHANGE"):
+            m = _RE_SIGNAL.search(msg)
+            if m:
+                self.state.update("CTRL-EVENT-SIGNAL-CHANGE", rssi=float(m.group(1)))
+        elif msg.startswith("CTRL-EVENT-SCAN-STARTED"):
+            self.state.update("CTRL-EVENT-SCAN-STARTED", scanning=True)
+        elif msg.startswith("CTRL-EVENT-SCAN-FAILED"):
+            self.state.update("CTRL-EVENT-SCAN-FAILED", scanning=False)
+
+    def run(self):
+        while self.running:
+            try:
+                if self.sock is None:
+                    self._attach()
+                    self.resync()
+                try:
+                    data = self.sock.recv(4096)
+                except socket.timeout:
+                    self.sock.send(b"PING")
+                    continue
+                msg = data.decode(errors="replace").strip()
+                if msg and msg != "PONG":
+                    self.handle(msg)
+            except OSError as e:
+                print(f"[WPA-MON] error: {e}, reattaching")
+                self.attached.clear()
+                if self.sock:
+                    try:
+                        self.sock.close()
+                    except OSError:
+                        pass
+                    self.sock = None
+                time.sleep(1)
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.send(b"DETACH")
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
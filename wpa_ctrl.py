@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+wpa_supplicant 제어 소켓 클라이언트 (wpa_cli 프로세스 fork 대체)
+- WpaCtrl: /var/run/wpa_supplicant/<iface> UNIX datagram 소켓에 상시 연결, 타입별 메서드 제공
+- FakeWpaSupplicant: 무선 장치 없이 시험할 수 있는 로컬 대역 제어 소켓
+
+권한: 제어 소켓은 보통 root:netdev 소유. sudo 없이 쓰려면 실행 계정을 netdev
+그룹에 넣거나 wpa_supplicant.conf 의 ctrl_interface GROUP 을 맞춘다.
+
+대역 실행 예:
+    python3 wpa_ctrl.py --fake /tmp/wpa_fake/wlan0
+    → r_ca_integration.WPA_CTRL_PATH 를 같은 경로로 바꿔 실행
+"""
+
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+
+WPA_CTRL_DIR = "/var/run/wpa_supplicant"
+REPLY_SIZE = 65536
+
+_client_seq = itertools.count()
+
+
+class WpaCtrlError(Exception):
+    pass
+
+
+def parse_kv(text):
+    """'key=value' 줄 목록 → dict (STATUS, BSS 응답)"""
+    out = {}
+    for line in text.splitlines():
+        if "=" in line:
+            k, v = line.split("=", 1)
+            out[k.strip()] = v.strip()
+    return out
+
+
+def parse_scan_results(text):
+    """
+    SCAN_RESULTS 응답 → [{bssid, freq, signal, flags, ssid}, ...]
+    첫 줄은 헤더 ("bssid / frequency / signal level / flags / ssid")
+    """
+    results = []
+    for line in text.splitlines()[1:]:
+        parts = line.split("\t")
+        if len(parts) < 3:
+            parts = line.split()
+        if len(parts) < 3:
+            continue
+        try:
+            results.append({
+                "bssid": parts[0].strip().lower(),
+                "freq": int(parts[1]),
+                "signal": float(parts[2]),
+                "flags": parts[3] if len(parts) > 3 else "",
+                "ssid": parts[4] if len(parts) > 4 else "",
+            })
+        except ValueError:
+            continue
+    return results
+
+
+class WpaCtrl:
+    """
+    wpa_supplicant 제어 인터페이스 요청/응답 클라이언트.
+    소켓은 첫 요청 때 열고 유지하며, 오류 시 1회 재연결 후 재시도한다.
+    """
+
+    def __init__(self, path=f"{WPA_CTRL_DIR}/wlan0", timeout=2.0):
+        self.path = path
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+
+    # ---- 연결 관리 ----
+    def open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # 추상 네임스페이스 주소: 파일 정리 불필요
+        sock.bind(f"\0wpa_ctrl_{os.getpid()}_{next(_client_seq)}")
+        sock.connect(self.path)
+        sock.settimeout(self.timeout)
+        self.sock = sock
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _drain(self):
+        """이전 요청 시간 초과로 남은 늦은 응답 제거"""
+        self.sock.setblocking(False)
+        try:
+            while True:
+                self.sock.recv(REPLY_SIZE)
+        except (BlockingIOError, OSError):
+            pass
+        finally:
+            self.sock.settimeout(self.timeout)
+
+    def _request_once(self, cmd):
+        if self.sock is None:
+            self.open()
+        self._drain()
+        self.sock.send(cmd.encode())
+        while True:
+            reply = self.sock.recv(REPLY_SIZE).decode(errors="replace")
+            # ATTACH 되지 않은 소켓이라도 '<N>' 이벤트가 섞이면 무시
+            if reply.startswith("<"):
+                continue
+            return reply
+
+    def request(self, cmd):
+        with self.lock:
+            try:
+                return self._request_once(cmd)
+            except OSError:
+                self.close()
+            try:
+                return self._request_once(cmd)
+            except OSError as e:
+                self.close()
+                raise WpaCtrlError(f"{cmd}: {e}") from e
+
+    def _ok(self, cmd):
+        reply = self.request(cmd).strip()
+        if reply != "OK":
+            raise WpaCtrlError(f"{cmd}: {reply}")
+        return True
+
+    # ---- 명령 ----
+    def ping(self):
+        return self.request("PING").strip() == "PONG"
+
+    def status(self):
+        return parse_kv(self.request("STATUS"))
+
+    def scan(self, freqs=None):
+        """freqs 지정 시 해당 채널만 스캔 (SCAN freq=5180,5200)"""
+        cmd = "SCAN"
+        if freqs:
+            cmd += " freq=" + ",".join(str(f) for f in freqs)
+        return self._ok(cmd)
+
+    def abort_scan(self):
+        return self._ok("ABORT_SCAN")
+
+    def scan_results(self):
+        return parse_scan_results(self.request("SCAN_RESULTS"))
+
+    def bss(self, bssid):
+        return parse_kv(self.request(f"BSS {bssid}"))
+
+    def roam(self, bssid):
+        return self._ok(f"ROAM {bssid}")
+
+    def set_network(self, net_id, key, value):
+        return self._ok(f"SET_NETWORK {net_id} {key} {value}")
+
+    def signal_poll(self):
+        return parse_kv(self.request("SIGNAL_POLL"))
+
+
+# ----------- 로컬 대역 (시험용) -----------------------
+class FakeWpaSupplicant(threading.Thread):
+    """
+    wpa_supplicant 흉내 제어 소켓. path 에 UNIX datagram 소켓을 열고
+    STATUS/SCAN/SCAN_RESULTS/BSS/ROAM/SET_NETWORK/PING 에 응답한다.
+    ATTACH 한 클라이언트에는 CTRL-EVENT-* 이벤트를 보낸다 (emit()).
+    aps: [{bssid, freq, signal, ssid}], 첫 AP 에 연결된 상태로 시작.
+    스캔 중 ROAM 은 스캔이 끝난 뒤 진행 (라디오 점유), ABORT_SCAN 은 진행 중 스캔을 즉시 종료.
+    """
+
+    def __init__(self, path, aps=None, roam_delay=0.05, scan_delay=0.2):
+        super().__init__(daemon=True)
+        self.path = path
+        self.aps = aps or [
+            {"bssid": "ec:5a:31:99:ee:99", "freq": 5180, "signal": -55.0, "ssid": "HSLSV"},
+            {"bssid": "ec:5a:31:a1:4a:a9", "freq": 5200, "signal": -62.0, "ssid": "HSLSV"},
+            {"bssid": "84:e8:cb:37:75:59", "freq": 5240, "signal": -70.0, "ssid": "HSLSV"},
+        ]
+        self.roam_delay = roam_delay
+        self.scan_delay = scan_delay
+        self.monitors = set()       # ATTACH 한 클라이언트 주소
+        self.bssid = self.aps[0]["bssid"]
+        self.networks = {}
+        self.requests = []          # 받은 명령 기록 (검증용)
+        self.scan_done = threading.Event()
+        self.scan_done.set()
+        self.scan_abort = threading.Event()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.running = True
+
+    def _ap(self, bssid):
+        return next((a for a in self.aps if a["bssid"] == bssid.lower()), None)
+
+    def _status(self):
+        ap = self._ap(self.bssid) if self.bssid else None
+        if not ap:
+            return "wpa_state=DISCONNECTED\n"
+        return (f"bssid={ap['bssid']}\nfreq={ap['freq']}\nssid={ap['ssid']}\n"
+                f"id=0\nmode=station\nwpa_state=COMPLETED\n")
+
+    def _scan_results(self):
+        lines = ["bssid / frequency / signal level / flags / ssid"]
+        for a in self.aps:
+            lines.append(f"{a['bssid']}\t{a['freq']}\t{int(a['signal'])}\t[WPA2-PSK-CCMP][ESS]\t{a['ssid']}")
+        return "\n".join(lines) + "\n"
+
+    def emit(self, event, level=2):
+        """ATTACH 한 모든 클라이언트에 '<level>event' 전송"""
+        msg = f"<{level}>{event}".encode()
+        for addr in list(self.monitors):
+            try:
+                self.sock.sendto(msg, addr)
+            except OSError:
+                self.monitors.discard(addr)
+
+    def set_signal(self, bssid, signal):
+        """시험용: AP 신호 세기 변경 (연결 AP 면 SIGNAL-CHANGE 이벤트)"""
+        with self.lock:
+            ap = self._ap(bssid)
+            ap["signal"] = float(signal)
+            current = self.bssid == ap["bssid"]
+        if current:
+            self.emit(f"CTRL-EVENT-SIGNAL-CHANGE above=0 signal={int(signal)} noise=-95 txrate=0")
+
+    def _finish_roam(self, bssid):
+        self.scan_done.wait()
+        time.sleep(self.roam_delay)
+        with self.lock:
+            old = self.bssid
+            self.bssid = bssid
+        if old and old != bssid:
+            self.emit(f"CTRL-EVENT-DISCONNECTED bssid={old} reason=3 locally_generated=1")
+        self.emit(f"CTRL-EVENT-CONNECTED - Connection to {bssid} completed [id=0 id_str=]")
+
+    def _finish_scan(self):
+        self.emit("CTRL-EVENT-SCAN-STARTED ")
+        self.scan_abort.wait(self.scan_delay)
+        self.emit("CTRL-EVENT-SCAN-RESULTS ")
+        self.scan_done.set()
+
+    def handle(self, cmd, addr=None):
+        words = cmd.split()
+        op = words[0].upper() if words else ""
+        with self.lock:
+            self.requests.append(cmd)
+            if op == "PING":
+                return "PONG\n"
+            if op == "STATUS":
+                return self._status()
+            if op == "ATTACH":
+                self.monitors.add(addr)
+                return "OK\n"
+            if op == "DETACH":
+                self.monitors.discard(addr)
+                return "OK\n"
+            if op == "SCAN":
+                if not self.scan_done.is_set():
+                    return "FAIL-BUSY\n"
+                self.scan_done.clear()
+                self.scan_abort.clear()
+                threading.Thread(target=self._finish_scan, daemon=True).start()
+                return "OK\n"
+            if op == "ABORT_SCAN":
+                if self.scan_done.is_set():
+                    return "FAIL\n"
+                self.scan_abort.set()
+                return "OK\n"
+            if op == "SIGNAL_MONITOR":
+                return "OK\n"
+            if op == "SCAN_RESULTS":
+                return self._scan_results()
+            if op == "SIGNAL_POLL":
+                ap = self._ap(self.bssid) if self.bssid else None
+                return f"RSSI={int(ap['signal'])}\nFREQUENCY={ap['freq']}\n" if ap else "FAIL\n"
+            if op == "BSS" and len(words) > 1:
+                ap = self._ap(words[1])
+                if not ap:
+                    return ""
+                return (f"bssid={ap['bssid']}\nfreq={ap['freq']}\nlevel={int(ap['signal'])}\n"
+                        f"ssid={ap['ssid']}\n")
+            if op == "ROAM" and len(words) > 1:
+                if not self._ap(words[1]):
+                    return "FAIL\n"
+                threading.Thread(target=self._finish_roam, args=(words[1].lower(),), daemon=True).start()
+                return "OK\n"
+            if op == "SET_NETWORK" and len(words) >= 3:
+                self.networks.setdefault(words[1], {})[words[2]] = " ".join(words[3:])
+                return "OK\n"
+        return "UNKNOWN COMMAND\n"
+
+    def run(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except OSError:
+                break
+            reply = self.handle(data.decode(errors="replace").strip(), addr)
+            try:
+                self.sock.sendto(reply.encode(), addr)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--fake":
+        fake = FakeWpaSupplicant(sys.argv[2])
+        fake.start()
+        print(f"[FakeWPA] control socket at {sys.argv[2]}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            fake.stop()
+    else:
+        path = sys.argv[1] if len(sys.argv) > 1 else f"{WPA_CTRL_DIR}/wlan0"
+        ctrl = WpaCtrl(path)
+        print(ctrl.status())
+        for r in ctrl.scan_results():
+            print(r)